@@ -0,0 +1,57 @@
+"""
+JSON authentication API for mobile clients: the citizen OTP flow, issuing
+JWTs instead of a session. Requests to it never create a session.
+"""
+
+from django.contrib.auth.models import update_last_login
+from rest_framework import status
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import tokens_for_user
+from core.utils import get_client_ip
+from notifications.services import InvalidOTP, check_otp, request_otp
+from .views import get_or_create_citizen
+
+
+class CitizenOTPRequestAPIView(APIView):
+    """Step 1: send an OTP to the mobile number. The code is only delivered by SMS."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        mobile = str(request.data.get('mobile_number', '')).strip()
+        if not mobile or len(mobile) < 10:
+            return Response({'detail': 'Enter a valid mobile number.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            request_otp(mobile, client_ip=get_client_ip(request))
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_429_TOO_MANY_REQUESTS)
+        return Response({'detail': f'OTP sent to {mobile}.'}, status=status.HTTP_202_ACCEPTED)
+
+
+class CitizenOTPVerifyAPIView(APIView):
+    """Step 2: verify the OTP and issue an access/refresh token pair."""
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    def post(self, request):
+        mobile = str(request.data.get('mobile_number', '')).strip()
+        otp_entered = str(request.data.get('otp', '')).strip()
+        if not mobile or not otp_entered:
+            return Response({'detail': 'Mobile number and OTP are required.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            check_otp(mobile, otp_entered)
+        except ValueError as e:  # InvalidOTP included
+            code = status.HTTP_401_UNAUTHORIZED if isinstance(e, InvalidOTP) else status.HTTP_400_BAD_REQUEST
+            return Response({'detail': str(e)}, status=code)
+
+        user = get_or_create_citizen(mobile)
+        update_last_login(None, user)
+        return Response({
+            **tokens_for_user(user),
+            'user': {'id': user.id, 'role': user.role, 'mobile_number': user.mobile_number},
+        })
@@ -4,6 +4,10 @@ Custom User model with role-based authentication.
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core import cache as versioned_cache
 from core.roles import ROLE_CHOICES, CITIZEN
 
 
@@ -18,6 +22,7 @@ class User(AbstractUser):
     organization = models.ForeignKey(
         'organizations.Organization',
         on_delete=models.SET_NULL,
+        db_constraint=False,  # may live on another database shard (core.sharding)
         null=True,
         blank=True,
         related_name='users',
@@ -25,6 +30,7 @@ class User(AbstractUser):
     branch = models.ForeignKey(
         'facilities.Branch',
         on_delete=models.SET_NULL,
+        db_constraint=False,
         null=True,
         blank=True,
         related_name='users',
@@ -57,3 +63,9 @@ class User(AbstractUser):
     @property
     def is_citizen_user(self):
         return self.role == 'citizen'
+
+
+@receiver([post_save, post_delete], sender=User)
+def bump_user_version(sender, instance, **kwargs):
+    """Cached copies of the user (core.backends.CachedUserBackend) are stale."""
+    versioned_cache.bump(user=instance.pk)
@@ -1,5 +1,7 @@
 from django.urls import path
-from . import views
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from . import api, views
 
 app_name = 'accounts'
 
@@ -9,4 +11,9 @@ urlpatterns = [
     path('otp/verify/', views.CitizenOTPVerifyView.as_view(), name='citizen_otp_verify'),
     path('register/organization/', views.OrganizationRegisterView.as_view(), name='org_register'),
     path('logout/', views.LogoutView.as_view(), name='logout'),
+
+    # Mobile API (JWT)
+    path('api/otp/request/', api.CitizenOTPRequestAPIView.as_view(), name='api_otp_request'),
+    path('api/otp/verify/', api.CitizenOTPVerifyAPIView.as_view(), name='api_otp_verify'),
+    path('api/token/refresh/', TokenRefreshView.as_view(), name='api_token_refresh'),
 ]
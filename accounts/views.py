@@ -6,14 +6,33 @@ from django.shortcuts import render, redirect
 from django.contrib.auth import login, logout, authenticate
 from django.contrib import messages
 from django.views import View
-from django.conf import settings
-from django.core.cache import cache
 from django.utils import timezone
 
-from core.utils import generate_otp
+from core.utils import get_client_ip
+from notifications.services import InvalidOTP, check_otp, request_otp
 from core.roles import CITIZEN, ORGANIZATION, PASSWORD_AUTH_ROLES
 from .models import User
 
+# Users signed in without a password (OTP, fresh registration) still need a
+# backend named in the session, as more than one is configured.
+SESSION_BACKEND = 'core.backends.CachedUserBackend'
+
+
+def get_or_create_citizen(mobile):
+    """The citizen account for a verified mobile number, created on first sign-in."""
+    user, created = User.objects.get_or_create(
+        mobile_number=mobile,
+        defaults={
+            'username': f'citizen_{mobile}',
+            'role': CITIZEN,
+        }
+    )
+
+    if created:
+        user.set_unusable_password()
+        user.save()
+    return user
+
 
 class UnifiedLoginView(View):
     """Unified login page with role selection."""
@@ -60,11 +79,13 @@ class CitizenOTPRequestView(View):
             messages.error(request, 'Enter a valid mobile number.')
             return render(request, 'accounts/citizen_otp.html', {'step': 'request'})
 
-        otp = generate_otp()
-        cache_key = f'otp:{mobile}'
-        cache.set(cache_key, otp, timeout=settings.OTP_EXPIRY_SECONDS)
+        try:
+            otp = request_otp(mobile, client_ip=get_client_ip(request))
+        except ValueError as e:
+            messages.error(request, str(e))
+            return render(request, 'accounts/citizen_otp.html', {'step': 'request'})
 
-        # In production, send OTP via SMS. For MVP, display it.
+        # Delivered by the notification dispatcher. For MVP, also display it.
         messages.success(request, f'OTP sent to {mobile}. Your OTP is: {otp}')
 
         request.session['otp_mobile'] = mobile
@@ -76,7 +97,10 @@ class CitizenOTPRequestView(View):
 
 
 class CitizenOTPVerifyView(View):
-    """Step 2: Citizen enters OTP, verified against Redis, JWT + session issued."""
+    """
+    Step 2: Citizen enters OTP, verified against Redis, session issued.
+    Mobile apps use CitizenOTPVerifyAPIView instead, which issues JWTs.
+    """
 
     def post(self, request):
         mobile = request.session.get('otp_mobile') or request.POST.get('mobile_number', '').strip()
@@ -86,41 +110,25 @@ class CitizenOTPVerifyView(View):
             messages.error(request, 'Mobile number and OTP are required.')
             return redirect('accounts:citizen_otp_request')
 
-        cache_key = f'otp:{mobile}'
-        stored_otp = cache.get(cache_key)
-
-        if stored_otp is None:
-            messages.error(request, 'OTP expired. Please request a new one.')
-            return redirect('accounts:citizen_otp_request')
-
-        if str(stored_otp) != str(otp_entered):
-            messages.error(request, 'Invalid OTP. Please try again.')
+        try:
+            check_otp(mobile, otp_entered)
+        except InvalidOTP as e:
+            messages.error(request, str(e))
             return render(request, 'accounts/citizen_otp.html', {
                 'step': 'verify',
                 'mobile_number': mobile,
             })
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('accounts:citizen_otp_request')
 
-        # OTP verified - delete from cache
-        cache.delete(cache_key)
-
-        # Get or create citizen user
-        user, created = User.objects.get_or_create(
-            mobile_number=mobile,
-            defaults={
-                'username': f'citizen_{mobile}',
-                'role': CITIZEN,
-            }
-        )
-
-        if created:
-            user.set_unusable_password()
-            user.save()
+        user = get_or_create_citizen(mobile)
 
         # Clean up session
         if 'otp_mobile' in request.session:
             del request.session['otp_mobile']
 
-        login(request, user)
+        login(request, user, backend=SESSION_BACKEND)
         messages.success(request, 'Login successful!')
         return redirect('dashboard:router')
 
@@ -179,7 +187,7 @@ class OrganizationRegisterView(View):
             organization=org,
         )
 
-        login(request, user)
+        login(request, user, backend=SESSION_BACKEND)
         messages.success(request, f'Organization "{org_name}" registered successfully!')
         return redirect('dashboard:router')
 
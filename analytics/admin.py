@@ -0,0 +1,30 @@
+from django.contrib import admin
+from .models import BranchHourlyStats, ServiceHourlyStats, RollupWatermark, WaitTimeProfile
+
+
+@admin.register(BranchHourlyStats)
+class BranchHourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('branch', 'hour', 'tickets_joined', 'tickets_served', 'tickets_no_show',
+                    'wait_mean_seconds', 'wait_p90_seconds')
+    list_filter = ('branch__organization',)
+    date_hierarchy = 'hour'
+
+
+@admin.register(ServiceHourlyStats)
+class ServiceHourlyStatsAdmin(admin.ModelAdmin):
+    list_display = ('service', 'branch', 'hour', 'tickets_joined', 'tickets_served', 'tickets_no_show',
+                    'wait_mean_seconds', 'wait_p90_seconds', 'handle_mean_seconds')
+    list_filter = ('branch__organization',)
+    date_hierarchy = 'hour'
+
+
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value', 'updated_at')
+
+
+@admin.register(WaitTimeProfile)
+class WaitTimeProfileAdmin(admin.ModelAdmin):
+    list_display = ('service', 'weekday', 'hour', 'sample_count', 'mean_seconds',
+                    'p50_seconds', 'p90_seconds', 'p95_seconds', 'computed_at')
+    list_filter = ('weekday', 'service__branch__organization')
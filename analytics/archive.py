@@ -0,0 +1,224 @@
+"""
+Columnar archive of closed tickets as memory-mapped NumPy files.
+
+Layout under the archive root:
+
+    manifest.json
+    2026-01/0001/ticket_id.npy
+    2026-01/0001/service_id.npy
+    ...
+
+Every export appends new segments (one directory of fixed-width .npy
+columns) to the months it touches and records them in the manifest, so a
+partial month grows incrementally without rewriting earlier segments.
+Readers open columns with mmap_mode='r': scanning years of history costs
+page cache, not resident memory.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from django.db.models import Q
+from django.utils import timezone
+
+from queues.models import QueueTicket
+
+FORMAT_NAME = 'waitfree-ticket-archive'
+FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# Column name → dtype. Timestamps are UTC epoch seconds, -1 when unset.
+COLUMNS = {
+    'ticket_id': '<i8',
+    'service_id': '<i8',
+    'branch_id': '<i8',
+    'joined_at': '<i8',
+    'called_at': '<i8',
+    'served_at': '<i8',
+    'status': '<i1',
+}
+
+STATUS_CODES = {
+    'waiting': 0,
+    'serving': 1,
+    'served': 2,
+    'no_show': 3,
+}
+
+
+def _epoch(value):
+    return int(value.timestamp()) if value else -1
+
+
+def _month_key(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y-%m')
+
+
+def _new_manifest():
+    return {
+        'format': FORMAT_NAME,
+        'version': FORMAT_VERSION,
+        'columns': COLUMNS,
+        'closed_through': None,
+        'months': {},
+    }
+
+
+def load_manifest(root):
+    """Read and validate the manifest; a missing archive yields an empty manifest."""
+    path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return _new_manifest()
+    with open(path) as fh:
+        manifest = json.load(fh)
+    if manifest.get('format') != FORMAT_NAME:
+        raise ValueError(f'{root} is not a ticket archive.')
+    if manifest.get('version') != FORMAT_VERSION:
+        raise ValueError(
+            f'Unsupported ticket archive version {manifest.get("version")} (expected {FORMAT_VERSION}).'
+        )
+    return manifest
+
+
+def _write_manifest(root, manifest):
+    path = os.path.join(root, MANIFEST_NAME)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class _SegmentBuffer:
+    """Rows collected for one month before they are flushed as a segment."""
+
+    block_rows = 8192
+
+    def __init__(self):
+        self.blocks = []
+        self.rows = 0
+        self._new_block()
+
+    def _new_block(self):
+        self.block = {name: np.empty(self.block_rows, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.filled = 0
+
+    def __len__(self):
+        return self.rows
+
+    def append(self, row):
+        for name, value in zip(COLUMNS, row):
+            self.block[name][self.filled] = value
+        self.filled += 1
+        self.rows += 1
+        if self.filled == self.block_rows:
+            self.blocks.append(self.block)
+            self._new_block()
+
+    def write(self, directory):
+        os.makedirs(directory)
+        blocks = self.blocks + [{name: array[:self.filled] for name, array in self.block.items()}]
+        for name in COLUMNS:
+            np.save(os.path.join(directory, f'{name}.npy'), np.concatenate([block[name] for block in blocks]))
+
+
+def export_closed_tickets(root, until=None, segment_rows=1_000_000, chunk_size=20000):
+    """
+    Append every ticket closed since the manifest's watermark to the archive.
+    Tickets are filed under the UTC month they joined in. Memory is bounded by
+    segment_rows per touched month.
+    Returns the number of tickets exported.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest = load_manifest(root)
+    until = until or timezone.now()
+    since = manifest['closed_through']
+    since = datetime.fromisoformat(since) if since else None
+
+    served = Q(status='served', served_at__lte=until)
+    no_show = Q(status='no_show', no_show_at__lte=until)
+    if since is not None:
+        served &= Q(served_at__gt=since)
+        no_show &= Q(no_show_at__gt=since)
+
+    rows = QueueTicket.objects.filter(served | no_show).values_list(
+        'id', 'service_id', 'branch_id', 'joined_at', 'called_at', 'served_at', 'status',
+    ).order_by().iterator(chunk_size=chunk_size)
+
+    buffers = {}
+    exported = 0
+
+    def flush(month):
+        buffer = buffers.pop(month)
+        entry = manifest['months'].setdefault(month, {'rows': 0, 'segments': []})
+        name = f'{len(entry["segments"]) + 1:04d}'
+        directory = os.path.join(root, month, name)
+        # A crashed export may have left an unregistered segment behind.
+        shutil.rmtree(directory, ignore_errors=True)
+        buffer.write(directory)
+        entry['segments'].append({'name': name, 'rows': len(buffer)})
+        entry['rows'] += len(buffer)
+
+    for ticket_id, service_id, branch_id, joined_at, called_at, served_at, status in rows:
+        month = _month_key(joined_at)
+        buffer = buffers.setdefault(month, _SegmentBuffer())
+        buffer.append((
+            ticket_id, service_id, branch_id,
+            _epoch(joined_at), _epoch(called_at), _epoch(served_at),
+            STATUS_CODES[status],
+        ))
+        exported += 1
+        if len(buffer) >= segment_rows:
+            flush(month)
+
+    for month in list(buffers):
+        flush(month)
+
+    # The manifest is replaced atomically and last: segments only become
+    # visible to readers once their rows are fully on disk.
+    manifest['closed_through'] = until.isoformat()
+    _write_manifest(root, manifest)
+    return exported
+
+
+class TicketArchive:
+    """Read-only, zero-copy access to an exported ticket archive."""
+
+    def __init__(self, root):
+        self.root = root
+        self.manifest = load_manifest(root)
+
+    @property
+    def months(self):
+        return sorted(self.manifest['months'])
+
+    @property
+    def total_rows(self):
+        return sum(entry['rows'] for entry in self.manifest['months'].values())
+
+    def segments(self, columns=None, start_month=None, end_month=None):
+        """
+        Yield one dict of memory-mapped column arrays per segment, oldest month first.
+        Months are 'YYYY-MM' strings; both bounds are inclusive.
+        """
+        columns = columns or list(COLUMNS)
+        for month in self.months:
+            if start_month and month < start_month:
+                continue
+            if end_month and month > end_month:
+                continue
+            for segment in self.manifest['months'][month]['segments']:
+                directory = os.path.join(self.root, month, segment['name'])
+                yield {
+                    name: np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r')
+                    for name in columns
+                }
+
+    def column(self, name, start_month=None, end_month=None):
+        """Concatenate one column across segments (this copies; prefer segments() for scans)."""
+        parts = [segment[name] for segment in self.segments([name], start_month, end_month)]
+        if not parts:
+            return np.empty(0, dtype=COLUMNS[name])
+        return np.concatenate(parts)
@@ -0,0 +1,163 @@
+"""
+FIFO fairness audit over ticket history.
+
+For one service, tickets are streamed in join order. The scan keeps the
+latest called_at seen so far and the ticket that holds it. A ticket called
+before that time overtook an earlier ticket: that is an inversion. A ticket
+that is still waiting counts as "not called" until the end of the service
+day it joined on, so anyone called that day after it joined has overtaken
+it; calls on later days do not, or one abandoned ticket would flag every
+call after it. The scan needs one pass and a running maximum. Inversions
+are counted, and only the first few per service are kept as a sample, so
+the state held stays O(counters) whatever the history size.
+
+Sampled inversions name the operator who called each ticket, taken from the
+CALL events of the queue event log once the scan is done.
+"""
+
+from datetime import timedelta
+
+from django.utils import timezone
+
+from accounts.models import User
+from queues.models import QueueEvent, QueueTicket
+
+SAMPLE_SIZE = 100
+
+
+class ServiceAudit:
+    """Result of auditing one service. Sampled inversions are kept as plain dicts."""
+
+    def __init__(self, service_id, branch_id, sample_size=SAMPLE_SIZE):
+        self.service_id = service_id
+        self.branch_id = branch_id
+        self.sample_size = sample_size
+        self.tickets = 0
+        self.called = 0
+        self.inversion_count = 0
+        self.inversions = []  # the first sample_size inversions
+        self.by_counter = {}  # counter_id -> inversions where that counter overtook
+
+    def as_dict(self):
+        return {
+            'service_id': self.service_id,
+            'branch_id': self.branch_id,
+            'tickets': self.tickets,
+            'called': self.called,
+            'inversion_count': self.inversion_count,
+            'inversions': self.inversions,
+            'by_counter': self.by_counter,
+        }
+
+
+def end_of_service_day(moment):
+    """Local midnight after moment: the latest a ticket joined at moment can still be called that day."""
+    day = timezone.localtime(moment).replace(hour=0, minute=0, second=0, microsecond=0)
+    return day + timedelta(days=1)
+
+
+def audit_service(service_id, branch_id, since=None, until=None, chunk_size=20000, sample_size=SAMPLE_SIZE):
+    """Stream one service's tickets in join order, counting inversions and sampling the first few."""
+    tickets = QueueTicket.objects.filter(service_id=service_id)
+    if since is not None:
+        tickets = tickets.filter(joined_at__gte=since)
+    if until is not None:
+        tickets = tickets.filter(joined_at__lt=until)
+    rows = tickets.order_by('joined_at', 'id').values_list(
+        'id', 'token_number', 'status', 'joined_at', 'called_at', 'counter_id',
+    ).iterator(chunk_size=chunk_size)
+
+    audit = ServiceAudit(service_id, branch_id, sample_size)
+    latest = None  # (effective, called_at, id, token, joined_at, counter_id) of the latest-called so far
+    for ticket_id, token, status, joined_at, called_at, counter_id in rows:
+        audit.tickets += 1
+        if called_at is not None:
+            audit.called += 1
+            effective = called_at
+        elif status == 'waiting':
+            effective = end_of_service_day(joined_at)
+        else:
+            continue  # closed without ever being called: nobody could overtake it
+
+        if latest is not None and effective < latest[0]:
+            if called_at is not None:
+                audit.inversion_count += 1
+                audit.by_counter[counter_id] = audit.by_counter.get(counter_id, 0) + 1
+                if len(audit.inversions) < sample_size:
+                    _, skipped_called_at, skipped_id, skipped_token, skipped_joined_at, skipped_counter = latest
+                    audit.inversions.append({
+                        'service_id': service_id,
+                        'branch_id': branch_id,
+                        'skipped_ticket_id': skipped_id,
+                        'skipped_token': skipped_token,
+                        'skipped_joined_at': skipped_joined_at.isoformat(),
+                        'skipped_called_at': None if skipped_called_at is None else skipped_called_at.isoformat(),
+                        'skipped_counter_id': skipped_counter,
+                        'skipped_operator': None,
+                        'ticket_id': ticket_id,
+                        'token': token,
+                        'joined_at': joined_at.isoformat(),
+                        'called_at': called_at.isoformat(),
+                        'counter_id': counter_id,
+                        'operator': None,
+                    })
+        else:
+            latest = (effective, called_at, ticket_id, token, joined_at, counter_id)
+
+    operators = callers({
+        ticket_id for inversion in audit.inversions for ticket_id in (inversion['skipped_ticket_id'], inversion['ticket_id'])
+    })
+    for inversion in audit.inversions:
+        inversion['skipped_operator'] = operators.get(inversion['skipped_ticket_id'])
+        inversion['operator'] = operators.get(inversion['ticket_id'])
+    return audit
+
+
+def callers(ticket_ids, batch_size=500):
+    """
+    Username of the operator who called each ticket, from its CALL event.
+    Users are read in a query of their own, as they may be on another
+    database than the tickets (core.sharding).
+    """
+    ticket_ids = list(ticket_ids)
+    actors = {}
+    for start in range(0, len(ticket_ids), batch_size):
+        actors.update(
+            QueueEvent.objects.filter(
+                kind=QueueEvent.CALL, ticket_id__in=ticket_ids[start:start + batch_size], actor_id__isnull=False,
+            ).values_list('ticket_id', 'actor_id')
+        )
+    usernames = dict(User.objects.filter(id__in=set(actors.values())).values_list('id', 'username'))
+    return {ticket_id: usernames.get(actor_id) for ticket_id, actor_id in actors.items()}
+
+
+def init_worker():
+    """Pool initializer; needed where workers are spawned rather than forked."""
+    import django
+
+    django.setup()
+
+
+def audit_service_task(args):
+    """ProcessPoolExecutor entry point: returns a picklable dict and releases the worker's connection."""
+    from django.db import connection
+
+    try:
+        return audit_service(*args).as_dict()
+    finally:
+        connection.close()
+
+
+def branch_summary(results):
+    """Per-branch tickets, called, inversions and inversion rate (inversions per called ticket)."""
+    branches = {}
+    for result in results:
+        summary = branches.setdefault(result['branch_id'], {
+            'branch_id': result['branch_id'], 'tickets': 0, 'called': 0, 'inversions': 0,
+        })
+        summary['tickets'] += result['tickets']
+        summary['called'] += result['called']
+        summary['inversions'] += result['inversion_count']
+    for summary in branches.values():
+        summary['inversion_rate'] = summary['inversions'] / summary['called'] if summary['called'] else 0.0
+    return sorted(branches.values(), key=lambda summary: summary['branch_id'])
@@ -0,0 +1,108 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from analytics.fifo import SAMPLE_SIZE, audit_service, audit_service_task, branch_summary, init_worker
+from counters.models import OperatorAssignment
+from facilities.models import Service
+
+INVERSION_COLUMNS = [
+    'service_id', 'branch_id',
+    'skipped_ticket_id', 'skipped_token', 'skipped_joined_at', 'skipped_called_at',
+    'skipped_counter_id', 'skipped_operator',
+    'ticket_id', 'token', 'joined_at', 'called_at', 'counter_id', 'operator',
+]
+
+
+class Command(BaseCommand):
+    help = 'Audits ticket history for FIFO violations (a later ticket called before an earlier one)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--service', type=int, action='append', dest='services',
+                            help='Service id to audit (repeatable). Defaults to all services.')
+        parser.add_argument('--days', type=int, help='Only tickets that joined in the last N days.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Parallel processes, one service at a time each (1 = in-process).')
+        parser.add_argument('--chunk-size', type=int, default=20000, help='Rows fetched per chunk.')
+        parser.add_argument('--sample', type=int, default=SAMPLE_SIZE,
+                            help='Inversions kept per service for --output; the rest are only counted.')
+        parser.add_argument('--output', help='Write the sampled inversions to this .json or .csv file.')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        if output and not output.endswith(('.json', '.csv')):
+            raise CommandError('--output must end with .json or .csv')
+
+        since = timezone.now() - timedelta(days=options['days']) if options['days'] else None
+        services = Service.objects.order_by('id')
+        if options['services']:
+            services = services.filter(id__in=options['services'])
+        tasks = [(service_id, branch_id, since, None, options['chunk_size'], options['sample'])
+                 for service_id, branch_id in services.values_list('id', 'branch_id')]
+
+        started = time.monotonic()
+        results = list(self._run(tasks, options['workers']))
+        elapsed = time.monotonic() - started
+
+        tickets = sum(result['tickets'] for result in results)
+        inversions = sum(result['inversion_count'] for result in results)
+        for summary in branch_summary(results):
+            self.stdout.write(
+                f'  branch {summary["branch_id"]}: {summary["called"]} called, '
+                f'{summary["inversions"]} inversions ({summary["inversion_rate"]:.4%})'
+            )
+        for operator, count in self._by_operator(results):
+            self.stdout.write(f'  operator {operator}: {count} inversions')
+        if output:
+            self._write(output, [inversion for result in results for inversion in result['inversions']])
+
+        message = (
+            f'Audited {tickets} tickets in {len(results)} services in {elapsed:.2f}s '
+            f'({tickets / elapsed if elapsed else 0:,.0f} tickets/s): {inversions} inversions.'
+        )
+        self.stdout.write(self.style.WARNING(message) if inversions else self.style.SUCCESS(message))
+
+    def _run(self, tasks, workers):
+        if workers <= 1 or len(tasks) <= 1:
+            for task in tasks:
+                yield audit_service(*task).as_dict()
+            return
+        # Forked workers must not share the parent's database connections.
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+            futures = [pool.submit(audit_service_task, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+
+    @staticmethod
+    def _by_operator(results):
+        by_counter = {}
+        for result in results:
+            for counter_id, count in result['by_counter'].items():
+                by_counter[counter_id] = by_counter.get(counter_id, 0) + count
+        names = dict(
+            OperatorAssignment.objects.filter(counter_id__in=[c for c in by_counter if c is not None])
+            .values_list('counter_id', 'user__username')
+        )
+        totals = {}
+        for counter_id, count in by_counter.items():
+            operator = names.get(counter_id) or f'counter {counter_id or "unknown"}'
+            totals[operator] = totals.get(operator, 0) + count
+        return sorted(totals.items(), key=lambda item: -item[1])
+
+    @staticmethod
+    def _write(path, inversions):
+        with open(path, 'w', newline='') as fh:
+            if path.endswith('.json'):
+                json.dump(inversions, fh, indent=2)
+            else:
+                writer = csv.DictWriter(fh, fieldnames=INVERSION_COLUMNS)
+                writer.writeheader()
+                writer.writerows(inversions)
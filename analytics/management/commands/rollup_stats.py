@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import rollup_hourly_stats
+
+
+class Command(BaseCommand):
+    help = 'Folds tickets closed since the last watermark into the hourly branch/service rollups'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Ignore the watermark and rebuild rollups from all ticket history.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        branch_rows, service_rows = rollup_hourly_stats(full=options['full'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rolled up {branch_rows} branch-hours and {service_rows} service-hours in {elapsed:.2f}s.'
+        ))
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('facilities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'waitfree_rollup_watermark',
+            },
+        ),
+        migrations.CreateModel(
+            name='ServiceHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour bucket (by joined_at)')),
+                ('tickets_joined', models.PositiveIntegerField(default=0)),
+                ('tickets_served', models.PositiveIntegerField(default=0)),
+                ('tickets_no_show', models.PositiveIntegerField(default=0)),
+                ('wait_count', models.PositiveIntegerField(default=0)),
+                ('wait_total_seconds', models.BigIntegerField(default=0)),
+                ('wait_mean_seconds', models.PositiveIntegerField(default=0)),
+                ('wait_p90_seconds', models.PositiveIntegerField(default=0)),
+                ('handle_count', models.PositiveIntegerField(default=0)),
+                ('handle_total_seconds', models.BigIntegerField(default=0)),
+                ('handle_mean_seconds', models.PositiveIntegerField(default=0)),
+                ('handle_p90_seconds', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_hourly_stats', to='facilities.branch')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='facilities.service')),
+            ],
+            options={
+                'verbose_name_plural': 'service hourly stats',
+                'db_table': 'waitfree_service_hourly_stats',
+                'ordering': ['hour'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['branch', 'hour'], name='waitfree_se_branch__7c0e97_idx')],
+                'unique_together': {('service', 'hour')},
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchHourlyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour bucket (by joined_at)')),
+                ('tickets_joined', models.PositiveIntegerField(default=0)),
+                ('tickets_served', models.PositiveIntegerField(default=0)),
+                ('tickets_no_show', models.PositiveIntegerField(default=0)),
+                ('wait_count', models.PositiveIntegerField(default=0)),
+                ('wait_total_seconds', models.BigIntegerField(default=0)),
+                ('wait_mean_seconds', models.PositiveIntegerField(default=0)),
+                ('wait_p90_seconds', models.PositiveIntegerField(default=0)),
+                ('handle_count', models.PositiveIntegerField(default=0)),
+                ('handle_total_seconds', models.BigIntegerField(default=0)),
+                ('handle_mean_seconds', models.PositiveIntegerField(default=0)),
+                ('handle_p90_seconds', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_stats', to='facilities.branch')),
+            ],
+            options={
+                'verbose_name_plural': 'branch hourly stats',
+                'db_table': 'waitfree_branch_hourly_stats',
+                'ordering': ['hour'],
+                'abstract': False,
+                'unique_together': {('branch', 'hour')},
+            },
+        ),
+    ]
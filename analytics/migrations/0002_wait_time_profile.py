@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0001_initial'),
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitTimeProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(help_text='0 = Monday … 6 = Sunday')),
+                ('hour', models.PositiveSmallIntegerField(help_text='Local hour of day the ticket joined')),
+                ('sample_count', models.PositiveIntegerField(default=0)),
+                ('mean_seconds', models.PositiveIntegerField(default=0)),
+                ('p50_seconds', models.PositiveIntegerField(default=0)),
+                ('p90_seconds', models.PositiveIntegerField(default=0)),
+                ('p95_seconds', models.PositiveIntegerField(default=0)),
+                ('histogram', models.JSONField(default=list, help_text='Ticket counts per wait bin')),
+                ('bin_seconds', models.PositiveIntegerField(default=60)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='wait_profiles', to='facilities.service')),
+            ],
+            options={
+                'db_table': 'waitfree_wait_time_profile',
+                'ordering': ['service', 'weekday', 'hour'],
+                'unique_together': {('service', 'weekday', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_wait_time_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branchhourlystats',
+            name='wait_histogram',
+            field=models.JSONField(default=dict),
+        ),
+        migrations.AddField(
+            model_name='servicehourlystats',
+            name='wait_histogram',
+            field=models.JSONField(default=dict),
+        ),
+    ]
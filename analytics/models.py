@@ -0,0 +1,115 @@
+"""
+Analytics models: hourly rollups and wait-time profiles of queue activity.
+Rows are derived from QueueTicket by the `rollup_stats` and `analyze_waits`
+commands and are safe to rebuild at any time.
+"""
+
+from django.db import models
+
+
+class HourlyStatsBase(models.Model):
+    """Ticket counts and wait/handle time statistics for one hour bucket."""
+    hour = models.DateTimeField(help_text='Start of the hour bucket (by joined_at)')
+    tickets_joined = models.PositiveIntegerField(default=0)
+    tickets_served = models.PositiveIntegerField(default=0)
+    tickets_no_show = models.PositiveIntegerField(default=0)
+    # Wait = joined → called, handle = called → served. Totals and counts are
+    # kept alongside the means so buckets can be merged into longer periods.
+    wait_count = models.PositiveIntegerField(default=0)
+    wait_total_seconds = models.BigIntegerField(default=0)
+    wait_mean_seconds = models.PositiveIntegerField(default=0)
+    wait_p90_seconds = models.PositiveIntegerField(default=0)
+    # Waits per whole minute (see analytics.rollups.wait_histogram): p90 over
+    # several buckets is read off their summed histograms, never averaged.
+    wait_histogram = models.JSONField(default=dict)
+    handle_count = models.PositiveIntegerField(default=0)
+    handle_total_seconds = models.BigIntegerField(default=0)
+    handle_mean_seconds = models.PositiveIntegerField(default=0)
+    handle_p90_seconds = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['hour']
+
+
+class BranchHourlyStats(HourlyStatsBase):
+    branch = models.ForeignKey(
+        'facilities.Branch',
+        on_delete=models.CASCADE,
+        related_name='hourly_stats',
+    )
+
+    class Meta(HourlyStatsBase.Meta):
+        db_table = 'waitfree_branch_hourly_stats'
+        verbose_name_plural = 'branch hourly stats'
+        unique_together = ['branch', 'hour']
+
+    def __str__(self):
+        return f"{self.branch.name} @ {self.hour:%Y-%m-%d %H:00}"
+
+
+class ServiceHourlyStats(HourlyStatsBase):
+    service = models.ForeignKey(
+        'facilities.Service',
+        on_delete=models.CASCADE,
+        related_name='hourly_stats',
+    )
+    branch = models.ForeignKey(
+        'facilities.Branch',
+        on_delete=models.CASCADE,
+        related_name='service_hourly_stats',
+    )
+
+    class Meta(HourlyStatsBase.Meta):
+        db_table = 'waitfree_service_hourly_stats'
+        verbose_name_plural = 'service hourly stats'
+        unique_together = ['service', 'hour']
+        indexes = [
+            models.Index(fields=['branch', 'hour']),
+        ]
+
+    def __str__(self):
+        return f"{self.service.name} @ {self.hour:%Y-%m-%d %H:00}"
+
+
+class RollupWatermark(models.Model):
+    """Highest ticket close time already folded into a rollup."""
+    name = models.CharField(max_length=50, unique=True)
+    value = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'waitfree_rollup_watermark'
+
+    def __str__(self):
+        return f"{self.name} @ {self.value}"
+
+
+class WaitTimeProfile(models.Model):
+    """Wait-time distribution for one service at one (weekday, hour) slot."""
+    service = models.ForeignKey(
+        'facilities.Service',
+        on_delete=models.CASCADE,
+        related_name='wait_profiles',
+    )
+    weekday = models.PositiveSmallIntegerField(help_text='0 = Monday … 6 = Sunday')
+    hour = models.PositiveSmallIntegerField(help_text='Local hour of day the ticket joined')
+    sample_count = models.PositiveIntegerField(default=0)
+    mean_seconds = models.PositiveIntegerField(default=0)
+    p50_seconds = models.PositiveIntegerField(default=0)
+    p90_seconds = models.PositiveIntegerField(default=0)
+    p95_seconds = models.PositiveIntegerField(default=0)
+    histogram = models.JSONField(default=list, help_text='Ticket counts per wait bin')
+    bin_seconds = models.PositiveIntegerField(default=60)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'waitfree_wait_time_profile'
+        unique_together = ['service', 'weekday', 'hour']
+        ordering = ['service', 'weekday', 'hour']
+
+    def __str__(self):
+        return f"{self.service.name} wd{self.weekday} {self.hour:02d}:00 (p90 {self.p90_seconds}s)"
@@ -0,0 +1,127 @@
+"""
+Vectorized wait-time distributions over ticket history.
+
+Tickets are streamed per service in fixed-size chunks and folded into a
+(weekday, hour, wait bin) histogram with NumPy, so memory depends only on the
+histogram shape — never on how many tickets are scanned. Percentiles are then
+read off the cumulative histograms for all 168 slots at once.
+"""
+
+import numpy as np
+from django.db.models.functions import ExtractHour, ExtractIsoWeekDay
+
+from queues.models import QueueTicket
+
+WEEKDAYS = 7
+HOURS = 24
+PERCENTILES = (50, 90, 95)
+
+
+class WaitHistogram:
+    """Accumulates wait times into fixed-width bins per (weekday, hour)."""
+
+    def __init__(self, bin_seconds=60, max_wait_seconds=4 * 3600):
+        self.bin_seconds = bin_seconds
+        # The last bin collects every wait at or above max_wait_seconds.
+        self.n_bins = max_wait_seconds // bin_seconds + 1
+        self.counts = np.zeros((WEEKDAYS, HOURS, self.n_bins), dtype=np.int64)
+        self.sums = np.zeros((WEEKDAYS, HOURS), dtype=np.float64)
+
+    def add(self, weekdays, hours, waits):
+        """Fold one chunk of parallel arrays (weekday 0-6, hour 0-23, wait seconds)."""
+        waits = np.clip(waits, 0, None)
+        bins = np.minimum(waits // self.bin_seconds, self.n_bins - 1).astype(np.int64)
+        slot = weekdays * HOURS + hours
+        self.counts += np.bincount(
+            slot * self.n_bins + bins,
+            minlength=WEEKDAYS * HOURS * self.n_bins,
+        ).reshape(self.counts.shape)
+        self.sums += np.bincount(slot, weights=waits, minlength=WEEKDAYS * HOURS).reshape(self.sums.shape)
+
+    @property
+    def sample_counts(self):
+        return self.counts.sum(axis=2)
+
+    def means(self):
+        totals = self.sample_counts
+        return np.divide(self.sums, totals, out=np.zeros_like(self.sums), where=totals > 0)
+
+    def percentile(self, pct):
+        """Upper edge of the bin holding the pct-th percentile, per slot (0 when empty)."""
+        cumulative = self.counts.cumsum(axis=2)
+        target = np.ceil(cumulative[..., -1] * pct / 100.0)
+        index = (cumulative < target[..., None]).sum(axis=2)
+        edges = (np.minimum(index, self.n_bins - 1) + 1) * self.bin_seconds
+        return np.where(cumulative[..., -1] > 0, edges, 0)
+
+
+def stream_waits(service_id, since, until, chunk_size=20000):
+    """
+    Yield (weekdays, hours, waits) NumPy chunks for called tickets of a service.
+    Weekday and hour are extracted by the database in the active time zone.
+    The chunk buffers are reused, so consume each chunk before the next.
+    """
+    rows = QueueTicket.objects.filter(
+        service_id=service_id,
+        status__in=['serving', 'served', 'no_show'],
+        joined_at__gte=since,
+        joined_at__lt=until,
+        called_at__isnull=False,
+    ).annotate(
+        iso_weekday=ExtractIsoWeekDay('joined_at'),
+        joined_hour=ExtractHour('joined_at'),
+    ).values_list(
+        'iso_weekday', 'joined_hour', 'joined_at', 'called_at',
+    ).order_by().iterator(chunk_size=chunk_size)
+
+    weekdays = np.empty(chunk_size, dtype=np.int64)
+    hours = np.empty(chunk_size, dtype=np.int64)
+    waits = np.empty(chunk_size, dtype=np.float64)
+    filled = 0
+    for iso_weekday, hour, joined_at, called_at in rows:
+        weekdays[filled] = iso_weekday - 1
+        hours[filled] = hour
+        waits[filled] = (called_at - joined_at).total_seconds()
+        filled += 1
+        if filled == chunk_size:
+            yield weekdays, hours, waits
+            filled = 0
+    if filled:
+        yield weekdays[:filled], hours[:filled], waits[:filled]
+
+
+def analyze_service(service_id, since, until, bin_seconds=60, max_wait_seconds=4 * 3600, chunk_size=20000):
+    """
+    Build the wait histogram of one service.
+    Returns (histogram, tickets_scanned).
+    """
+    histogram = WaitHistogram(bin_seconds=bin_seconds, max_wait_seconds=max_wait_seconds)
+    scanned = 0
+    for weekdays, hours, waits in stream_waits(service_id, since, until, chunk_size=chunk_size):
+        histogram.add(weekdays, hours, waits)
+        scanned += len(waits)
+    return histogram, scanned
+
+
+def profile_rows(histogram):
+    """
+    Flatten a histogram into one dict per non-empty (weekday, hour) slot,
+    matching the WaitTimeProfile fields.
+    """
+    counts = histogram.sample_counts
+    means = histogram.means()
+    pcts = {pct: histogram.percentile(pct) for pct in PERCENTILES}
+    rows = []
+    for weekday, hour in zip(*np.nonzero(counts)):
+        rows.append({
+            'weekday': int(weekday),
+            'hour': int(hour),
+            'sample_count': int(counts[weekday, hour]),
+            'mean_seconds': int(round(means[weekday, hour])),
+            'p50_seconds': int(pcts[50][weekday, hour]),
+            'p90_seconds': int(pcts[90][weekday, hour]),
+            'p95_seconds': int(pcts[95][weekday, hour]),
+            'histogram': np.trim_zeros(histogram.counts[weekday, hour], 'b').tolist(),
+            'bin_seconds': histogram.bin_seconds,
+        })
+    return rows
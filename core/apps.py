@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+
+
+def reserve_shard_id_range(sender, using, **kwargs):
+    from . import sharding
+
+    if using in sharding.shards():
+        sharding.reserve_id_range(using)
 
 
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Once per migrate, after every app's tables exist.
+        post_migrate.connect(reserve_shard_id_range, sender=self, dispatch_uid='reserve_shard_id_range')
@@ -0,0 +1,69 @@
+"""
+DRF authentication for stateless API clients (the citizen mobile app).
+"""
+
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from core.roles import CITIZEN
+
+# Claims every WaitFree token carries besides the user id.
+TENANT_CLAIMS = ('role', 'organization_id', 'branch_id')
+
+
+def tokens_for_user(user):
+    """A refresh/access token pair whose claims carry the user's role and tenant ids."""
+    refresh = RefreshToken.for_user(user)
+    refresh['role'] = user.role
+    refresh['organization_id'] = user.organization_id
+    refresh['branch_id'] = user.branch_id
+    return {'refresh': str(refresh), 'access': str(refresh.access_token)}
+
+
+class ClaimsUser(TokenUser):
+    """
+    The request user as stated by a validated token: id, role, organization
+    and branch come from its claims. The database row is loaded only when a
+    view asks for `instance`, e.g. to join a queue.
+    """
+
+    role = cached_property(lambda self: self.token['role'])
+    organization_id = cached_property(lambda self: self.token['organization_id'])
+    branch_id = cached_property(lambda self: self.token['branch_id'])
+
+    @property
+    def is_citizen_user(self):
+        return self.role == CITIZEN
+
+    @cached_property
+    def instance(self):
+        """The User row (through the cached user backend); fails if it was deleted or deactivated."""
+        from core.backends import CachedUserBackend
+
+        user = CachedUserBackend().get_user(self.id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found or inactive.'), code='user_inactive')
+        return user
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    Bearer-token authentication that reads neither the session nor the user
+    row. Claims are fixed at sign-in (refreshed access tokens copy them), so
+    a role or branch change applies from the next sign-in, and a deactivated
+    user keeps read-only access until their access token expires.
+    """
+
+    def get_user(self, validated_token):
+        missing = [
+            claim for claim in (api_settings.USER_ID_CLAIM, *TENANT_CLAIMS) if claim not in validated_token
+        ]
+        if missing:
+            raise InvalidToken(_('Token is missing claims: %s') % ', '.join(missing))
+        return ClaimsUser(validated_token)
@@ -0,0 +1,28 @@
+"""
+Authentication backends.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from . import cache as versioned_cache
+
+
+class CachedUserBackend(ModelBackend):
+    """
+    ModelBackend whose per-request user lookup is served from the versioned
+    cache. The entry is keyed by the user's version, which is bumped whenever
+    the user is saved or deleted (see accounts.models), so a password change
+    or deactivation takes effect on the next request. The whole User row is
+    cached, password hash included, so the cache must be as private as the
+    database.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+
+        def load():
+            return UserModel._default_manager.filter(pk=user_id).first()
+
+        user = versioned_cache.get_or_set('auth_user', load, user_id, user=user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
@@ -0,0 +1,131 @@
+"""
+Versioned cache keys scoped to organization, branch, service and user.
+
+Every scope has a version number in the cache. Cached values are stored
+under keys that include the versions of the scopes they were built from.
+Code that changes a scope's data calls bump(): it increments those
+versions, so every dependent key changes at once. Old entries are never
+read again and simply expire. Invalidation is one increment per scope,
+whatever the number of cached pages.
+
+What bumps what:
+- queue changes (engine): service and its branch, since branch pages
+  summarise their services;
+- counter, service and operator changes (facilities views): branch, plus
+  the service concerned;
+- organization and branch-list changes: organization;
+- saving or deleting a user (accounts.models signal): user.
+A cached value must name every scope whose data it shows.
+
+Values are always built from the primary database, never a read replica
+(core.replicas).
+
+Branch and service ids are only unique within a database shard
+(core.sharding), so their versions and the keys built on them carry the
+active shard's prefix.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from . import metrics, replicas, sharding
+
+DEFAULTS = {
+    'TIMEOUT': 300,  # seconds a cached value may live; versions make it stale-proof regardless
+}
+
+SCOPES = ('organization', 'branch', 'service', 'user')
+SHARD_SCOPES = ('branch', 'service')
+
+
+def cache_setting(name):
+    return getattr(settings, 'VERSIONED_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def _version_key(scope, pk):
+    prefix = sharding.key_prefix() if scope in SHARD_SCOPES else ''
+    return f'cachever:{prefix}{scope}:{pk}'
+
+
+def _fresh_version():
+    # Seeded from the clock: a version evicted from the cache and recreated
+    # never repeats a value an old entry was stored under.
+    return time.time_ns() // 1000
+
+
+def _scoped(organization, branch, service, user):
+    return [
+        (scope, pk) for scope, pk in zip(SCOPES, (organization, branch, service, user)) if pk is not None
+    ]
+
+
+def get_versions(organization=None, branch=None, service=None, user=None):
+    """Current versions of the given scope ids, as {version_key: version}. One cache round trip."""
+    keys = [_version_key(scope, pk) for scope, pk in _scoped(organization, branch, service, user)]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def get_version(scope, pk):
+    """Current version of one scope ('organization', 'branch', 'service' or 'user')."""
+    return get_versions(**{scope: pk})[_version_key(scope, pk)]
+
+
+def make_key(name, *parts, organization=None, branch=None, service=None, user=None):
+    """Cache key for `name` and `parts`, tied to the versions of the given scope ids."""
+    versions = get_versions(organization, branch, service, user)
+    scoped = ':'.join(
+        f'{scope[0]}{pk}v{versions[_version_key(scope, pk)]}'
+        for scope, pk in _scoped(organization, branch, service, user)
+    )
+    return sharding.key_prefix() + ':'.join(['vc', name, *map(str, parts), scoped])
+
+
+def get_or_set(name, build, *parts, organization=None, branch=None, service=None, user=None, timeout=None):
+    """
+    The cached value for `name`/`parts` under the current scope versions,
+    calling build() and storing its result on a miss.
+    """
+    key = make_key(name, *parts, organization=organization, branch=branch, service=service, user=user)
+    value = cache.get(key)
+    if value is not None:
+        metrics.inc('waitfree_cache_requests_total', cache=name, result='hit')
+        return value
+    metrics.inc('waitfree_cache_requests_total', cache=name, result='miss')
+    with replicas.use_primary():  # a shared value must not capture replication lag
+        value = build()
+    cache.set(key, value, timeout=cache_setting('TIMEOUT') if timeout is None else timeout)
+    return value
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:  # never read, or evicted: any fresh value invalidates
+            cache.set(key, _fresh_version(), timeout=None)
+
+
+def bump(organization=None, branch=None, service=None, user=None):
+    """
+    Invalidate everything cached under the given scope ids.
+    Inside a transaction the versions are bumped again on commit: a reader
+    that cached pre-commit data under the first bump must not keep it.
+    """
+    keys = [_version_key(scope, pk) for scope, pk in _scoped(organization, branch, service, user)]
+    _bump(keys)
+    for using in {'default', sharding.tenant_db()}:
+        if transaction.get_connection(using).in_atomic_block:
+            transaction.on_commit(lambda: _bump(keys), using=using)
+
+
+def bump_service(service):
+    """A service's queue changed: its own and its branch's cached views are stale."""
+    bump(branch=service.branch_id, service=service.id)
@@ -0,0 +1,300 @@
+"""
+HTTP load generator for the real views.
+
+Each worker thread is one virtual user holding a citizen session (logged in
+through the OTP flow) and an operator session (logged in with a password).
+It picks actions from a weighted mix and drives the views through the
+Django test client, so middleware, sessions, templates and the queue
+engine are all exercised; only the socket is skipped. Every thread has its
+own database connection. Concurrent writers therefore contend for locks
+just as request threads in a server would.
+
+bench_session_mode() is a single-user probe instead: it counts the queries
+and latency of the ticket page under one session engine.
+"""
+
+import logging
+import random
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.db import OperationalError, connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve, reverse
+
+from analytics.rollups import percentile
+
+ACTIONS = ('poll', 'branch', 'join', 'serve')
+DEFAULT_MIX = {'poll': 60, 'branch': 15, 'join': 15, 'serve': 10}
+
+# Backend messages for "gave up waiting on a lock" (SQLite, PostgreSQL, MySQL).
+LOCK_ERRORS = ('database is locked', 'database table is locked', 'lock timeout', 'lock wait timeout', 'deadlock')
+
+OTP_PATTERN = re.compile(r'Your OTP is: (\d+)')
+
+
+def parse_mix(value):
+    """'poll=60,serve=10' → {'poll': 60, 'serve': 10}. Raises ValueError on unknown actions."""
+    mix = {}
+    for part in value.split(','):
+        action, _, weight = part.partition('=')
+        action = action.strip()
+        if action not in ACTIONS:
+            raise ValueError(f'Unknown action "{action}"; expected one of {", ".join(ACTIONS)}.')
+        mix[action] = float(weight)
+    if not any(mix.values()):
+        raise ValueError('The mix needs at least one action with a positive weight.')
+    return mix
+
+
+def is_lock_timeout(exc):
+    return isinstance(exc, OperationalError) and any(text in str(exc).lower() for text in LOCK_ERRORS)
+
+
+class Recorder:
+    """Latency samples and failures per endpoint, for one worker."""
+
+    def __init__(self):
+        self.samples = {}  # endpoint -> [seconds, ...]
+        self.errors = {}
+        self.lock_timeouts = {}
+
+    def record(self, endpoint, seconds, response):
+        self.samples.setdefault(endpoint, []).append(seconds)
+        exc_info = getattr(response, 'exc_info', None)
+        if exc_info and is_lock_timeout(exc_info[1]):
+            self.lock_timeouts[endpoint] = self.lock_timeouts.get(endpoint, 0) + 1
+        elif exc_info or response.status_code >= 400:
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+    def as_dict(self):
+        return {'samples': self.samples, 'errors': self.errors, 'lock_timeouts': self.lock_timeouts}
+
+
+class VirtualUser:
+    """One simulated person (or pair: citizen and operator) issuing requests."""
+
+    def __init__(self, index, plan, recorder):
+        self.plan = plan
+        self.recorder = recorder
+        self.random = random.Random(plan['seed'] + index)
+        self.mobile = f'7{plan["seed"] % 100:02d}{index:07d}'
+        remote_addr = f'10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}'
+        # raise_request_exception=False: a failing view becomes a 500 with exc_info, as in production.
+        self.citizen = Client(raise_request_exception=False, REMOTE_ADDR=remote_addr)
+        self.operator = Client(raise_request_exception=False, REMOTE_ADDR=remote_addr)
+        self.operator_username = plan['operators'][index % len(plan['operators'])] if plan['operators'] else None
+        self.tickets = []
+
+    def _request(self, endpoint, client, method, path, data=None):
+        started = time.perf_counter()
+        response = getattr(client, method)(path, data or {})
+        self.recorder.record(endpoint, time.perf_counter() - started, response)
+        return response
+
+    def login(self):
+        """Log in whichever roles the mix needs. Returns False if any login failed."""
+        citizen_actions = any(self.plan['mix'].get(action) for action in ('poll', 'branch', 'join'))
+        if citizen_actions and not self._login_citizen():
+            return False
+        if self.plan['mix'].get('serve') and not self._login_operator():
+            return False
+        return True
+
+    def _login_citizen(self):
+        response = self._request('otp_request', self.citizen, 'post', reverse('accounts:citizen_otp_request'), {
+            'mobile_number': self.mobile,
+        })
+        match = OTP_PATTERN.search(response.content.decode())
+        if not match:
+            return False
+        self._request('otp_verify', self.citizen, 'post', reverse('accounts:citizen_otp_verify'), {
+            'otp': match.group(1),
+        })
+        return '_auth_user_id' in self.citizen.session
+
+    def _login_operator(self):
+        self._request('password_login', self.operator, 'post', reverse('accounts:login'), {
+            'login_type': 'password',
+            'username': self.operator_username,
+            'password': self.plan['password'],
+        })
+        return '_auth_user_id' in self.operator.session
+
+    def step(self):
+        action = self.random.choices(list(self.plan['mix']), weights=list(self.plan['mix'].values()))[0]
+        getattr(self, action)()
+
+    def poll(self):
+        if not self.tickets:
+            return self.join()
+        self._request('ticket', self.citizen, 'get', reverse('queues:ticket', args=[self.tickets[-1]]))
+
+    def branch(self):
+        branch_id = self.random.choice(self.plan['branches'])
+        self._request('branch', self.citizen, 'get', reverse('facilities:branch_detail', args=[branch_id]))
+
+    def join(self):
+        service_id = self.random.choice(self.plan['services'])
+        response = self._request('join', self.citizen, 'post', reverse('queues:join_queue'), {
+            'service_id': service_id,
+        })
+        if response.status_code == 302:
+            try:
+                match = resolve(response['Location'])
+            except Resolver404:
+                return
+            if match.url_name == 'ticket':
+                self.tickets.append(match.kwargs['ticket_id'])
+
+    def serve(self):
+        response = self._request('serve', self.operator, 'post', reverse('queues:serve_next'))
+        if response.status_code == 302:
+            # The browser follows the redirect; that page load is part of the click.
+            self._request('operator_dashboard', self.operator, 'get', response['Location'])
+
+
+def run_worker(index, plan):
+    """
+    Log one virtual user in and run its mix until plan['duration'] seconds
+    pass or plan['requests'] steps are done. Returns Recorder.as_dict().
+    """
+    recorder = Recorder()
+    user = VirtualUser(index, plan, recorder)
+    if not user.login():
+        return recorder.as_dict()
+    deadline = time.monotonic() + plan['duration'] if plan.get('duration') else None
+    steps = 0
+    while (deadline is None or time.monotonic() < deadline) and steps < (plan.get('requests') or float('inf')):
+        user.step()
+        steps += 1
+        if plan.get('think_seconds'):
+            time.sleep(user.random.expovariate(1 / plan['think_seconds']))
+    return recorder.as_dict()
+
+
+def _run_thread(index, plan, results):
+    try:
+        results[index] = run_worker(index, plan)
+    finally:
+        connection.close()
+
+
+def run_threads(plan, threads, first_index=0):
+    """Run `threads` virtual users concurrently in this process; returns their merged results."""
+    results = {}
+    workers = [
+        threading.Thread(target=_run_thread, args=(first_index + i, plan, results), daemon=True)
+        for i in range(threads)
+    ]
+    # Failed requests are counted in the report; a traceback per 500 would bury it.
+    request_logger = logging.getLogger('django.request')
+    disabled, request_logger.disabled = request_logger.disabled, True
+    try:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    finally:
+        request_logger.disabled = disabled
+    return merge(results.values())
+
+
+def init_process():
+    """Pool initializer; needed where workers are spawned rather than forked."""
+    import django
+
+    django.setup()
+
+
+def run_process(args):
+    """ProcessPoolExecutor entry point: (plan, threads, first_index) → merged results."""
+    return run_threads(*args)
+
+
+def merge(results):
+    merged = {'samples': {}, 'errors': {}, 'lock_timeouts': {}}
+    for result in results:
+        for endpoint, samples in result['samples'].items():
+            merged['samples'].setdefault(endpoint, []).extend(samples)
+        for key in ('errors', 'lock_timeouts'):
+            for endpoint, count in result[key].items():
+                merged[key][endpoint] = merged[key].get(endpoint, 0) + count
+    return merged
+
+
+def summarize(results, elapsed):
+    """Per-endpoint throughput, latency percentiles (ms) and failure rates."""
+    endpoints = {}
+    for endpoint, samples in sorted(results['samples'].items()):
+        samples = sorted(samples)
+        errors = results['errors'].get(endpoint, 0)
+        lock_timeouts = results['lock_timeouts'].get(endpoint, 0)
+        endpoints[endpoint] = {
+            'requests': len(samples),
+            'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+            'p50_ms': round(percentile(samples, 50) * 1000, 2),
+            'p95_ms': round(percentile(samples, 95) * 1000, 2),
+            'p99_ms': round(percentile(samples, 99) * 1000, 2),
+            'max_ms': round(samples[-1] * 1000, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(samples), 4),
+            'lock_timeouts': lock_timeouts,
+            'lock_timeout_rate': round(lock_timeouts / len(samples), 4),
+        }
+    total = sum(endpoint['requests'] for endpoint in endpoints.values())
+    return {
+        'elapsed_seconds': round(elapsed, 2),
+        'requests': total,
+        'throughput_rps': round(total / elapsed, 2) if elapsed else 0.0,
+        'errors': sum(endpoint['errors'] for endpoint in endpoints.values()),
+        'lock_timeouts': sum(endpoint['lock_timeouts'] for endpoint in endpoints.values()),
+        'endpoints': endpoints,
+    }
+
+
+def bench_session_mode(mode, ticket, requests, backend=None):
+    """
+    Sign the ticket's citizen in under session mode `mode` (a key of
+    settings.SESSION_MODES) and load their ticket page `requests` times
+    after one warm-up load. Returns queries per request, split by table,
+    and latency percentiles (ms).
+    """
+    overrides = {'SESSION_ENGINE': settings.SESSION_MODES[mode]}
+    if backend:
+        overrides['AUTHENTICATION_BACKENDS'] = [backend]
+    url = reverse('queues:ticket', args=[ticket.id])
+    with override_settings(**overrides):
+        client = Client()  # built inside the override: SessionMiddleware reads the engine once
+        client.force_login(ticket.citizen)
+        client.get(url)
+        samples, queries = [], []
+        for _ in range(requests):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise RuntimeError(f'{mode}: ticket page returned {response.status_code}')
+            queries.append([query['sql'] for query in captured.captured_queries])
+    samples.sort()
+    return {
+        'mode': mode,
+        'engine': overrides['SESSION_ENGINE'],
+        'requests': requests,
+        'queries_per_request': round(sum(map(len, queries)) / requests, 2),
+        'session_queries_per_request': round(_count_table(queries, Session._meta.db_table) / requests, 2),
+        'user_queries_per_request': round(_count_table(queries, get_user_model()._meta.db_table) / requests, 2),
+        'p50_ms': round(percentile(samples, 50) * 1000, 2),
+        'p99_ms': round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+def _count_table(queries, table):
+    source = f'FROM {connection.ops.quote_name(table)}'
+    return sum(1 for request in queries for sql in request if source in sql)
@@ -0,0 +1,46 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.loadtest import bench_session_mode
+from queues.models import QueueTicket
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares session modes (settings.SESSION_MODES) on the citizen ticket page: '
+        'database queries per request (session and user lookups counted separately) '
+        'and p50/p99 latency. Signs existing citizens in, so it writes session rows.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', dest='modes', choices=sorted(settings.SESSION_MODES),
+                            help='Session mode to measure (repeatable). Defaults to all of them.')
+        parser.add_argument('--requests', type=int, default=500, help='Ticket page loads per mode.')
+        parser.add_argument('--backend', help='Authentication backend to use instead of AUTHENTICATION_BACKENDS, '
+                                              'e.g. django.contrib.auth.backends.ModelBackend.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        modes = options['modes'] or list(settings.SESSION_MODES)
+        # A different citizen per mode, so no mode starts with another's warm cache entries.
+        tickets = list(
+            QueueTicket.objects.filter(status='waiting').select_related('citizen').order_by('id')[:len(modes)]
+        )
+        if len(tickets) < len(modes):
+            raise CommandError(f'Needs {len(modes)} waiting tickets; run seed_demo_data first.')
+
+        report = [
+            bench_session_mode(mode, ticket, max(1, options['requests']), options['backend'])
+            for mode, ticket in zip(modes, tickets)
+        ]
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        for row in report:
+            self.stdout.write(
+                f'  {row["mode"]:<10} {row["queries_per_request"]:>5.2f} queries/req '
+                f'(session {row["session_queries_per_request"]:.2f}, user {row["user_queries_per_request"]:.2f})  '
+                f'p50 {row["p50_ms"]:.2f} ms  p99 {row["p99_ms"]:.2f} ms'
+            )
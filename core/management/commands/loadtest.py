@@ -0,0 +1,104 @@
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+from core.loadtest import DEFAULT_MIX, init_process, merge, parse_mix, run_process, run_threads, summarize
+from counters.models import OperatorAssignment
+from facilities.models import Service
+
+
+class Command(BaseCommand):
+    help = (
+        'Drives the queue views with concurrent virtual citizens and operators and reports '
+        'per-endpoint throughput, latency percentiles and error rates as JSON. '
+        'It joins queues and serves tickets - run it against a scratch database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Virtual users per process.')
+        parser.add_argument('--processes', type=int, default=1, help='Worker processes (1 = in-process threads).')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds each virtual user runs.')
+        parser.add_argument('--requests', type=int, help='Stop each virtual user after this many actions.')
+        parser.add_argument('--mix', default=','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items()),
+                            help='Action weights: poll (ticket page), branch, join, serve.')
+        parser.add_argument('--branch', type=int, action='append', dest='branches',
+                            help='Branch id to target (repeatable). Defaults to every branch with an open counter.')
+        parser.add_argument('--password', default='admin123', help='Operator password (seed_demo_data default).')
+        parser.add_argument('--think-ms', type=float, default=0, help='Mean pause between actions per user.')
+        parser.add_argument('--seed', type=int, default=0, help='Seeds action choice and citizen mobile numbers.')
+        parser.add_argument('--output', help='Write the JSON report here instead of stdout.')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise CommandError('loadtest needs a file-backed database; every thread opens its own connection.')
+        try:
+            mix = parse_mix(options['mix'])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        plan = self._plan(mix, options)
+        threads, processes = max(1, options['threads']), max(1, options['processes'])
+
+        started = time.monotonic()
+        if processes == 1:
+            results = run_threads(plan, threads)
+        else:
+            # Forked workers must not share the parent's database connections.
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=processes, initializer=init_process) as pool:
+                results = merge(pool.map(run_process, [
+                    (plan, threads, process * threads) for process in range(processes)
+                ]))
+        report = summarize(results, time.monotonic() - started)
+        report['config'] = {
+            'threads': threads, 'processes': processes, 'duration': options['duration'],
+            'requests': options['requests'], 'mix': mix, 'think_ms': options['think_ms'],
+            'branches': plan['branches'], 'database': connection.vendor,
+        }
+
+        text = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(text + '\n')
+            for endpoint, stats in report['endpoints'].items():
+                self.stdout.write(
+                    f'  {endpoint:<20} {stats["requests"]:>7} req {stats["throughput_rps"]:>8.1f}/s  '
+                    f'p50 {stats["p50_ms"]:.1f} ms  p95 {stats["p95_ms"]:.1f} ms  p99 {stats["p99_ms"]:.1f} ms  '
+                    f'errors {stats["error_rate"]:.2%}  lock timeouts {stats["lock_timeout_rate"]:.2%}'
+                )
+            self.stdout.write(self.style.SUCCESS(
+                f'{report["requests"]} requests in {report["elapsed_seconds"]}s '
+                f'({report["throughput_rps"]}/s); report written to {options["output"]}'
+            ))
+        else:
+            self.stdout.write(text)
+
+    def _plan(self, mix, options):
+        services = Service.objects.filter(is_active=True, branch__is_active=True, counters__is_open=True)
+        if options['branches']:
+            services = services.filter(branch_id__in=options['branches'])
+        services = dict(services.distinct().values_list('id', 'branch_id'))
+        if not services:
+            raise CommandError('No active services with an open counter to target. Run seed_demo_data first.')
+
+        operators = list(
+            OperatorAssignment.objects.filter(counter__is_open=True, counter__service_id__in=list(services))
+            .order_by('counter_id').values_list('user__username', flat=True)
+        )
+        if mix.get('serve') and not operators:
+            raise CommandError('The mix includes "serve" but no operator is assigned to an open counter.')
+
+        return {
+            'mix': mix,
+            'services': sorted(services),
+            'branches': sorted(set(services.values())),
+            'operators': operators,
+            'password': options['password'],
+            'duration': None if options['requests'] else options['duration'],
+            'requests': options['requests'],
+            'think_seconds': options['think_ms'] / 1000,
+            'seed': options['seed'],
+        }
@@ -1,227 +1,372 @@
 import random
-from datetime import timedelta
-from django.core.management.base import BaseCommand
-from django.utils import timezone
+import time
+from datetime import datetime, time as dt_time, timedelta
+
+import numpy as np
+from django.contrib.admin.models import LogEntry
 from django.contrib.auth import get_user_model
-from organizations.models import Organization
-from facilities.models import Branch, Service
-from counters.models import Counter, OperatorAssignment
-from queues.models import QueueTicket
-from queues.engine import join_queue, serve_next, mark_served
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from analytics.models import BranchHourlyStats, RollupWatermark, ServiceHourlyStats, WaitTimeProfile
+from core import sharding
 from core.roles import ORGANIZATION, BRANCH, OPERATOR, CITIZEN
+from counters.models import Counter, OperatorAssignment
+from facilities.models import Branch, Service
+from notifications.models import NotificationLog
+from organizations.models import Organization
+from queues.engine import recalculate_eta
+from queues.models import NoShowSweep, QueueEvent, QueueSnapshot, QueueTicket
 
 User = get_user_model()
 
+SECTORS = [
+    {
+        'type': 'Health',
+        'orgs': ['City General Hospital', 'LifeCare Clinics', 'Wellness Health'],
+        'services': [
+            {'name': 'General Medicine', 'avg': 10, 'desc': 'Standard checkups'},
+            {'name': 'Pediatrics', 'avg': 15, 'desc': 'Child care'},
+            {'name': 'Dental', 'avg': 20, 'desc': 'Orthodontics'}
+        ]
+    },
+    {
+        'type': 'Banking',
+        'orgs': ['Global Trust Bank', 'Metro Savings', 'First Choice Finance'],
+        'services': [
+            {'name': 'Cash Deposits', 'avg': 5, 'desc': 'Counter cash transactions'},
+            {'name': 'Loans & Credit', 'avg': 30, 'desc': 'Consultation for loans'},
+            {'name': 'Account Services', 'avg': 15, 'desc': 'New accounts and KYC'}
+        ]
+    },
+    {
+        'type': 'Government',
+        'orgs': ['Passport Seva Kendra', 'Regional Transport Office (RTO)', 'Municipal Corporation'],
+        'services': [
+            {'name': 'New Applications', 'avg': 20, 'desc': 'First time registration'},
+            {'name': 'Renewals', 'avg': 12, 'desc': 'Document renewal'},
+            {'name': 'Verification', 'avg': 15, 'desc': 'Physical verification'}
+        ]
+    }
+]
+
+CITIES = ['Bengaluru', 'Hyderabad', 'Mumbai', 'Delhi', 'Chennai', 'Pune']
+AREAS = ['Indiranagar', 'Koramangala', 'HSR Layout', 'Whitefield', 'Jayanagar', 'MG Road']
+
+# Arrival curve: branches open 09:00-18:00 local time; arrivals peak
+# mid-morning and again after lunch. Weekday multipliers run Monday → Sunday.
+OPENING_HOUR = 9
+OPEN_MINUTES = 9 * 60
+ARRIVAL_PEAKS = [(0.6, 120, 70), (0.4, 360, 60)]  # (share, minutes after opening, spread)
+WEEKDAY_FACTORS = [1.2, 1.0, 1.0, 1.0, 1.1, 0.6, 0.15]
+NO_SHOW_RATE = 0.06
+
+
 class Command(BaseCommand):
     help = 'Seeds the database with scaled demo data for WaitFree platform'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Multiplies organizations per sector and citizens (default 1).')
+        parser.add_argument('--history-days', type=int, default=0,
+                            help='Days of closed ticket history to generate before today.')
+        parser.add_argument('--tickets-per-day', type=int, default=40,
+                            help='Average tickets per service on a weekday in the history.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Rows per bulk insert.')
+        parser.add_argument('--seed', type=int, help='Random seed for a reproducible dataset.')
+
+    def handle(self, *args, **options):
+        if sharding.is_sharded():
+            # Bulk inserts skip Organization.save(), which places organizations on their shards.
+            raise CommandError('seed_demo_data writes to a single database; run it without DATABASE_SHARDS.')
+        started = time.monotonic()
+        random.seed(options['seed'])
+        self.rng = np.random.default_rng(options['seed'])
+        self.batch_size = options['batch_size']
+        scale = max(1, options['scale'])
+
         self.stdout.write('Cleaning up old demo data...')
-        
-        # Delete demo users
-        User.objects.filter(username__startswith='org_').delete()
-        User.objects.filter(username__startswith='op_').delete()
-        User.objects.filter(username__startswith='citizen_').delete()
-        User.objects.filter(username__contains='_mgr').delete()
-        User.objects.exclude(username='admin').delete() # Clean everything except superuser
-        
-        # Delete demo data
-        Organization.objects.all().delete()
+        self._clean()
 
         self.stdout.write('Seeding SCALED demo data...')
+        # Hashing is deliberately slow; every demo account shares one hash.
+        password = make_password('admin123')
+        with transaction.atomic():
+            services = self._create_facilities(scale, password)
+            citizens = self._create_citizens(scale)
+        self.stdout.write(f'  Created {len(services)} services and {len(citizens)} citizens.')
 
-        # 1. Sector Definitions
-        sectors = [
-            {
-                'type': 'Health',
-                'orgs': ['City General Hospital', 'LifeCare Clinics', 'Wellness Health'],
-                'services': [
-                    {'name': 'General Medicine', 'avg': 10, 'desc': 'Standard checkups'},
-                    {'name': 'Pediatrics', 'avg': 15, 'desc': 'Child care'},
-                    {'name': 'Dental', 'avg': 20, 'desc': 'Orthodontics'}
-                ]
-            },
-            {
-                'type': 'Banking',
-                'orgs': ['Global Trust Bank', 'Metro Savings', 'First Choice Finance'],
-                'services': [
-                    {'name': 'Cash Deposits', 'avg': 5, 'desc': 'Counter cash transactions'},
-                    {'name': 'Loans & Credit', 'avg': 30, 'desc': 'Consultation for loans'},
-                    {'name': 'Account Services', 'avg': 15, 'desc': 'New accounts and KYC'}
-                ]
-            },
-            {
-                'type': 'Government',
-                'orgs': ['Passport Seva Kendra', 'Regional Transport Office (RTO)', 'Municipal Corporation'],
-                'services': [
-                    {'name': 'New Applications', 'avg': 20, 'desc': 'First time registration'},
-                    {'name': 'Renewals', 'avg': 12, 'desc': 'Document renewal'},
-                    {'name': 'Verification', 'avg': 15, 'desc': 'Physical verification'}
-                ]
-            }
-        ]
+        if options['history_days']:
+            count = self._create_history(services, citizens, options['history_days'], options['tickets_per_day'])
+            self.stdout.write(f'  Created {count} historical tickets over {options["history_days"]} days.')
 
-        # 2. Locations
-        cities = ['Bengaluru', 'Hyderabad', 'Mumbai', 'Delhi', 'Chennai', 'Pune']
-        areas = ['Indiranagar', 'Koramangala', 'HSR Layout', 'Whitefield', 'Jayanagar', 'MG Road']
-
-        # 3. Create Organizations, Branches, Services, Counters, Operators
-        all_services = []
-        for sector in sectors:
-            for org_name in sector['orgs']:
-                slug = org_name.lower().replace(' ', '-').replace('(', '').replace(')', '')
-                org, _ = Organization.objects.get_or_create(
-                    name=org_name,
-                    slug=slug,
-                    defaults={
-                        'contact_email': f"contact@{slug}.com",
-                        'phone': f"+91 {random.randint(70000, 99999)} {random.randint(10000, 99999)}",
-                        'is_active': True
-                    }
-                )
+        self._create_live_queues(services, citizens)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully seeded SCALED demo data in {time.monotonic() - started:.1f}s:'
+        ))
+        self.stdout.write(f'  - Organizations: {Organization.objects.count()}')
+        self.stdout.write(f'  - Branches: {Branch.objects.count()}')
+        self.stdout.write(f'  - Services: {Service.objects.count()}')
+        self.stdout.write(f'  - Citizens: {len(citizens)}')
+        self.stdout.write(f'  - Total Tickets: {QueueTicket.objects.count()}')
 
-                # Org Admin
-                org_admin, _ = User.objects.get_or_create(
-                    username=f"org_admin_{slug.replace('-', '_')}",
-                    defaults={
-                        'email': f"admin@{slug}.com",
-                        'role': ORGANIZATION,
-                        'organization': org
-                    }
+    def _clean(self):
+        # Children first, each as a single DELETE: cascading through the ORM
+        # would load every ticket of a large dataset into memory. None of these
+        # tables has delete signals, and the ones referring to them go first.
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model in (NotificationLog, QueueEvent, QueueSnapshot, NoShowSweep,
+                          BranchHourlyStats, ServiceHourlyStats, WaitTimeProfile, RollupWatermark,
+                          QueueTicket, OperatorAssignment, Counter, Service):
+                cursor.execute(f'DELETE FROM {connection.ops.quote_name(model._meta.db_table)}')
+            LogEntry.objects.exclude(user__username='admin').delete()
+            User.objects.exclude(username='admin').delete()  # Clean everything except superuser
+            Branch.objects.all().delete()
+            Organization.objects.all().delete()
+
+    def _create_facilities(self, scale, password):
+        orgs, org_admins = [], []
+        for sector in SECTORS:
+            for copy in range(scale):
+                for org_name in sector['orgs']:
+                    name = org_name if copy == 0 else f'{org_name} #{copy + 1}'
+                    slug = name.lower().replace(' ', '-').replace('(', '').replace(')', '').replace('#', '')
+                    orgs.append((sector, Organization(
+                        name=name,
+                        slug=slug,
+                        contact_email=f'contact@{slug}.com',
+                        phone=f'+91 {random.randint(70000, 99999)} {random.randint(10000, 99999)}',
+                        is_active=True,
+                    )))
+        Organization.objects.bulk_create([org for _, org in orgs])
+
+        branches = []
+        for sector, org in orgs:
+            key = org.slug.replace('-', '_')
+            org_admins.append(User(
+                username=f'org_admin_{key}', email=f'admin@{org.slug}.com',
+                role=ORGANIZATION, organization=org, password=password,
+            ))
+            for b_idx in range(random.randint(3, 5)):
+                city, area = random.choice(CITIES), random.choice(AREAS)
+                branches.append((sector, org, b_idx, Branch(
+                    name=f'{org.name} - {city} {area} #{b_idx + 1}',
+                    organization=org,
+                    address=f'{random.randint(1, 999)} {area}, {city}',
+                    city=city,
+                    is_active=True,
+                )))
+        Branch.objects.bulk_create([branch for *_, branch in branches], batch_size=self.batch_size)
+
+        managers, services = [], []
+        for sector, org, b_idx, branch in branches:
+            managers.append(User(
+                username=f'mgr_{org.slug.replace("-", "_")}_{b_idx}',
+                role=BRANCH, organization=org, branch=branch, password=password,
+            ))
+            for s_data in sector['services']:
+                services.append(Service(
+                    name=s_data['name'],
+                    branch=branch,
+                    avg_service_time=s_data['avg'],
+                    description=s_data['desc'],
+                    is_active=True,
+                ))
+        User.objects.bulk_create(org_admins + managers, batch_size=self.batch_size)
+        Service.objects.bulk_create(services, batch_size=self.batch_size)
+
+        # 2 Counters per service, each with its own operator
+        operators, counters = [], []
+        counter_numbers = {}
+        for service in services:
+            org = service.branch.organization
+            for _ in range(2):
+                number = counter_numbers[service.branch_id] = counter_numbers.get(service.branch_id, 0) + 1
+                operator = User(
+                    username=f'op_{org.slug.replace("-", "_")}_{service.branch_id}_{service.id}_{number}',
+                    role=OPERATOR, organization=org, branch=service.branch, password=password,
                 )
-                org_admin.set_password('admin123')
-                org_admin.save()
-
-                # 3-5 Branches per Organization
-                num_branches = random.randint(3, 5)
-                for b_idx in range(num_branches):
-                    city = random.choice(cities)
-                    area = random.choice(areas)
-                    branch_name = f"{org_name} - {city} {area} #{b_idx + 1}"
-                    branch, _ = Branch.objects.get_or_create(
-                        name=branch_name,
-                        organization=org,
-                        defaults={
-                            'address': f"{random.randint(1, 999)} {area}, {city}",
-                            'city': city,
-                            'is_active': True
-                        }
-                    )
-
-                    # Branch Manager
-                    mgr_username = f"mgr_{slug.replace('-', '_')}_{b_idx}"
-                    b_mgr, _ = User.objects.get_or_create(
-                        username=mgr_username,
-                        defaults={
-                            'role': BRANCH,
-                            'organization': org,
-                            'branch': branch
-                        }
-                    )
-                    b_mgr.set_password('admin123')
-                    b_mgr.save()
-
-                    # Services for this branch
-                    counter_global_idx = 1
-                    for s_data in sector['services']:
-                        service, _ = Service.objects.get_or_create(
-                            name=s_data['name'],
-                            branch=branch,
-                            defaults={
-                                'avg_service_time': s_data['avg'],
-                                'description': s_data['desc'],
-                                'is_active': True
-                            }
-                        )
-                        all_services.append(service)
-
-                        # 2 Counters per service
-                        for _ in range(2):
-                            counter, _ = Counter.objects.get_or_create(
-                                number=f"{counter_global_idx}",
-                                branch=branch,
-                                defaults={
-                                    'service': service,
-                                    'is_open': True
-                                }
-                            )
-
-                            # Operator
-                            op_username = f"op_{slug.replace('-', '_')}_{b_idx}_{service.id}_{counter_global_idx}"
-                            operator, _ = User.objects.get_or_create(
-                                username=op_username,
-                                defaults={
-                                    'role': OPERATOR,
-                                    'organization': org,
-                                    'branch': branch
-                                }
-                            )
-                            operator.set_password('admin123')
-                            operator.save()
-
-                            # Assign
-                            OperatorAssignment.objects.get_or_create(user=operator, counter=counter)
-                            counter.current_operator = operator
-                            counter.save()
-                            counter_global_idx += 1
-
-                self.stdout.write(f'  Created {org_name} with {num_branches} branches.')
-
-        # 4. Create Citizens (150+)
-        citizen_count = 150
-        citizens = []
-        
+                operators.append(operator)
+                counters.append(Counter(
+                    number=str(number), branch=service.branch, service=service,
+                    is_open=True, current_operator=operator,
+                ))
+        User.objects.bulk_create(operators, batch_size=self.batch_size)
+        Counter.objects.bulk_create(counters, batch_size=self.batch_size)
+        OperatorAssignment.objects.bulk_create(
+            [OperatorAssignment(user=counter.current_operator, counter=counter) for counter in counters],
+            batch_size=self.batch_size,
+        )
+        self.counters_by_service = {}
+        for counter in counters:
+            self.counters_by_service.setdefault(counter.service_id, []).append(counter)
+        return services
+
+    def _create_citizens(self, scale):
+        unusable = make_password(None)
         # Specific citizen for E2E tests
-        test_citizen, _ = User.objects.get_or_create(
-            username="citizen_9999922222",
-            defaults={
-                'role': CITIZEN,
-                'mobile_number': "9999922222"
-            }
+        mobiles = {'9999922222'}
+        while len(mobiles) < 150 * scale:
+            mobiles.add(f'9{random.randint(100000000, 999999999)}')
+        citizens = [
+            User(username=f'citizen_{mobile}', role=CITIZEN, mobile_number=mobile, password=unusable)
+            for mobile in sorted(mobiles)
+        ]
+        User.objects.bulk_create(citizens, batch_size=self.batch_size)
+        return citizens
+
+    def _arrival_minutes(self, count):
+        """Minutes after opening for `count` arrivals, drawn from the daily curve, sorted."""
+        shares = [share for share, _, _ in ARRIVAL_PEAKS]
+        peak = self.rng.choice(len(ARRIVAL_PEAKS), size=count, p=shares)
+        means = np.array([mean for _, mean, _ in ARRIVAL_PEAKS])[peak]
+        spreads = np.array([spread for _, _, spread in ARRIVAL_PEAKS])[peak]
+        minutes = self.rng.normal(means, spreads)
+        # Redraw the tails outside opening hours uniformly instead of piling them up at the edges.
+        outside = (minutes < 0) | (minutes >= OPEN_MINUTES)
+        minutes[outside] = self.rng.uniform(0, OPEN_MINUTES, size=outside.sum())
+        return np.sort(minutes)
+
+    def _create_history(self, services, citizens, days, tickets_per_day):
+        """
+        Closed tickets for each of the last `days` days. Per service-day,
+        arrivals follow the daily curve and waits grow with the backlog;
+        tickets are called in join order (FIFO), as the engine would.
+        Rows go in with executemany: building a model instance per row
+        costs more than the insert itself at this volume.
+        """
+        citizen_ids = np.array([citizen.id for citizen in citizens])
+        by_branch = {}
+        for service in services:
+            by_branch.setdefault(service.branch_id, []).append(service)
+
+        table = QueueTicket._meta.db_table
+        sql = (
+            f'INSERT INTO {table} (citizen_id, service_id, branch_id, counter_id, token_number, status, '
+            f'position, estimated_wait_time, eta_p50, eta_p90, joined_at, called_at, served_at, no_show_at) '
+            f'VALUES (%s, %s, %s, %s, %s, %s, 0, 0, 0, 0, %s, %s, %s, %s)'
+        )
+        today = timezone.localdate()
+        tz = timezone.get_current_timezone()
+        rows, created = [], 0
+        for offset in range(days, 0, -1):
+            day = today - timedelta(days=offset)
+            opening = timezone.make_aware(datetime.combine(day, dt_time(OPENING_HOUR)), tz).timestamp()
+            rate = tickets_per_day * WEEKDAY_FACTORS[day.weekday()]
+            for branch_id, branch_services in by_branch.items():
+                columns = [self._service_day(service, opening, rate) for service in branch_services]
+                columns = [column for column in columns if column is not None]
+                if not columns:
+                    continue
+                service_id, counter_id, joined, called, served, no_show_at = (
+                    np.concatenate(parts) for parts in zip(*columns)
+                )
+                # Tokens restart at 1 per branch each day, in join order.
+                order = np.argsort(joined, kind='stable')
+                no_show = np.isnan(served[order])
+                rows.extend(zip(
+                    self.rng.choice(citizen_ids, size=len(order)).tolist(),
+                    service_id[order].tolist(),
+                    [branch_id] * len(order),
+                    counter_id[order].tolist(),
+                    range(1, len(order) + 1),
+                    np.where(no_show, 'no_show', 'served').tolist(),
+                    _datetimes(joined[order]),
+                    _datetimes(called[order]),
+                    _datetimes(served[order]),
+                    _datetimes(no_show_at[order]),
+                ))
+                if len(rows) >= self.batch_size:
+                    created += self._insert(sql, rows)
+                    rows = []
+        return created + self._insert(sql, rows)
+
+    def _service_day(self, service, opening, rate):
+        """One service's tickets for one day as column arrays (epoch seconds, NaN for null), or None."""
+        count = self.rng.poisson(rate)
+        if not count:
+            return None
+        joined = opening + self._arrival_minutes(count) * 60
+        avg = service.avg_service_time * 60
+        handle = self.rng.gamma(3.0, avg / 3.0, size=count)
+        # Two counters: each call waits for the earlier call plus half a
+        # service time, never before the ticket joined.
+        called = joined + self.rng.exponential(avg / 4, size=count)
+        called = np.maximum.accumulate(np.maximum(called, np.concatenate(
+            ([joined[0]], joined[:-1] + handle[:-1] / 2),
+        )))
+        no_show = self.rng.random(count) < NO_SHOW_RATE
+        served = np.where(no_show, np.nan, called + handle)
+        no_show_at = np.where(no_show, called + service.no_show_grace_minutes * 60, np.nan)
+        counter_ids = [counter.id for counter in self.counters_by_service[service.id]]
+        return (
+            np.full(count, service.id), self.rng.choice(counter_ids, size=count),
+            joined, called, served, no_show_at,
         )
-        citizens.append(test_citizen)
-
-        for i in range(citizen_count - 1):
-            mobile = f"9{random.randint(100000000, 999999999)}"
-            citizen, _ = User.objects.get_or_create(
-                username=f"citizen_{mobile}",
-                defaults={
-                    'role': CITIZEN,
-                    'mobile_number': mobile
-                }
-            )
-            citizens.append(citizen)
-
-        self.stdout.write(f'  Created {len(citizens)} sample Citizens.')
-
-        # 5. Populate hundreds of tickets
+
+    def _insert(self, sql, rows):
+        if rows:
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+        return len(rows)
+
+    def _create_live_queues(self, services, citizens):
+        """
+        Today's queues: each citizen joins 1-2 services. Per service, the
+        earliest 60% were served, the next few are at the counters and the
+        rest are waiting, so calls follow join order as the engine's would.
+        """
+        now = timezone.now()
+        by_service = {}
         for citizen in citizens:
             # Each citizen joins 1-2 random UNIQUE services
-            num_queues = min(len(all_services), random.randint(1, 2))
-            chosen_services = random.sample(all_services, num_queues)
-            for service in chosen_services:
-                try:
-                    ticket = join_queue(citizen, service)
-                    
-                    # Randomly mark some as served or serving
-                    rand = random.random()
-                    if rand < 0.6: # 60% are already served
-                        ticket.status = 'serving'
-                        ticket.called_at = timezone.now() - timedelta(minutes=random.randint(5, 60))
-                        ticket.save()
-                        mark_served(ticket)
-                    elif rand < 0.8: # 20% are currently serving
-                        ticket.status = 'serving'
-                        ticket.called_at = timezone.now() - timedelta(minutes=random.randint(1, 5))
-                        ticket.save()
-                    # 20% stay as 'waiting'
-                except ValueError:
-                    # Skip if validation fails (e.g. no counters open, though script opens them)
-                    continue
+            for service in random.sample(services, min(len(services), random.randint(1, 2))):
+                by_service.setdefault(service, []).append(
+                    (now - timedelta(minutes=random.randint(1, 180)), citizen)
+                )
 
-        self.stdout.write(self.style.SUCCESS(f'Successfully seeded SCALED demo data:'))
-        self.stdout.write(f'  - Organizations: {Organization.objects.count()}')
-        self.stdout.write(f'  - Branches: {Branch.objects.count()}')
-        self.stdout.write(f'  - Services: {Service.objects.count()}')
-        self.stdout.write(f'  - Citizens: {len(citizens)}')
-        self.stdout.write(f'  - Total Tickets: {QueueTicket.objects.count()}')
+        tickets, tokens, waiting = [], {}, []
+        for service, joins in by_service.items():
+            joins.sort(key=lambda join: join[0])
+            served = int(len(joins) * 0.6)
+            # Of the rest, about half are at a counter (one per counter).
+            free = list(self.counters_by_service[service.id])[:(len(joins) - served + 1) // 2]
+            called_at = None
+            for index, (joined_at, citizen) in enumerate(joins):
+                tokens[service.branch_id] = tokens.get(service.branch_id, 0) + 1
+                ticket = QueueTicket(
+                    citizen=citizen, service=service, branch_id=service.branch_id,
+                    token_number=tokens[service.branch_id], joined_at=joined_at,
+                )
+                if index < served or free:
+                    called_at = max(joined_at, called_at or joined_at) + timedelta(minutes=random.randint(0, 5))
+                    ticket.called_at = min(called_at, now)
+                    ticket.counter = random.choice(self.counters_by_service[service.id])
+                if index < served:
+                    ticket.status = 'served'
+                    ticket.served_at = ticket.called_at + timedelta(minutes=service.avg_service_time)
+                elif free:  # one ticket per counter is being served right now
+                    ticket.status = 'serving'
+                    ticket.counter = free.pop()
+                else:
+                    waiting.append(service)
+                tickets.append(ticket)
+        QueueTicket.objects.bulk_create(tickets, batch_size=self.batch_size)
+
+        # One recalculation per service with a queue sets positions and ETAs.
+        for service in set(waiting):
+            recalculate_eta(service)
+
+
+def _datetimes(epoch_seconds):
+    """
+    UTC timestamps as 'YYYY-MM-DD HH:MM:SS.ffffff' strings (None for NaN),
+    formatted by numpy in one call rather than adapted value by value.
+    """
+    values = np.datetime_as_string((epoch_seconds * 1e6).astype('datetime64[us]'), unit='us')
+    values = np.char.replace(values, 'T', ' ').astype(object)
+    values[np.isnan(epoch_seconds)] = None
+    return values.tolist()
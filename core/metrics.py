@@ -0,0 +1,263 @@
+"""
+Prometheus-format metrics without a client library.
+
+Each process accumulates counters and histograms in per-thread dicts (no
+lock on the hot path) and periodically writes them to a file of its own
+under settings.METRICS['DIR']. The /metrics view sums every process file,
+so one scrape of any gunicorn worker reports the whole server. Gauges that
+describe shared state (queue depth) are computed from the database at
+scrape time instead of being accumulated.
+"""
+
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'DIR': os.path.join(tempfile.gettempdir(), 'waitfree-metrics'),
+    'FLUSH_INTERVAL_SECONDS': 5,
+    'TOKEN': '',  # when set, scrapers must send "Authorization: Bearer <token>"
+}
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# name → (type, help, buckets)
+METRICS = {
+    'waitfree_engine_duration_seconds': (
+        'histogram', 'Queue engine call duration.', DURATION_BUCKETS,
+    ),
+    'waitfree_engine_db_queries': (
+        'histogram', 'Database queries issued per queue engine call.', QUERY_BUCKETS,
+    ),
+    'waitfree_queue_joins_total': ('counter', 'Tickets issued.', None),
+    'waitfree_queue_serves_total': ('counter', 'Tickets called to a counter.', None),
+    'waitfree_queue_no_shows_total': ('counter', 'Tickets closed as no-show.', None),
+    'waitfree_notifications_total': ('counter', 'Notification delivery outcomes.', None),
+    'waitfree_cache_requests_total': ('counter', 'Versioned cache lookups by result (hit/miss).', None),
+}
+
+
+def metrics_setting(name):
+    return getattr(settings, 'METRICS', {}).get(name, DEFAULTS[name])
+
+
+def _key(name, labels):
+    return name + '|' + ','.join(f'{k}={v}' for k, v in sorted(labels.items()))
+
+
+def _parse_key(key):
+    name, _, labels = key.partition('|')
+    return name, dict(pair.split('=', 1) for pair in labels.split(',')) if labels else {}
+
+
+class _Accumulator:
+    """One thread's counters and histograms; only its own thread writes to it."""
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+
+
+class Registry:
+    """Process-wide view over the per-thread accumulators, flushed to a file."""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._accumulators = []
+        self._register_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def _accumulator(self):
+        accumulator = getattr(self._local, 'accumulator', None)
+        if accumulator is None:
+            accumulator = self._local.accumulator = _Accumulator()
+            with self._register_lock:
+                self._accumulators.append(accumulator)
+        return accumulator
+
+    def inc(self, name, amount=1, **labels):
+        counters = self._accumulator().counters
+        key = _key(name, labels)
+        counters[key] = counters.get(key, 0) + amount
+        self._maybe_flush()
+
+    def observe(self, name, value, **labels):
+        histograms = self._accumulator().histograms
+        key = _key(name, labels)
+        histogram = histograms.get(key)
+        if histogram is None:
+            buckets = METRICS[name][2]
+            histogram = histograms[key] = {'buckets': [0] * (len(buckets) + 1), 'sum': 0.0, 'count': 0}
+        buckets = METRICS[name][2]
+        index = 0
+        while index < len(buckets) and value > buckets[index]:
+            index += 1
+        histogram['buckets'][index] += 1
+        histogram['sum'] += value
+        histogram['count'] += 1
+        self._maybe_flush()
+
+    def snapshot(self):
+        """This process's totals across all threads."""
+        counters, histograms = {}, {}
+        with self._register_lock:
+            accumulators = list(self._accumulators)
+        for accumulator in accumulators:
+            for key, value in list(accumulator.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+            for key, histogram in list(accumulator.histograms.items()):
+                _merge_histogram(histograms, key, histogram)
+        return {'counters': counters, 'histograms': histograms}
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= metrics_setting('FLUSH_INTERVAL_SECONDS'):
+            self.flush()
+
+    def flush(self):
+        """Write this process's totals to its file (skipped if another thread is already flushing)."""
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            directory = metrics_setting('DIR')
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'{os.getpid()}.json')
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False, suffix='.tmp') as fh:
+                json.dump(self.snapshot(), fh)
+            os.replace(fh.name, path)
+        finally:
+            self._flush_lock.release()
+
+
+def _merge_histogram(histograms, key, histogram):
+    total = histograms.get(key)
+    if total is None:
+        histograms[key] = {
+            'buckets': list(histogram['buckets']),
+            'sum': histogram['sum'],
+            'count': histogram['count'],
+        }
+        return
+    total['buckets'] = [a + b for a, b in zip(total['buckets'], histogram['buckets'])]
+    total['sum'] += histogram['sum']
+    total['count'] += histogram['count']
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def inc(name, amount=1, **labels):
+    registry.inc(name, amount, **labels)
+
+
+def observe(name, value, **labels):
+    registry.observe(name, value, **labels)
+
+
+def timed(op):
+    """
+    Record duration and query count of each call under the given op label.
+    Queries are counted on every database alias: engine work runs on tenant
+    shards and replicas (core.sharding, core.replicas), not only 'default'.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            queries = [0]
+
+            def count(execute, sql, params, many, context):
+                queries[0] += 1
+                return execute(sql, params, many, context)
+
+            started = time.perf_counter()
+            try:
+                with ExitStack() as stack:
+                    for connection in connections.all():
+                        stack.enter_context(connection.execute_wrapper(count))
+                    return func(*args, **kwargs)
+            finally:
+                observe('waitfree_engine_duration_seconds', time.perf_counter() - started, op=op)
+                observe('waitfree_engine_db_queries', queries[0], op=op)
+
+        return wrapper
+
+    return decorator
+
+
+def collect():
+    """Sum the files of every process (this one flushed first)."""
+    registry.flush()
+    counters, histograms = {}, {}
+    directory = metrics_setting('DIR')
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue  # being replaced right now
+        for key, value in data['counters'].items():
+            counters[key] = counters.get(key, 0) + value
+        for key, histogram in data['histograms'].items():
+            _merge_histogram(histograms, key, histogram)
+    return counters, histograms
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in sorted(labels.items())) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(counters, histograms, gauges=()):
+    """
+    Prometheus text exposition (format 0.0.4).
+    gauges: iterable of (name, help, [(labels, value), ...]).
+    """
+    lines = []
+    by_name = {}
+    for key, value in counters.items():
+        name, labels = _parse_key(key)
+        by_name.setdefault(name, []).append((labels, value))
+    for key, histogram in histograms.items():
+        name, labels = _parse_key(key)
+        by_name.setdefault(name, []).append((labels, histogram))
+
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in sorted(by_name.get(name, []), key=lambda item: sorted(item[0].items())):
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value['buckets']):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value["sum"])}')
+            lines.append(f'{name}_count{_labels(labels)} {value["count"]}')
+
+    for name, help_text, samples in gauges:
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} gauge')
+        for labels, value in samples:
+            lines.append(f'{name}{_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
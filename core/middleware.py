@@ -0,0 +1,115 @@
+"""
+Project middleware.
+"""
+
+import random
+import time
+from contextlib import ExitStack
+
+from django.contrib.auth.middleware import get_user
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from core.profiling import (
+    RequestProfile, install_hooks, profiling_setting, record_slow_request,
+)
+from core import sharding
+from core.tenant import get_tenant
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in (settings.REQUEST_PROFILING['ENABLED']) per-request profiling.
+    Adds a Server-Timing header with SQL, cache, view and template timings,
+    and samples slow requests into a ring buffer shown on System Health.
+
+    Install it first in MIDDLEWARE so the totals cover the whole stack;
+    "view" then spans from URL resolution to the response leaving the
+    inner middleware.
+    """
+
+    def __init__(self, get_response):
+        if not profiling_setting('ENABLED'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_seconds = profiling_setting('SLOW_REQUEST_MS') / 1000
+        self.sample_rate = profiling_setting('SLOW_SAMPLE_RATE')
+        self.max_queries = profiling_setting('MAX_QUERIES')
+        install_hooks()
+
+    def __call__(self, request):
+        profile = request._profile = RequestProfile(self.max_queries)
+        token = profile.activate()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            profile.deactivate(token)
+
+        finished = time.perf_counter()
+        total = finished - profile.started
+        if profile.view_started is not None:
+            profile.view_time = finished - profile.view_started
+        response['Server-Timing'] = profile.server_timing(total)
+        if total >= self.slow_seconds and random.random() < self.sample_rate:
+            record_slow_request({
+                'at': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.get_full_path()[:500],
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 1),
+                'view_ms': round(profile.view_time * 1000, 1),
+                'template_ms': round(profile.template_time * 1000, 1),
+                'sql_ms': round(profile.sql_time * 1000, 1),
+                'query_count': profile.query_count,
+                'cache_hits': profile.cache_hits,
+                'cache_misses': profile.cache_misses,
+                'queries': [(sql, round(duration * 1000, 2)) for sql, duration in profile.queries],
+            })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._profile.view_started = time.perf_counter()
+
+
+class TenantContextMiddleware:
+    """
+    Sets request.tenant (core.tenant.TenantContext) and preloads the user's
+    organization, branch, operator assignment, counter and service onto
+    request.user. Both stay lazy: requests that never touch the user pay
+    nothing. Install it right after AuthenticationMiddleware.
+
+    With several database shards (core.sharding) it also routes the
+    request's tenant queries to the user's organization's shard; that needs
+    the user up front, so sharded requests always load it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.user = SimpleLazyObject(lambda: self.preload(request))
+        request.tenant = SimpleLazyObject(lambda: self.tenant(request))
+        if not sharding.is_sharded():
+            return self.get_response(request)
+        organization_id = getattr(get_user(request), 'organization_id', None)
+        if organization_id is None:
+            return self.get_response(request)
+        with sharding.use_organization(organization_id):
+            return self.get_response(request)
+
+    @staticmethod
+    def preload(request):
+        user = get_user(request)  # memoized on the request, shared with AuthenticationMiddleware
+        if not hasattr(request, '_tenant'):
+            request._tenant = get_tenant(user)
+            request._tenant.attach(user)
+        return user
+
+    def tenant(self, request):
+        self.preload(request)
+        return request._tenant
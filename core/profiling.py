@@ -0,0 +1,157 @@
+"""
+Per-request profiling: query, cache and template timings for the current
+request, plus a ring buffer of sampled slow requests kept in the cache.
+
+RequestProfilingMiddleware (core.middleware) activates a RequestProfile for
+each request; the hooks below only record while one is active, so code
+running outside a profiled request pays a single context-variable lookup.
+"""
+
+import contextvars
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'ENABLED': False,
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_SAMPLE_RATE': 0.1,  # share of slow requests written to the ring buffer
+    'RING_SIZE': 100,
+    'MAX_QUERIES': 100,       # queries kept per sampled request
+}
+
+RING_KEY = 'profiling:slow'
+
+_current = contextvars.ContextVar('request_profile', default=None)
+_MISSING = object()
+
+
+def profiling_setting(name):
+    return getattr(settings, 'REQUEST_PROFILING', {}).get(name, DEFAULTS[name])
+
+
+class RequestProfile:
+    """Timings collected while handling one request (durations in seconds)."""
+
+    def __init__(self, max_queries):
+        self.started = time.perf_counter()
+        self.max_queries = max_queries
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.template_time = 0.0
+        self.view_started = None
+        self.view_time = 0.0
+
+    def activate(self):
+        return _current.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        _current.reset(token)
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.query_count += 1
+            self.sql_time += duration
+            if len(self.queries) < self.max_queries:
+                self.queries.append((sql, duration))
+
+    def server_timing(self, total):
+        """Value for the Server-Timing response header."""
+        return ', '.join([
+            f'db;dur={self.sql_time * 1000:.1f};desc="{self.query_count} queries"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+            f'view;dur={self.view_time * 1000:.1f}',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def record_slow_request(entry):
+    """Write an entry into the next ring-buffer slot (incr is atomic across workers)."""
+    size = profiling_setting('RING_SIZE')
+    cache.add(f'{RING_KEY}:seq', 0, timeout=None)
+    seq = cache.incr(f'{RING_KEY}:seq')
+    cache.set(f'{RING_KEY}:{seq % size}', dict(entry, seq=seq), timeout=None)
+
+
+def recent_slow_requests():
+    """Sampled slow requests, newest first."""
+    size = profiling_setting('RING_SIZE')
+    entries = cache.get_many([f'{RING_KEY}:{slot}' for slot in range(size)]).values()
+    return sorted(entries, key=lambda entry: entry['seq'], reverse=True)
+
+
+def _instrument_cache(backend_class):
+    from django.core.cache.backends.base import BaseCache
+
+    if getattr(backend_class, '_profiling_instrumented', False):
+        return
+    original_get = backend_class.get
+    original_get_many = backend_class.get_many
+
+    def get(self, key, default=None, version=None):
+        profile = _current.get()
+        if profile is None:
+            return original_get(self, key, default, version)
+        value = original_get(self, key, _MISSING, version)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+
+    def get_many(self, keys, version=None):
+        profile = _current.get()
+        if profile is None:
+            return original_get_many(self, keys, version)
+        keys = list(keys)
+        result = original_get_many(self, keys, version)
+        profile.cache_hits += len(result)
+        profile.cache_misses += len(keys) - len(result)
+        return result
+
+    backend_class.get = get
+    # BaseCache.get_many() loops over get(), which already counts.
+    if original_get_many is not BaseCache.get_many:
+        backend_class.get_many = get_many
+    backend_class._profiling_instrumented = True
+
+
+def _instrument_templates():
+    from django.template.backends.django import Template
+
+    if getattr(Template, '_profiling_instrumented', False):
+        return
+    original_render = Template.render
+
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return original_render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+    Template.render = render
+    Template._profiling_instrumented = True
+
+
+def install_hooks():
+    """Instrument the configured cache backends and the Django template backend."""
+    from django.core.cache import caches
+
+    for alias in settings.CACHES:
+        _instrument_cache(type(caches[alias]))
+    _instrument_templates()
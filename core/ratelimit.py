@@ -0,0 +1,53 @@
+"""
+Cache-backed throttles.
+
+Counters live in the shared cache (Redis in production) and are updated with
+atomic add/incr, so every worker process sees the same counts and a flood of
+rejected requests costs one cache round-trip each — never a DB write.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+class RateLimitExceeded(ValueError):
+    """Raised when a throttle rejects a request."""
+
+
+def _window_key(scope, identifier, window, index):
+    return f'rl:{scope}:{identifier}:{window}:{index}'
+
+
+def hit(scope, identifier, limit, window, now=None):
+    """
+    Count one event against a sliding window of `window` seconds.
+    Returns True while the weighted count stays within `limit`.
+
+    The window slides by blending the current fixed window with the
+    previous one in proportion to how much of it still overlaps.
+    """
+    now = time.time() if now is None else now
+    index, offset = divmod(now, window)
+    current = increment(_window_key(scope, identifier, window, int(index)), timeout=window * 2)
+    previous = cache.get(_window_key(scope, identifier, window, int(index) - 1), 0)
+    weighted = previous * (1 - offset / window) + current
+    return weighted <= limit
+
+
+def throttle(scope, identifier, limit, window, message):
+    """hit(), raising RateLimitExceeded(message) when over the limit."""
+    if not hit(scope, identifier, limit, window):
+        raise RateLimitExceeded(message)
+
+
+def increment(key, timeout):
+    """Atomically bump a counter that expires `timeout` seconds after it was created."""
+    # add() is a no-op when the key exists, so the TTL is set exactly once.
+    cache.add(key, 0, timeout=timeout)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.add(key, 1, timeout=timeout)
+        return 1
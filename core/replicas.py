@@ -0,0 +1,122 @@
+"""
+Read replicas: read-only views send their queries to a replica of the
+database they would otherwise read. DATABASE_REPLICAS['REPLICAS'] maps a
+primary alias (the default database or a tenant shard, see core.sharding)
+to its replicas.
+
+A view opts in with @read_replica. Writes always go to the primary, and so
+does everything before the view runs: the session, the signed-in user and
+the tenant context.
+
+Read-your-writes: after a user changes a queue (joining, serving, marking
+a no-show, opening or closing a counter) the view calls
+pin_to_primary(request). For PIN_SECONDS the user's session keeps their
+reads on the primary, so they never see a queue from before their own
+action while the replica catches up.
+
+Values stored in the versioned cache (core.cache) are always built from
+the primary, since they are shared and outlive any replication lag.
+"""
+
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+from .sharding import TenantShardRouter, is_tenant_model
+
+DEFAULTS = {
+    'REPLICAS': {},      # primary alias → list of replica aliases
+    'PIN_SECONDS': 10,   # reads stay on the primary this long after the user's own write
+}
+
+PIN_SESSION_KEY = '_primary_until'
+
+_use_replica = contextvars.ContextVar('use_replica', default=False)
+
+
+def replica_setting(name):
+    return getattr(settings, 'DATABASE_REPLICAS', {}).get(name, DEFAULTS[name])
+
+
+def replicas_for(alias):
+    return replica_setting('REPLICAS').get(alias, [])
+
+
+def primary_of(alias):
+    """The primary alias a replica copies; any other alias is its own primary."""
+    for primary, replicas in replica_setting('REPLICAS').items():
+        if alias in replicas:
+            return primary
+    return alias
+
+
+def reading_from_replica():
+    return _use_replica.get()
+
+
+@contextmanager
+def use_replica(enabled=True):
+    """Send reads in this context to a replica (or, with enabled=False, to the primary)."""
+    token = _use_replica.set(enabled)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+def use_primary():
+    return use_replica(False)
+
+
+def pin_to_primary(request):
+    """Keep this user's reads on the primary for PIN_SECONDS. Call after any write the user will look for."""
+    request.session[PIN_SESSION_KEY] = time.time() + replica_setting('PIN_SECONDS')
+
+
+def is_pinned(request):
+    session = getattr(request, 'session', None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+def read_replica(view):
+    """
+    Run a read-only view against the replicas unless the user is pinned to
+    the primary. On class-based views, decorate dispatch with method_decorator.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        # Resolve the user (and with it the tenant context) on the primary.
+        request.user.is_authenticated
+        if is_pinned(request):
+            return view(request, *args, **kwargs)
+        with use_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter(TenantShardRouter):
+    """
+    DATABASE_ROUTERS entry: TenantShardRouter picks the primary, then reads
+    inside use_replica() go to one of its replicas. Rows read from a replica
+    are written back to its primary.
+    """
+
+    def _db_for(self, model, hints):
+        db = super()._db_for(model, hints)
+        return primary_of(db) if db else db
+
+    def db_for_read(self, model, **hints):
+        db = self._db_for(model, hints)
+        if not reading_from_replica():
+            return db
+        replicas = replicas_for(db or 'default')
+        return random.choice(replicas) if replicas else db
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if is_tenant_model(obj1) and is_tenant_model(obj2):
+            return primary_of(obj1._state.db) == primary_of(obj2._state.db)
+        return True
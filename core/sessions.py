@@ -0,0 +1,63 @@
+"""
+Cache session engine that writes to the database only when the signed-in
+user changes (login, logout, password change).
+
+Reads come from the cache, falling back to the database row, as in
+Django's cached_db engine. Other session writes (OTP state, messages, and
+the like) go to the cache only, so a citizen polling their ticket never
+writes a session row. If the cache loses a session, the user stays signed
+in from the database copy and only unsaved non-auth data is lost.
+
+Select it with SESSION_MODE=cache. It needs a cache shared by every worker
+(Redis in production); with a per-process LocMem cache, non-auth session
+data is visible only to the worker that wrote it.
+"""
+
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.sessions.backends import cached_db
+from django.contrib.sessions.backends.base import CreateError
+
+AUTH_KEYS = (SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY)
+SIGNED_OUT = (None, None, None)
+
+
+class SessionStore(cached_db.SessionStore):
+    cache_key_prefix = 'waitfree.sessions'
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._persisted_auth = SIGNED_OUT  # auth keys in the database row; SIGNED_OUT if there is none
+
+    @staticmethod
+    def _auth(data):
+        return tuple(data.get(key) for key in AUTH_KEYS)
+
+    def load(self):
+        data = super().load()
+        # Every auth change is written through, so what was loaded matches the row.
+        self._persisted_auth = self._auth(data)
+        return data
+
+    def create(self):
+        self._persisted_auth = SIGNED_OUT  # a new key has no row yet
+        super().create()
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        auth = self._auth(data)
+        if auth != self._persisted_auth and auth != SIGNED_OUT:
+            # Signed in (or the password hash changed): write the row through.
+            super().save(must_create=must_create or self._persisted_auth == SIGNED_OUT)
+            self._persisted_auth = auth
+            return
+        if auth != self._persisted_auth:
+            # Signed out without a flush: the row must not outlive the sign-in.
+            super().delete(self.session_key)
+            self._persisted_auth = auth
+        if must_create:
+            if not self._cache.add(self.cache_key, data, self.get_expiry_age()):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, self.get_expiry_age())
@@ -0,0 +1,235 @@
+"""
+Tenant sharding: each organization, and everything under it, lives on one
+database alias (a shard). Users, sessions, auth and admin tables stay on
+'default'.
+
+Each shard hands out the ids of its tenant rows (organizations, branches,
+services, tickets) from its own range of ID_SPAN ids, in SHARDS order
+(reserve_id_range, run after every migrate). An id is therefore unique
+across shards and shard_for_id() names the shard holding the row. Only
+ever append to SHARDS: adding a shard leaves every existing id where it is.
+
+A new organization goes to the shard with the fewest organizations; an
+entry in DATABASE_SHARDING['ORGANIZATIONS'] overrides where an existing
+one is looked up (after moving its rows by hand).
+
+Tenant queries go to the shard that is active in the current context.
+TenantContextMiddleware activates the signed-in staff user's shard for the
+request. Admin-wide views call fan_out() to run a function on every shard
+in parallel and merge the results themselves.
+
+Rows on different shards refer to each other only by id: the foreign keys
+between tenant models and users carry no database constraint, and such
+relations are fetched with prefetch_related (join_users) rather than a
+join. With a single shard, routing changes nothing.
+
+Citizen pages are not tied to one organization: those reached by an id
+(a branch, service or ticket) run under use_shard_of(id), and those that
+list rows (facility search, the citizen's tickets) fan out. The outbox
+dispatcher and the no-show sweeper walk every shard; the other management
+commands read the default shard only.
+"""
+
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+
+DEFAULTS = {
+    'SHARDS': ['default'],    # database aliases holding tenant data
+    'ORGANIZATIONS': {},      # organization id → alias; others are spread by id
+    'FANOUT_WORKERS': 8,
+}
+
+# Apps whose models belong to an organization and live on its shard.
+TENANT_APPS = {'organizations', 'facilities', 'counters', 'queues', 'notifications', 'analytics'}
+
+# Tenant ids on the n-th shard of SHARDS start above n * ID_SPAN.
+ID_SPAN = 2 ** 40
+
+_current_shard = contextvars.ContextVar('current_shard', default=None)
+
+
+def sharding_setting(name):
+    return getattr(settings, 'DATABASE_SHARDING', {}).get(name, DEFAULTS[name])
+
+
+def shards():
+    return list(sharding_setting('SHARDS'))
+
+
+def is_sharded():
+    return len(shards()) > 1
+
+
+def is_tenant_model(model):
+    """
+    Takes a model class or instance. Reads _meta off the object itself so
+    lazy wrappers such as request.user (a SimpleLazyObject) resolve too.
+    """
+    return model._meta.app_label in TENANT_APPS
+
+
+def shard_for_organization(organization_id):
+    """The alias holding the organization's data, or None for an id no shard holds."""
+    mapped = sharding_setting('ORGANIZATIONS').get(organization_id)
+    if mapped is not None:
+        return mapped
+    return shard_for_id(organization_id)
+
+
+def shard_for_id(pk):
+    """The shard holding the tenant row with this id (of any tenant model), or None for an id none holds."""
+    try:
+        index = int(pk) // ID_SPAN
+    except (TypeError, ValueError):
+        return None
+    aliases = shards()
+    return aliases[index] if 0 <= index < len(aliases) else None
+
+
+def current_shard():
+    """The alias tenant queries are routed to, or None outside any shard scope."""
+    return _current_shard.get()
+
+
+def tenant_db():
+    """The alias tenant writes go to here: pass it to transaction.atomic() and on_commit()."""
+    return current_shard() or 'default'
+
+
+def key_prefix():
+    """Cache key prefix for shard-local ids: empty on the default shard."""
+    alias = current_shard()
+    return '' if alias in (None, 'default') else f'{alias}:'
+
+
+@contextmanager
+def use_shard(alias):
+    """Route tenant queries in this context to `alias`."""
+    token = _current_shard.set(alias)
+    try:
+        yield alias
+    finally:
+        _current_shard.reset(token)
+
+
+def use_organization(organization_id):
+    """Route tenant queries in this context to the organization's shard."""
+    return use_shard(shard_for_organization(organization_id))
+
+
+def use_shard_of(pk):
+    """Route tenant queries in this context to the shard holding the row with this id."""
+    return use_shard(shard_for_id(pk) or tenant_db())
+
+
+def _run_on(alias, func):
+    try:
+        with use_shard(alias):
+            return func(alias)
+    finally:
+        connections[alias].close()
+
+
+def fan_out(func):
+    """
+    Call func(alias) on every shard, with that shard active, and return the
+    results in shard order. Shards are queried in parallel from a thread
+    pool; a single shard is called inline.
+    """
+    aliases = shards()
+    if len(aliases) == 1:
+        with use_shard(aliases[0]):
+            return [func(aliases[0])]
+    workers = min(len(aliases), sharding_setting('FANOUT_WORKERS'))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Each task runs in a copy of the caller's context (e.g. core.replicas.use_replica).
+        futures = [
+            executor.submit(contextvars.copy_context().run, _run_on, alias, func) for alias in aliases
+        ]
+        return [future.result() for future in futures]
+
+
+def shard_for_new_organization():
+    """The shard a new organization is created on: the one with the fewest organizations, earlier shards first."""
+    from organizations.models import Organization
+
+    counts = fan_out(lambda alias: Organization.objects.count())
+    return shards()[counts.index(min(counts))]
+
+
+def reserve_id_range(alias):
+    """
+    Move the id sequences of the shard's tenant tables to the start of its
+    range, unless they are past it already. Idempotent; runs after every
+    migrate of a shard (core.apps).
+    """
+    index = shards().index(alias)
+    if index == 0:
+        return
+    floor = index * ID_SPAN
+    connection = connections[alias]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        for model in apps.get_models():
+            meta = model._meta
+            if (
+                not is_tenant_model(model) or not meta.managed or meta.proxy or not meta.pk.get_internal_type().endswith('AutoField')
+            ):
+                continue
+            cursor.execute(f'SELECT MAX({quote(meta.pk.column)}) FROM {quote(meta.db_table)}')
+            if (cursor.fetchone()[0] or 0) >= floor:
+                continue
+            if connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s', [floor, meta.db_table])
+                if not cursor.rowcount:
+                    cursor.execute('INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)', [meta.db_table, floor])
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT setval(pg_get_serial_sequence(%s, %s), %s)', [meta.db_table, meta.pk.column, floor])
+            elif connection.vendor == 'mysql':
+                cursor.execute(f'ALTER TABLE {quote(meta.db_table)} AUTO_INCREMENT = {floor + 1}')
+            else:
+                raise NotImplementedError(f'Cannot reserve an id range on {connection.vendor} ({alias}).')
+
+
+def join_users(queryset, *fields):
+    """Load user relations of tenant rows: a join on one database, a second query across shards."""
+    if is_sharded():
+        return queryset.prefetch_related(*fields)
+    return queryset.select_related(*fields)
+
+
+class TenantShardRouter:
+    """
+    Picks the database of a model: tenant models follow the instance they
+    are reached from, else the active shard; everything else uses 'default'.
+    Installed through core.replicas.ReplicaRouter.
+    Every alias carries the full schema so migrations apply unchanged.
+    """
+
+    def _db_for(self, model, hints):
+        if not is_tenant_model(model):
+            return 'default'
+        instance = hints.get('instance')
+        if instance is not None and is_tenant_model(instance) and instance._state.db:
+            return instance._state.db
+        return current_shard()
+
+    def db_for_read(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._db_for(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Tenant rows point at users (and users at their organization) across databases by id.
+        if is_tenant_model(obj1) and is_tenant_model(obj2):
+            return obj1._state.db == obj2._state.db
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return True
@@ -0,0 +1,99 @@
+"""
+Per-request tenant context: the signed-in user's organization, branch,
+operator assignment, counter and service, loaded together.
+
+The relations are fetched in one select_related query and kept in the
+versioned cache (core.cache) under the user's organization and branch
+versions. Every counter, service, operator and organization change already
+bumps one of those, so the context is rebuilt on the request after the
+change. TenantContextMiddleware copies the relations onto request.user, so
+request.user.branch, user.current_counter.service and the like cost no
+queries in views or templates.
+"""
+
+from . import cache as versioned_cache
+from . import sharding
+from .roles import CITIZEN
+
+# Relations of User that are loaded and cached, as select_related paths.
+RELATED = (
+    'organization',
+    'branch__organization',
+    'operator_assignment__counter__service',
+    'operator_assignment__counter__branch',
+    'current_counter__service',
+)
+
+# Reverse relations whose objects point back at the user; the cached copies
+# carry no user and are re-pointed at request.user on attach.
+BACK_REFERENCES = {'operator_assignment': 'user', 'current_counter': 'current_operator'}
+
+
+class TenantContext:
+    """What a staff request needs to know about where its user works. Empty for citizens and anonymous users."""
+
+    def __init__(self, relations=None):
+        self.relations = relations or {}  # field cache name → related object (or None)
+        self.organization = self.relations.get('organization')
+        self.branch = self.relations.get('branch')
+        self.assignment = self.relations.get('operator_assignment')
+        self.counter = self.assignment.counter if self.assignment else None
+        self.service = self.counter.service if self.counter else None
+
+    def attach(self, user):
+        """Seed the user's relation caches so attribute access does not query."""
+        for name, value in self.relations.items():
+            user._state.fields_cache[name] = value
+        for name, back in BACK_REFERENCES.items():
+            if self.relations.get(name) is not None:
+                self.relations[name]._state.fields_cache[back] = user
+
+
+def load_relations(user):
+    """The user's related objects keyed by field cache name, in one query."""
+    from accounts.models import User
+
+    if sharding.is_sharded():
+        return load_sharded_relations(user)
+
+    loaded = User.objects.select_related(*RELATED).get(pk=user.pk)
+    relations = {
+        name: loaded._state.fields_cache.get(name)
+        for name in ('organization', 'branch', 'operator_assignment', 'current_counter')
+    }
+    for name, back in BACK_REFERENCES.items():
+        if relations[name] is not None:
+            relations[name]._state.fields_cache.pop(back, None)
+    return relations
+
+
+def load_sharded_relations(user):
+    """
+    load_relations() when users and tenant rows live on different databases
+    (core.sharding): one query per relation on the active shard, no joins.
+    """
+    from counters.models import Counter, OperatorAssignment
+    from facilities.models import Branch
+    from organizations.models import Organization
+
+    return {
+        'organization': Organization.objects.filter(pk=user.organization_id).first() if user.organization_id else None,
+        'branch': (
+            Branch.objects.select_related('organization').filter(pk=user.branch_id).first() if user.branch_id else None
+        ),
+        'operator_assignment': OperatorAssignment.objects.select_related(
+            'counter__service', 'counter__branch',
+        ).filter(user_id=user.pk).first(),
+        'current_counter': Counter.objects.select_related('service').filter(current_operator_id=user.pk).first(),
+    }
+
+
+def get_tenant(user):
+    """The TenantContext for `user`, from the cache when its organization and branch are unchanged."""
+    if not user.is_authenticated or user.role == CITIZEN:
+        return TenantContext()
+    relations = versioned_cache.get_or_set(
+        'tenant', lambda: load_relations(user), user.pk,
+        organization=user.organization_id, branch=user.branch_id,
+    )
+    return TenantContext(relations)
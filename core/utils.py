@@ -13,6 +13,14 @@ def generate_otp():
     return ''.join([str(random.randint(0, 9)) for _ in range(length)])
 
 
+def get_client_ip(request):
+    """
+    The connecting client's address. Behind a proxy, configure it to set
+    REMOTE_ADDR; X-Forwarded-For is client-controlled and not trusted here.
+    """
+    return request.META.get('REMOTE_ADDR', '')
+
+
 def calculate_eta(position, avg_service_time_minutes, active_counter_count):
     """
     Calculate estimated wait time in minutes.
@@ -1,3 +1,40 @@
-from django.shortcuts import render
+"""
+Core views: Prometheus metrics endpoint.
+"""
 
-# Create your views here.
+from django.db.models import Count
+from django.http import HttpResponse
+from django.views import View
+
+from core import metrics
+
+
+class MetricsView(View):
+    """Prometheus scrape target: engine histograms and counters plus live queue depth."""
+
+    def get(self, request):
+        token = metrics.metrics_setting('TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponse(status=401)
+
+        counters, histograms = metrics.collect()
+        body = metrics.render(counters, histograms, gauges=self.queue_depth())
+        return HttpResponse(body, content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @staticmethod
+    def queue_depth():
+        from queues.models import QueueTicket
+
+        depth = {'waiting': [], 'serving': []}
+        rows = (
+            QueueTicket.objects.filter(status__in=depth)
+            .values('service_id', 'status')
+            .annotate(count=Count('id'))
+            .order_by('service_id')
+        )
+        for row in rows:
+            depth[row['status']].append(({'service': row['service_id']}, row['count']))
+        return [
+            ('waitfree_queue_waiting', 'Tickets waiting, per service.', depth['waiting']),
+            ('waitfree_queue_serving', 'Tickets being served, per service.', depth['serving']),
+        ]
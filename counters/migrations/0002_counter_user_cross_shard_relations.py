@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('counters', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='counter',
+            name='current_operator',
+            field=models.OneToOneField(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='current_counter', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='operatorassignment',
+            name='user',
+            field=models.OneToOneField(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='operator_assignment', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
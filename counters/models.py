@@ -24,6 +24,7 @@ class Counter(models.Model):
     current_operator = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
+        db_constraint=False,  # users stay on the default database (core.sharding)
         null=True,
         blank=True,
         related_name='current_counter',
@@ -47,6 +48,7 @@ class OperatorAssignment(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,
         related_name='operator_assignment',
     )
     counter = models.OneToOneField(
@@ -5,5 +5,6 @@ app_name = 'counters'
 
 urlpatterns = [
     path('operator/dashboard/', views.OperatorDashboardView.as_view(), name='operator_dashboard'),
+    path('operator/dashboard/queue.json', views.OperatorQueueDataView.as_view(), name='operator_queue'),
     path('operator/control/', views.CounterControlView.as_view(), name='toggle_counter'),
 ]
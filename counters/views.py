@@ -3,74 +3,138 @@ Operator views: dashboard, counter open/close.
 All views enforce operator role and counter assignment.
 """
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
+from django.http import HttpResponseNotModified, JsonResponse
 from django.views import View
 from django.utils import timezone
+from django.utils.decorators import method_decorator
 
+from core import cache as versioned_cache
 from core.mixins import OperatorRequiredMixin
-from .models import Counter, OperatorAssignment
+from core.replicas import pin_to_primary, read_replica
+from .models import Counter
 
+DEFAULTS = {
+    'WINDOW': 10,           # waiting tickets shown to the operator
+    'REFRESH_SECONDS': 5,   # how often the page polls OperatorQueueDataView
+}
 
+
+def dashboard_setting(name):
+    return getattr(settings, 'OPERATOR_DASHBOARD', {}).get(name, DEFAULTS[name])
+
+
+def queue_window(counter):
+    """
+    What the operator sees: the ticket this counter is serving, the next
+    WINDOW waiting tickets and the length of the line. Two indexed queries
+    whatever the queue length; the length is the service's denormalized
+    queue_length, which the tenant context reloads after every queue change.
+    """
+    from queues.models import QueueTicket
+
+    current_ticket = QueueTicket.objects.filter(
+        counter=counter,
+        status='serving',
+    ).only('token_number', 'called_at').first()
+    waiting_tickets = list(
+        QueueTicket.objects.filter(service_id=counter.service_id, status='waiting')
+        .order_by('joined_at')
+        .only('token_number', 'position', 'estimated_wait_time')[:dashboard_setting('WINDOW')]
+    )
+    return {
+        'current_ticket': current_ticket,
+        'waiting_tickets': waiting_tickets,
+        'waiting_count': counter.service.queue_length,
+    }
+
+
+@method_decorator(read_replica, name='dispatch')
 class OperatorDashboardView(OperatorRequiredMixin, View):
-    """Operator dashboard showing assigned counter and queue status."""
+    """Operator dashboard showing assigned counter and the head of its queue."""
 
     def get(self, request):
-        try:
-            assignment = request.user.operator_assignment
-            counter = assignment.counter
-        except OperatorAssignment.DoesNotExist:
+        counter = request.tenant.counter
+        if counter is None:
             return render(request, 'operator/dashboard.html', {
                 'has_assignment': False,
             })
 
-        from queues.models import QueueTicket
-        waiting_tickets = QueueTicket.objects.filter(
-            service=counter.service,
-            branch=counter.branch,
-            status='waiting',
-        ).order_by('joined_at')
-
-        current_ticket = QueueTicket.objects.filter(
-            service=counter.service,
-            branch=counter.branch,
-            status='serving',
-        ).first()
-
         context = {
             'has_assignment': True,
             'counter': counter,
             'service': counter.service,
-            'waiting_tickets': waiting_tickets,
-            'waiting_count': waiting_tickets.count(),
-            'current_ticket': current_ticket,
+            'refresh_seconds': dashboard_setting('REFRESH_SECONDS'),
+            **queue_window(counter),
         }
         return render(request, 'operator/dashboard.html', context)
 
 
+class OperatorQueueDataView(OperatorRequiredMixin, View):
+    """
+    The dashboard's queue window as JSON, polled by the page. The ETag is
+    the service's cache version, which every queue change bumps, so an
+    unchanged queue is answered with 304 and no queries. The window is read
+    from the primary: a lagging replica would pair the new version with an
+    old window, and the page would keep it until the next change.
+    """
+
+    def get(self, request):
+        counter = request.tenant.counter
+        if counter is None:
+            return JsonResponse({'error': 'You are not assigned to any counter.'}, status=404)
+
+        etag = f'"{versioned_cache.get_version("service", counter.service_id)}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            window = queue_window(counter)
+            current = window['current_ticket']
+            response = JsonResponse({
+                'is_open': counter.is_open,
+                'waiting_count': window['waiting_count'],
+                'current': current and {
+                    'token_number': current.token_number,
+                    'called_at': current.called_at.isoformat() if current.called_at else None,
+                },
+                'waiting': [
+                    {
+                        'position': ticket.position,
+                        'token_number': ticket.token_number,
+                        'estimated_wait_time': ticket.estimated_wait_time,
+                    }
+                    for ticket in window['waiting_tickets']
+                ],
+            })
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
 class CounterControlView(OperatorRequiredMixin, View):
     """Open or close the operator's assigned counter."""
 
     def post(self, request):
-        try:
-            assignment = request.user.operator_assignment
-            counter = assignment.counter
-        except OperatorAssignment.DoesNotExist:
+        counter = request.tenant.counter
+        if counter is None:
             messages.error(request, 'You are not assigned to any counter.')
             return redirect('counters:operator_dashboard')
 
+        # Opening/closing recalculates ETAs for all waiting tickets in this service
+        from queues import engine
+
         action = request.POST.get('action')
         if action == 'open':
-            counter.is_open = True
-            counter.save()
+            engine.open_counter(counter, operator=request.user)
             messages.success(request, f'Counter {counter.number} is now OPEN.')
         elif action == 'close':
-            counter.is_open = False
-            counter.save()
+            engine.close_counter(counter, operator=request.user)
             messages.success(request, f'Counter {counter.number} is now CLOSED.')
-
-        # Recalculate ETAs for all waiting tickets in this service
-        from queues.engine import recalculate_eta
-        recalculate_eta(counter.service)
+        else:
+            engine.recalculate_eta(counter.service)
+            versioned_cache.bump_service(counter.service)
+        pin_to_primary(request)
 
         return redirect('counters:operator_dashboard')
@@ -1,13 +1,22 @@
 """
 Dashboard views: role-based routing to appropriate dashboards.
+Global admin views read every database shard (core.sharding.fan_out) and merge.
 """
 
+from itertools import chain
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views import View
 from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.decorators import method_decorator
 
+from core import cache as versioned_cache
+from core import sharding
 from core.mixins import GlobalAdminRequiredMixin
+from core.replicas import read_replica
+from core.profiling import profiling_setting, recent_slow_requests
 from core.roles import GLOBAL_ADMIN, ORGANIZATION, BRANCH, OPERATOR, CITIZEN
 from organizations.models import Organization
 from facilities.models import Branch, Service
@@ -33,33 +42,49 @@ class DashboardRouterView(LoginRequiredMixin, View):
         return redirect('landing')
 
 
+def sum_across_shards(count):
+    """Add up count(alias) -> {name: number} over every shard."""
+    totals = {}
+    for counts in sharding.fan_out(count):
+        for name, value in counts.items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+
+@method_decorator(read_replica, name='dispatch')
 class AdminDashboardView(GlobalAdminRequiredMixin, View):
     """Admin dashboard with global monitoring."""
 
-    def get(self, request):
-        context = {
+    @staticmethod
+    def shard_counts(alias):
+        return {
             'total_orgs': Organization.objects.count(),
             'active_orgs': Organization.objects.filter(is_active=True).count(),
             'total_branches': Branch.objects.count(),
             'active_branches': Branch.objects.filter(is_active=True).count(),
             'total_counters': Counter.objects.count(),
             'open_counters': Counter.objects.filter(is_open=True).count(),
-            'today_tickets': QueueTicket.objects.filter(
-                joined_at__date=__import__('django.utils', fromlist=['timezone']).timezone.localdate()
-            ).count(),
+            'today_tickets': QueueTicket.objects.filter(joined_at__date=timezone.localdate()).count(),
             'waiting_now': QueueTicket.objects.filter(status='waiting').count(),
             'serving_now': QueueTicket.objects.filter(status='serving').count(),
         }
+
+    def get(self, request):
+        context = sum_across_shards(self.shard_counts)
         return render(request, 'admin_panel/dashboard.html', context)
 
 
 class ManageOrganizationsView(GlobalAdminRequiredMixin, View):
     """Admin manages organizations."""
 
-    def get(self, request):
-        orgs = Organization.objects.annotate(
+    @staticmethod
+    def shard_organizations(alias):
+        return list(Organization.objects.annotate(
             branch_count_val=Count('branches'),
-        )
+        ))
+
+    def get(self, request):
+        orgs = sorted(chain.from_iterable(sharding.fan_out(self.shard_organizations)), key=lambda org: org.name)
         return render(request, 'admin_panel/manage_orgs.html', {'organizations': orgs})
 
     def post(self, request):
@@ -68,43 +93,43 @@ class ManageOrganizationsView(GlobalAdminRequiredMixin, View):
 
         if action == 'toggle' and org_id:
             from django.contrib import messages
-            org = Organization.objects.get(id=org_id)
-            org.is_active = not org.is_active
-            org.save()
+            with sharding.use_organization(int(org_id)):
+                org = Organization.objects.get(id=org_id)
+                org.is_active = not org.is_active
+                org.save()
+            versioned_cache.bump(organization=org.id)
             status = 'activated' if org.is_active else 'deactivated'
             messages.success(request, f'Organization "{org.name}" {status}.')
 
         return redirect('dashboard:manage_orgs')
 
 
+@method_decorator(read_replica, name='dispatch')
 class GlobalMonitorView(GlobalAdminRequiredMixin, View):
     """Global queue monitoring across all organizations."""
 
-    def get(self, request):
-        branches = Branch.objects.filter(is_active=True).select_related('organization').annotate(
+    @staticmethod
+    def shard_branches(alias):
+        return list(Branch.objects.filter(is_active=True).select_related('organization').annotate(
             waiting_count=Count('queue_tickets', filter=Q(queue_tickets__status='waiting')),
             serving_count=Count('queue_tickets', filter=Q(queue_tickets__status='serving')),
-        )
+        ))
+
+    def get(self, request):
+        branches = sorted(chain.from_iterable(sharding.fan_out(self.shard_branches)), key=lambda branch: branch.name)
         return render(request, 'admin_panel/global_monitor.html', {
             'branches': branches,
         })
 
 
+@method_decorator(read_replica, name='dispatch')
 class SystemHealthView(GlobalAdminRequiredMixin, View):
     """System health and stats."""
 
-    def get(self, request):
-        from django.utils import timezone
-        from datetime import timedelta
-        from accounts.models import User
-
-        now = timezone.now()
+    @staticmethod
+    def shard_counts(alias):
         today = timezone.localdate()
-
-        context = {
-            'total_users': User.objects.count(),
-            'citizen_count': User.objects.filter(role=CITIZEN).count(),
-            'operator_count': User.objects.filter(role=OPERATOR).count(),
+        return {
             'total_tickets_today': QueueTicket.objects.filter(joined_at__date=today).count(),
             'served_today': QueueTicket.objects.filter(status='served', served_at__date=today).count(),
             'no_show_today': QueueTicket.objects.filter(status='no_show', no_show_at__date=today).count(),
@@ -113,20 +138,42 @@ class SystemHealthView(GlobalAdminRequiredMixin, View):
             'total_services': Service.objects.count(),
             'total_counters': Counter.objects.count(),
         }
+
+    def get(self, request):
+        from accounts.models import User
+
+        context = {
+            'total_users': User.objects.count(),
+            'citizen_count': User.objects.filter(role=CITIZEN).count(),
+            'operator_count': User.objects.filter(role=OPERATOR).count(),
+            **sum_across_shards(self.shard_counts),
+            'profiling_enabled': profiling_setting('ENABLED'),
+            'slow_requests': recent_slow_requests(),
+        }
         return render(request, 'admin_panel/system_health.html', context)
 
 
+@method_decorator(read_replica, name='dispatch')
 class CitizenDashboardView(View):
     """Citizen dashboard showing active tickets and facility search."""
 
+    @staticmethod
+    def shard_tickets(citizen_id):
+        return list(QueueTicket.objects.filter(
+            citizen_id=citizen_id,
+            status__in=['waiting', 'serving'],
+        ).select_related('service', 'branch'))
+
     def get(self, request):
         if not request.user.is_authenticated or request.user.role != CITIZEN:
             return redirect('accounts:login')
 
-        active_tickets = QueueTicket.objects.filter(
-            citizen=request.user,
-            status__in=['waiting', 'serving'],
-        ).select_related('service', 'branch')
+        # A citizen can hold tickets with organizations on any shard.
+        citizen_id = request.user.id
+        active_tickets = sorted(
+            chain.from_iterable(sharding.fan_out(lambda alias: self.shard_tickets(citizen_id))),
+            key=lambda ticket: ticket.joined_at,
+        )
 
         return render(request, 'citizen/dashboard.html', {
             'active_tickets': active_tickets,
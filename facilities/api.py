@@ -0,0 +1,49 @@
+"""
+Branch API for staff clients, authenticated by JWT
+(core.authentication.ClaimsJWTAuthentication). Claims are fixed at sign-in,
+so endpoints that change data re-check the role and branch against the
+user row before acting.
+"""
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import sharding
+from core.authentication import ClaimsJWTAuthentication
+from core.permissions import IsBranch
+from core.roles import BRANCH
+from queues import engine
+
+BULK_ACTIONS = {'open': True, 'close': False}
+
+
+class BulkCounterAPIView(APIView):
+    """
+    Open or close many of the branch's counters at once.
+    Body: {"action": "open" | "close", "counter_ids": [...]}; without
+    counter_ids the action applies to every counter of the branch.
+    """
+
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsBranch]
+
+    def post(self, request):
+        action = request.data.get('action')
+        if action not in BULK_ACTIONS:
+            return Response({'detail': 'action must be "open" or "close".'}, status=status.HTTP_400_BAD_REQUEST)
+        counter_ids = request.data.get('counter_ids')
+        if counter_ids is not None and (
+            not isinstance(counter_ids, list) or not all(isinstance(value, int) for value in counter_ids)
+        ):
+            return Response({'detail': 'counter_ids must be a list of ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        # The token's claims may predate a move or demotion; the user row is current.
+        user = request.user.instance
+        if user.role != BRANCH or user.branch_id is None or user.organization_id is None:
+            return Response({'detail': 'Your account has no branch.'}, status=status.HTTP_403_FORBIDDEN)
+
+        with sharding.use_organization(user.organization_id):
+            changed = engine.set_counters_open(
+                user.branch_id, BULK_ACTIONS[action], counter_ids=counter_ids, actor=user,
+            )
+        return Response({'action': action, 'changed': changed})
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='no_show_grace_minutes',
+            field=models.PositiveIntegerField(default=15, help_text='Minutes a called ticket may stay in serving before it is swept as no-show'),
+        ),
+    ]
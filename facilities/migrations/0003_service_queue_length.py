@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:14
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_queue_length(apps, schema_editor):
+    Service = apps.get_model('facilities', 'Service')
+    QueueTicket = apps.get_model('queues', 'QueueTicket')
+    waiting = (
+        QueueTicket.objects.filter(service=OuterRef('pk'), status='waiting')
+        .order_by().values('service').annotate(n=Count('id')).values('n')
+    )
+    Service.objects.update(
+        queue_length=Coalesce(Subquery(waiting, output_field=IntegerField()), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0002_service_no_show_grace'),
+        ('queues', '0007_ticket_joined_at_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='queue_length',
+            field=models.PositiveIntegerField(default=0, help_text='Waiting tickets, maintained by the queue engine (denormalized from QueueTicket)'),
+        ),
+        migrations.RunPython(backfill_queue_length, migrations.RunPython.noop),
+    ]
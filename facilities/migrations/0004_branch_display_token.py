@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:30
+
+from django.db import migrations, models
+
+import facilities.models
+
+
+def fill_display_tokens(apps, schema_editor):
+    Branch = apps.get_model('facilities', 'Branch')
+    branches = list(Branch.objects.all())
+    for branch in branches:
+        branch.display_token = facilities.models.new_display_token()
+    Branch.objects.bulk_update(branches, ['display_token'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0003_service_queue_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='branch',
+            name='display_token',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_display_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='branch',
+            name='display_token',
+            field=models.CharField(default=facilities.models.new_display_token, help_text='Secret in the lobby display board URL; rotate to revoke old screens', max_length=64, unique=True),
+        ),
+    ]
@@ -3,9 +3,15 @@ Branch and Service models.
 Hierarchy: Organization → Branch → Service
 """
 
+import secrets
+
 from django.db import models
 
 
+def new_display_token():
+    return secrets.token_urlsafe(24)
+
+
 class Branch(models.Model):
     """A physical branch/location belonging to an organization."""
     name = models.CharField(max_length=255)
@@ -17,6 +23,12 @@ class Branch(models.Model):
     address = models.TextField(blank=True)
     city = models.CharField(max_length=100, blank=True)
     is_active = models.BooleanField(default=True)
+    display_token = models.CharField(
+        max_length=64,
+        unique=True,
+        default=new_display_token,
+        help_text='Secret in the lobby display board URL; rotate to revoke old screens',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -46,7 +58,15 @@ class Service(models.Model):
         default=10,
         help_text='Average service time in minutes',
     )
+    no_show_grace_minutes = models.PositiveIntegerField(
+        default=15,
+        help_text='Minutes a called ticket may stay in serving before it is swept as no-show',
+    )
     is_active = models.BooleanField(default=True)
+    queue_length = models.PositiveIntegerField(
+        default=0,
+        help_text='Waiting tickets, maintained by the queue engine (denormalized from QueueTicket)',
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'facilities'
 
@@ -10,6 +10,10 @@ urlpatterns = [
     path('branch/counters/', views.ManageCountersView.as_view(), name='manage_counters'),
     path('branch/operators/', views.ManageOperatorsView.as_view(), name='manage_operators'),
     path('branch/monitor/', views.LiveQueueMonitorView.as_view(), name='live_monitor'),
+    path('branch/display/rotate/', views.RotateDisplayTokenView.as_view(), name='rotate_display_token'),
+
+    # Branch API (JWT)
+    path('api/branch/counters/', api.BulkCounterAPIView.as_view(), name='api_bulk_counters'),
 
     # Citizen-facing
     path('search/', views.FacilitySearchView.as_view(), name='facility_search'),
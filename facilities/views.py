@@ -3,18 +3,26 @@ Facility views: branch dashboard, service CRUD, citizen-facing search.
 All views enforce RBAC at view level via mixins.
 """
 
+from itertools import chain
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
 from django.db.models import Q, Count
+from django.utils.decorators import method_decorator
 
+from core import cache as versioned_cache
+from core import sharding
 from core.mixins import BranchRequiredMixin, CitizenRequiredMixin, RoleRequiredMixin
+from core.replicas import pin_to_primary, read_replica
 from core.roles import BRANCH, CITIZEN, OPERATOR
+from core.sharding import join_users
 from accounts.models import User
 from .models import Branch, Service
 from counters.models import Counter, OperatorAssignment
 
 
+@method_decorator(read_replica, name='dispatch')
 class BranchDashboardView(BranchRequiredMixin, View):
     """Branch manager dashboard."""
 
@@ -42,6 +50,15 @@ class BranchDashboardView(BranchRequiredMixin, View):
         return render(request, 'branch/dashboard.html', context)
 
 
+def _minutes_field(value, minimum):
+    """A whole number of minutes from a form field, or None when it is blank, not a number or below minimum."""
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        return None
+    return minutes if minutes >= minimum else None
+
+
 class ManageServicesView(BranchRequiredMixin, View):
     """CRUD for services under the branch."""
 
@@ -59,20 +76,27 @@ class ManageServicesView(BranchRequiredMixin, View):
 
         if action == 'create':
             name = request.POST.get('name', '').strip()
-            avg_time = request.POST.get('avg_service_time', '10')
+            avg_time = _minutes_field(request.POST.get('avg_service_time', '10'), minimum=1)
+            grace = _minutes_field(request.POST.get('no_show_grace_minutes', '15'), minimum=0)
             description = request.POST.get('description', '').strip()
 
             if not name:
                 messages.error(request, 'Service name is required.')
+            elif avg_time is None:
+                messages.error(request, 'Average service time must be a whole number of minutes, at least 1.')
+            elif grace is None:
+                messages.error(request, 'No-show grace period must be a whole number of minutes, 0 or more.')
             elif Service.objects.filter(name=name, branch=branch).exists():
                 messages.error(request, 'Service with this name already exists.')
             else:
                 Service.objects.create(
                     name=name,
                     branch=branch,
-                    avg_service_time=int(avg_time),
+                    avg_service_time=avg_time,
+                    no_show_grace_minutes=grace,
                     description=description,
                 )
+                versioned_cache.bump(branch=branch.id)
                 messages.success(request, f'Service "{name}" created.')
 
         elif action == 'toggle':
@@ -80,6 +104,7 @@ class ManageServicesView(BranchRequiredMixin, View):
             service = get_object_or_404(Service, id=service_id, branch=branch)
             service.is_active = not service.is_active
             service.save()
+            versioned_cache.bump_service(service)
             status = 'activated' if service.is_active else 'deactivated'
             messages.success(request, f'Service "{service.name}" {status}.')
 
@@ -87,17 +112,18 @@ class ManageServicesView(BranchRequiredMixin, View):
             service_id = request.POST.get('service_id')
             service = get_object_or_404(Service, id=service_id, branch=branch)
             service.delete()
+            versioned_cache.bump(branch=branch.id, service=service_id)
             messages.success(request, f'Service deleted.')
 
         return redirect('facilities:manage_services')
 
 
 class ManageCountersView(BranchRequiredMixin, View):
-    """CRUD for counters under the branch."""
+    """CRUD for counters under the branch, plus opening or closing a selection of them at once."""
 
     def get(self, request):
         branch = request.user.branch
-        counters = Counter.objects.filter(branch=branch).select_related('service', 'current_operator')
+        counters = join_users(Counter.objects.filter(branch=branch).select_related('service'), 'current_operator')
         services = Service.objects.filter(branch=branch, is_active=True)
         return render(request, 'branch/manage_counters.html', {
             'branch': branch,
@@ -125,14 +151,28 @@ class ManageCountersView(BranchRequiredMixin, View):
                         branch=branch,
                         service=service,
                     )
+                    versioned_cache.bump_service(service)
                     messages.success(request, f'Counter {number} created.')
 
         elif action == 'delete':
             counter_id = request.POST.get('counter_id')
             counter = get_object_or_404(Counter, id=counter_id, branch=branch)
             counter.delete()
+            versioned_cache.bump(branch=branch.id, service=counter.service_id)
             messages.success(request, 'Counter deleted.')
 
+        elif action in ('bulk_open', 'bulk_close'):
+            from queues import engine
+
+            counter_ids = [value for value in request.POST.getlist('counter_ids') if value.isdigit()]
+            if not counter_ids:
+                messages.error(request, 'Select at least one counter.')
+            else:
+                is_open = action == 'bulk_open'
+                changed = engine.set_counters_open(branch.id, is_open, counter_ids=counter_ids, actor=request.user)
+                pin_to_primary(request)
+                messages.success(request, f'{len(changed)} counter(s) {"opened" if is_open else "closed"}.')
+
         return redirect('facilities:manage_counters')
 
 
@@ -143,7 +183,7 @@ class ManageOperatorsView(BranchRequiredMixin, View):
         branch = request.user.branch
         operators = User.objects.filter(role=OPERATOR, branch=branch)
         counters = Counter.objects.filter(branch=branch)
-        assignments = OperatorAssignment.objects.filter(counter__branch=branch).select_related('user', 'counter')
+        assignments = join_users(OperatorAssignment.objects.filter(counter__branch=branch).select_related('counter'), 'user')
         return render(request, 'branch/manage_operators.html', {
             'branch': branch,
             'operators': operators,
@@ -177,6 +217,7 @@ class ManageOperatorsView(BranchRequiredMixin, View):
                     OperatorAssignment.objects.create(user=operator, counter=counter)
                     counter.current_operator = operator
                     counter.save()
+                    versioned_cache.bump(branch=branch.id)
                 messages.success(request, f'Operator "{username}" created.')
 
         elif action == 'assign':
@@ -192,17 +233,20 @@ class ManageOperatorsView(BranchRequiredMixin, View):
             OperatorAssignment.objects.create(user=operator, counter=counter)
             counter.current_operator = operator
             counter.save()
+            versioned_cache.bump(branch=branch.id)
             messages.success(request, f'Operator "{operator.username}" assigned to Counter {counter.number}.')
 
         elif action == 'delete':
             operator_id = request.POST.get('operator_id')
             operator = get_object_or_404(User, id=operator_id, role=OPERATOR, branch=branch)
             operator.delete()
+            versioned_cache.bump(branch=branch.id)
             messages.success(request, 'Operator deleted.')
 
         return redirect('facilities:manage_operators')
 
 
+@method_decorator(read_replica, name='dispatch')
 class LiveQueueMonitorView(BranchRequiredMixin, View):
     """Live queue monitor for branch managers."""
 
@@ -211,7 +255,7 @@ class LiveQueueMonitorView(BranchRequiredMixin, View):
         from queues.models import QueueTicket
 
         services = Service.objects.filter(branch=branch, is_active=True)
-        counters = Counter.objects.filter(branch=branch).select_related('service', 'current_operator')
+        counters = join_users(Counter.objects.filter(branch=branch).select_related('service'), 'current_operator')
 
         queue_data = []
         for service in services:
@@ -235,11 +279,23 @@ class LiveQueueMonitorView(BranchRequiredMixin, View):
         return render(request, 'branch/live_monitor.html', context)
 
 
+class RotateDisplayTokenView(BranchRequiredMixin, View):
+    """Replace the branch's lobby display token, revoking the old board URL."""
+
+    def post(self, request):
+        from queues import display
+
+        display.rotate_token(request.user.branch)
+        messages.success(request, 'Display board link rotated. Update the lobby screens with the new link.')
+        return redirect('facilities:branch_dashboard')
+
+
+@method_decorator(read_replica, name='dispatch')
 class FacilitySearchView(View):
     """Public facility search for citizens."""
 
-    def get(self, request):
-        query = request.GET.get('q', '').strip()
+    @staticmethod
+    def shard_branches(query):
         branches = Branch.objects.filter(is_active=True)
         if query:
             branches = branches.filter(
@@ -248,23 +304,44 @@ class FacilitySearchView(View):
                 Q(city__icontains=query) |
                 Q(address__icontains=query)
             )
-        branches = branches.select_related('organization')
+        return list(branches.select_related('organization'))
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        branches = sorted(
+            chain.from_iterable(sharding.fan_out(lambda alias: self.shard_branches(query))),
+            key=lambda branch: branch.name,
+        )
         return render(request, 'citizen/facility_search.html', {
             'branches': branches,
             'query': query,
         })
 
 
+@method_decorator(read_replica, name='dispatch')
 class BranchDetailView(View):
     """Branch detail view for citizens showing services and queue status."""
 
     def get(self, request, branch_id):
-        branch = get_object_or_404(Branch, id=branch_id, is_active=True)
-        services = Service.objects.filter(branch=branch, is_active=True)
+        with sharding.use_shard_of(branch_id):
+            branch = get_object_or_404(Branch, id=branch_id, is_active=True)
+            context = {
+                'branch': branch,
+                # Shared by every visitor until the branch's queues or setup change.
+                'service_data': versioned_cache.get_or_set(
+                    'branch_services', lambda: self.service_data(branch), branch.id,
+                    organization=branch.organization_id, branch=branch.id,
+                ),
+            }
+            return render(request, 'citizen/branch_detail.html', context)
+
+    @staticmethod
+    def service_data(branch):
+        from queues.models import QueueTicket
 
+        services = Service.objects.filter(branch=branch, is_active=True)
         service_data = []
         for service in services:
-            from queues.models import QueueTicket
             waiting_count = QueueTicket.objects.filter(
                 service=service, status='waiting'
             ).count()
@@ -276,9 +353,4 @@ class BranchDetailView(View):
                 'waiting_count': waiting_count,
                 'open_counters': open_counters,
             })
-
-        context = {
-            'branch': branch,
-            'service_data': service_data,
-        }
-        return render(request, 'citizen/branch_detail.html', context)
+        return service_data
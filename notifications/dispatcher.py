@@ -0,0 +1,136 @@
+"""
+Outbox dispatcher: claims due notifications in batches, hands them to the
+provider and records the outcome. Failures are rescheduled with exponential
+backoff. Any number of dispatcher processes can run side by side — each
+claims a disjoint batch (SELECT ... FOR UPDATE SKIP LOCKED plus a lease).
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core import metrics
+from core.sharding import join_users, tenant_db
+from .models import NotificationLog
+from .providers import get_provider
+from .services import render_otp_message
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE_SECONDS': 30,
+    'BACKOFF_MAX_SECONDS': 3600,
+    'LEASE_SECONDS': 120,
+}
+
+
+def outbox_setting(name):
+    return getattr(settings, 'NOTIFICATION_OUTBOX', {}).get(name, DEFAULTS[name])
+
+
+def backoff_delay(attempt):
+    """Delay before retry number `attempt` (1-based): base * 2^(attempt-1), capped."""
+    delay = outbox_setting('BACKOFF_BASE_SECONDS') * 2 ** (attempt - 1)
+    return timedelta(seconds=min(delay, outbox_setting('BACKOFF_MAX_SECONDS')))
+
+
+def claim_batch(batch_size=None, now=None):
+    """
+    Lease up to batch_size due notifications to this worker.
+    Rows left in SENDING by a crashed worker become claimable again once
+    their lease expires.
+    """
+    now = now or timezone.now()
+    batch_size = batch_size or outbox_setting('BATCH_SIZE')
+    lease_until = now + timedelta(seconds=outbox_setting('LEASE_SECONDS'))
+    due = Q(status='pending') | Q(status='sending')
+
+    with transaction.atomic(using=tenant_db()):
+        ids = list(
+            NotificationLog.objects.select_for_update(skip_locked=True)
+            .filter(due, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        # The conditional UPDATE keeps the claim exclusive on backends
+        # without row locks: a row another worker already leased no longer
+        # matches next_attempt_at__lte=now.
+        NotificationLog.objects.filter(due, id__in=ids, next_attempt_at__lte=now).update(
+            status='sending',
+            next_attempt_at=lease_until,
+        )
+
+    return list(join_users(
+        NotificationLog.objects.filter(id__in=ids, status='sending', next_attempt_at=lease_until),
+        'recipient',
+    ))
+
+
+def dispatch_batch(provider=None, batch_size=None):
+    """
+    Claim and deliver one batch. Returns (sent, rescheduled, failed) counts.
+    """
+    provider = provider or get_provider()
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0, 0
+
+    deliverable, expired = [], []
+    for notification in batch:
+        if notification.notification_type == 'otp':
+            # Rendered in memory only; the stored message keeps the placeholder.
+            notification.message = render_otp_message(notification)
+            if notification.message is None:
+                expired.append(notification.id)
+                continue
+        deliverable.append(notification)
+
+    results = provider.send_batch(deliverable) if deliverable else []
+    now = timezone.now()
+    max_attempts = outbox_setting('MAX_ATTEMPTS')
+
+    if expired:
+        NotificationLog.objects.filter(id__in=expired).update(
+            status='failed',
+            last_error='OTP expired before delivery',
+            next_attempt_at=None,
+        )
+
+    sent_ids = []
+    retried = []
+    rescheduled, failed = 0, len(expired)
+    for notification, error in zip(deliverable, results):
+        if error is None:
+            sent_ids.append(notification.id)
+            continue
+        notification.retries += 1
+        notification.last_error = error[:1000]
+        if notification.retries >= max_attempts:
+            notification.status = 'failed'
+            notification.next_attempt_at = None
+            failed += 1
+        else:
+            notification.status = 'pending'
+            notification.next_attempt_at = now + backoff_delay(notification.retries)
+            rescheduled += 1
+        retried.append(notification)
+
+    if sent_ids:
+        NotificationLog.objects.filter(id__in=sent_ids).update(
+            status='sent',
+            sent_at=now,
+            next_attempt_at=None,
+        )
+    if retried:
+        NotificationLog.objects.bulk_update(
+            retried, ['status', 'retries', 'last_error', 'next_attempt_at'],
+        )
+    for status, count in (('sent', len(sent_ids)), ('retried', rescheduled), ('failed', failed)):
+        if count:
+            metrics.inc('waitfree_notifications_total', count, status=status)
+    return len(sent_ids), rescheduled, failed
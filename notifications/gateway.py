@@ -0,0 +1,81 @@
+"""
+Local stand-in for an SMS gateway, speaking the protocol HTTPGatewayProvider
+expects. Used by the tests and by `manage.py run_sms_gateway` for
+benchmarks; it only records what it receives.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class GatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _accept(self, message):
+        """Record one message; returns None or an error string."""
+        if self.server.fail_rate and random.random() < self.server.fail_rate:
+            return 'rejected by gateway'
+        with self.server.lock:
+            self.server.messages.append(message)
+        return None
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.connections.add(self.client_address)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if self.path.endswith('/messages'):
+            error = self._accept(body)
+            self._reply(502 if error else 200, {'id': body.get('id'), 'error': error})
+        elif self.path.endswith('/messages/batch') and self.server.batch_enabled:
+            results = [{'id': message.get('id'), 'error': self._accept(message)} for message in body['messages']]
+            self._reply(200, {'results': results})
+        else:
+            self._reply(404, {'error': 'not found'})
+
+
+class StandInGateway(ThreadingHTTPServer):
+    """
+    Threaded gateway server. `latency` (seconds) is added to every request,
+    `fail_rate` is the share of messages rejected.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, fail_rate=0.0, batch_enabled=True):
+        super().__init__((host, port), GatewayHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.batch_enabled = batch_enabled
+        self.messages = []
+        self.connections = set()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Serve from a background thread; returns self."""
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,112 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from core.roles import CITIZEN
+from notifications.models import NotificationLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the citizen notifications page against a large NotificationLog. '
+        'Tops the table up with synthetic rows first, so it only runs against a scratch database '
+        'and only with --scratch.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, required=True, help='Target NotificationLog size, e.g. 50000000.')
+        parser.add_argument(
+            '--scratch', action='store_true',
+            help='Confirm that the configured database is disposable; synthetic users and notifications are written.',
+        )
+        parser.add_argument('--citizens', type=int, default=10_000, help='Distinct recipients of turn alerts.')
+        parser.add_argument('--requests', type=int, default=200, help='Page loads to time.')
+        parser.add_argument('--insert-chunk', type=int, default=50_000)
+
+    def handle(self, *args, **options):
+        if not options['scratch']:
+            raise CommandError(
+                f'bench_notifications writes up to {options["rows"]:,} synthetic rows into '
+                f'"{connection.settings_dict["NAME"]}". Point it at a scratch database and pass --scratch.'
+            )
+        citizens = self._citizens(options['citizens'])
+        self._top_up(options['rows'], citizens, options['insert_chunk'])
+
+        query = NotificationLog.objects.filter(recipient_id=citizens[0]).order_by('-created_at')[:50]
+        self.stdout.write('Query plan:')
+        self.stdout.write(query.explain())
+
+        client = Client()
+        url = reverse('notifications:citizen_notifications')
+        users = {user.id: user for user in User.objects.filter(id__in=random.sample(citizens, min(50, len(citizens))))}
+        timings = []
+        for _ in range(options['requests']):
+            client.force_login(random.choice(list(users.values())))
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.status_code
+
+        timings.sort()
+        self.stdout.write(self.style.SUCCESS(
+            f'{NotificationLog.objects.count():,} rows, {options["requests"]} requests: '
+            f'p50 {statistics.median(timings):.1f} ms, '
+            f'p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms, '
+            f'max {timings[-1]:.1f} ms'
+        ))
+
+    def _citizens(self, count):
+        existing = list(User.objects.filter(username__startswith='bench_citizen_').values_list('id', flat=True))
+        if len(existing) < count:
+            password = make_password(None)
+            User.objects.bulk_create([
+                User(
+                    username=f'bench_citizen_{i}',
+                    role=CITIZEN,
+                    mobile_number=f'7{i:09d}',
+                    password=password,
+                )
+                for i in range(len(existing), count)
+            ], batch_size=1000)
+            existing = list(User.objects.filter(username__startswith='bench_citizen_').values_list('id', flat=True))
+        return existing
+
+    def _top_up(self, target, citizens, chunk):
+        missing = target - NotificationLog.objects.count()
+        if missing <= 0:
+            return
+        self.stdout.write(f'Inserting {missing:,} notifications...')
+        table = NotificationLog._meta.db_table
+        sql = (
+            f'INSERT INTO {table} (recipient_id, recipient_mobile, notification_type, message, '
+            f'status, retries, last_error, sent_at, created_at) VALUES (%s, %s, %s, %s, %s, 0, %s, %s, %s)'
+        )
+        # Spread creation times over 90 days, ascending with the primary key.
+        start = timezone.now() - timedelta(days=90)
+        step = timedelta(days=90) / missing
+        inserted = 0
+        started = time.monotonic()
+        while inserted < missing:
+            rows = []
+            for i in range(inserted, min(missing, inserted + chunk)):
+                created_at = start + step * i
+                if random.random() < 0.3:
+                    rows.append((random.choice(citizens), '', 'turn_alert', 'Your turn is approaching!',
+                                 'sent', '', created_at, created_at))
+                else:
+                    rows.append((None, f'9{random.randrange(10**9):09d}', 'otp', 'Your WaitFree OTP is: {otp}',
+                                 'sent', '', created_at, created_at))
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, rows)
+            inserted += len(rows)
+            rate = inserted / (time.monotonic() - started)
+            self.stdout.write(f'  {inserted:,}/{missing:,} ({rate:,.0f} rows/s)')
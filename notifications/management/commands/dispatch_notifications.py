@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sharding
+from notifications.dispatcher import dispatch_batch
+from notifications.providers import get_provider
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending notifications from the outbox, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep dispatching until interrupted.')
+        parser.add_argument('--batch-size', type=int, default=None, help='Notifications claimed per round.')
+        parser.add_argument('--idle-sleep', type=float, default=1.0, help='Seconds to wait when the outbox is empty.')
+
+    def handle(self, *args, **options):
+        provider = get_provider()
+        totals = [0, 0, 0]
+        while True:
+            counts = [0, 0, 0]
+            for alias in sharding.shards():
+                with sharding.use_shard(alias):
+                    shard_counts = dispatch_batch(provider, options['batch_size'])
+                counts = [count + shard_count for count, shard_count in zip(counts, shard_counts)]
+            totals = [total + count for total, count in zip(totals, counts)]
+            if not any(counts):
+                if not options['loop']:
+                    break
+                time.sleep(options['idle_sleep'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {totals[0]}, rescheduled {totals[1]}, failed {totals[2]}.'
+        ))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.retention import prune_notifications, retention_policies
+
+
+class Command(BaseCommand):
+    help = 'Deletes notification logs past their per-type retention (NOTIFICATION_RETENTION_DAYS)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=10000, help='IDs covered by each DELETE.')
+        parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks.')
+
+    def handle(self, *args, **options):
+        policies = retention_policies()
+        if not policies:
+            self.stdout.write('No retention policies configured; nothing to do.')
+            return
+        started = time.monotonic()
+        deleted = prune_notifications(chunk_size=options['chunk_size'], pause=options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} notifications in {time.monotonic() - started:.2f}s '
+            f'(retention: {", ".join(f"{t} {d}d" for t, d in sorted(policies.items()))}).'
+        ))
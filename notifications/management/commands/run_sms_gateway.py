@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from notifications.gateway import StandInGateway
+
+
+class Command(BaseCommand):
+    help = 'Runs a local stand-in SMS gateway for development and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8025)
+        parser.add_argument('--latency-ms', type=float, default=0, help='Delay added to every request.')
+        parser.add_argument('--fail-rate', type=float, default=0, help='Share of messages to reject (0-1).')
+        parser.add_argument('--no-batch', action='store_true', help='Disable the /messages/batch endpoint.')
+
+    def handle(self, *args, **options):
+        gateway = StandInGateway(
+            port=options['port'],
+            latency=options['latency_ms'] / 1000,
+            fail_rate=options['fail_rate'],
+            batch_enabled=not options['no_batch'],
+        )
+        self.stdout.write(f'Stand-in gateway listening on {gateway.url}')
+        try:
+            gateway.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            gateway.server_close()
+            self.stdout.write(f'Received {len(gateway.messages)} messages.')
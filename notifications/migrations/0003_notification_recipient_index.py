@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+def redact_otp_codes(apps, schema_editor):
+    NotificationLog = apps.get_model('notifications', 'NotificationLog')
+    NotificationLog.objects.filter(notification_type='otp').update(
+        message='Your WaitFree OTP is: {otp}',
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notificationlog',
+            index=models.Index(fields=['recipient', '-created_at'], name='waitfree_no_recipie_bd0dc7_idx'),
+        ),
+        migrations.RunPython(redact_otp_codes, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,7 @@
 """
 NotificationLog model: tracks all notifications (OTP, turn alerts).
+It doubles as the delivery outbox: rows are written as PENDING and the
+dispatcher (notifications.dispatcher) sends them and records the outcome.
 """
 
 from django.db import models
@@ -12,6 +14,8 @@ class NotificationLog(models.Model):
         ('turn_alert', 'Turn Alert'),
     ]
     STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
         ('sent', 'Sent'),
         ('failed', 'Failed'),
         ('retried', 'Retried'),
@@ -20,6 +24,14 @@ class NotificationLog(models.Model):
     recipient = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,  # users stay on the default database (core.sharding)
+        related_name='notifications',
+        null=True,
+        blank=True,
+    )
+    ticket = models.ForeignKey(
+        'queues.QueueTicket',
+        on_delete=models.SET_NULL,
         related_name='notifications',
         null=True,
         blank=True,
@@ -27,13 +39,24 @@ class NotificationLog(models.Model):
     recipient_mobile = models.CharField(max_length=15, blank=True)
     notification_type = models.CharField(max_length=20, choices=TYPE_CHOICES)
     message = models.TextField()
-    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='sent')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     retries = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When the dispatcher may next try (or, while sending, reclaim) this notification',
+    )
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         db_table = 'waitfree_notification_log'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+            models.Index(fields=['recipient', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} to {self.recipient_mobile or self.recipient} ({self.status})"
@@ -0,0 +1,237 @@
+"""
+Delivery providers used by the notification dispatcher.
+The active provider is chosen by settings.NOTIFICATION_PROVIDER.
+"""
+
+import asyncio
+import json
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.client import HTTPConnection, HTTPException, HTTPSConnection
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+GATEWAY_DEFAULTS = {
+    'URL': 'http://127.0.0.1:8025',
+    'TOKEN': '',
+    'TIMEOUT': 10,
+    'POOL_SIZE': 20,
+    'CONCURRENCY': 20,
+    'RATE_PER_SECOND': 0,   # 0 disables rate limiting
+    'BATCH_ENDPOINT': False,
+    'BATCH_SIZE': 100,
+}
+
+
+class ProviderError(Exception):
+    """A notification could not be delivered; the dispatcher will retry it."""
+
+
+class BaseProvider:
+    """Sends NotificationLog rows to a gateway."""
+
+    def send(self, notification):
+        """Deliver one notification or raise ProviderError."""
+        raise NotImplementedError
+
+    def send_batch(self, notifications):
+        """
+        Deliver several notifications.
+        Returns one entry per notification: None on success, an error message on failure.
+        """
+        results = []
+        for notification in notifications:
+            try:
+                self.send(notification)
+                results.append(None)
+            except ProviderError as e:
+                results.append(str(e) or 'delivery failed')
+        return results
+
+
+class LogProvider(BaseProvider):
+    """Development provider: writes each message to the log instead of sending it."""
+
+    def send(self, notification):
+        logger.info(
+            'notification %s to %s: %s',
+            notification.notification_type,
+            notification.recipient_mobile or notification.recipient_id,
+            notification.message,
+        )
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` sends per second with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """Block until `tokens` are available, then take them."""
+        while tokens > self.capacity:
+            self.acquire(self.capacity)
+            tokens -= self.capacity
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to a single gateway host.
+    Connections are reused across sends; one that errors is discarded.
+    """
+
+    def __init__(self, url, size=10, timeout=10):
+        parts = urlsplit(url)
+        self.connection_class = HTTPSConnection if parts.scheme == 'https' else HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.base_path = parts.path.rstrip('/')
+        self.timeout = timeout
+        self.idle = queue.LifoQueue(maxsize=size)
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request; returns (status, decoded JSON body or None)."""
+        try:
+            connection = self.idle.get_nowait()
+        except queue.Empty:
+            connection = self.connection_class(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.request(method, self.base_path + path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+        except (OSError, HTTPException):
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            try:
+                self.idle.put_nowait(connection)
+            except queue.Full:
+                connection.close()
+        return response.status, json.loads(payload) if payload else None
+
+    def close(self):
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HTTPGatewayProvider(BaseProvider):
+    """
+    SMS gateway speaking JSON over HTTP, configured by settings.NOTIFICATION_GATEWAY.
+
+    POST {URL}/messages takes one message; when BATCH_ENDPOINT is set,
+    POST {URL}/messages/batch takes {"messages": [...]} and answers
+    {"results": [{"id": ..., "error": null | "..."}]}. Without a batch
+    endpoint, a batch is fanned out concurrently (at most CONCURRENCY
+    requests in flight) over the pooled keep-alive connections. Every
+    message passes the RATE_PER_SECOND token bucket either way.
+    """
+
+    def __init__(self, **options):
+        options = {**GATEWAY_DEFAULTS, **getattr(settings, 'NOTIFICATION_GATEWAY', {}), **options}
+        self.options = options
+        self.pool = ConnectionPool(options['URL'], size=options['POOL_SIZE'], timeout=options['TIMEOUT'])
+        self.bucket = TokenBucket(options['RATE_PER_SECOND']) if options['RATE_PER_SECOND'] else None
+        self.headers = {'Content-Type': 'application/json'}
+        if options['TOKEN']:
+            self.headers['Authorization'] = f'Bearer {options["TOKEN"]}'
+
+    @staticmethod
+    def payload(notification):
+        return {
+            'id': notification.id,
+            'to': notification.recipient_mobile,
+            'type': notification.notification_type,
+            'message': notification.message,
+        }
+
+    def _throttle(self, count):
+        if self.bucket:
+            self.bucket.acquire(count)
+
+    def _post(self, path, body):
+        try:
+            status, response = self.pool.request('POST', path, json.dumps(body), self.headers)
+        except (OSError, HTTPException, ValueError) as e:
+            raise ProviderError(f'gateway request failed: {e}')
+        if status >= 400:
+            raise ProviderError(f'gateway returned HTTP {status}')
+        return response
+
+    def send(self, notification):
+        if not notification.recipient_mobile:
+            raise ProviderError('no mobile number')
+        self._throttle(1)
+        self._post('/messages', self.payload(notification))
+
+    def send_batch(self, notifications):
+        if self.options['BATCH_ENDPOINT']:
+            results = []
+            size = self.options['BATCH_SIZE']
+            for start in range(0, len(notifications), size):
+                results.extend(self._send_chunk(notifications[start:start + size]))
+            return results
+        return asyncio.run(self._fan_out(notifications))
+
+    def _send_chunk(self, notifications):
+        self._throttle(len(notifications))
+        try:
+            response = self._post('/messages/batch', {
+                'messages': [self.payload(notification) for notification in notifications],
+            })
+        except ProviderError as e:
+            return [str(e)] * len(notifications)
+        errors = {result['id']: result.get('error') for result in (response or {}).get('results', [])}
+        return [
+            errors[notification.id] if notification.id in errors else 'missing from gateway response'
+            for notification in notifications
+        ]
+
+    async def _fan_out(self, notifications):
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.options['CONCURRENCY'])
+        executor = ThreadPoolExecutor(max_workers=self.options['CONCURRENCY'])
+
+        async def deliver(notification):
+            async with semaphore:
+                try:
+                    await loop.run_in_executor(executor, self.send, notification)
+                    return None
+                except ProviderError as e:
+                    return str(e) or 'delivery failed'
+
+        try:
+            return await asyncio.gather(*(deliver(notification) for notification in notifications))
+        finally:
+            executor.shutdown(wait=False)
+
+
+def get_provider():
+    """Instantiate the configured provider (settings.NOTIFICATION_PROVIDER)."""
+    path = getattr(settings, 'NOTIFICATION_PROVIDER', 'notifications.providers.LogProvider')
+    return import_string(path)()
@@ -1,111 +1,179 @@
 """
 Notification services: OTP generation/verification, turn alerts, retry logic.
-All notifications are logged to NotificationLog.
+All notifications are logged to NotificationLog, which is also the outbox:
+nothing here talks to a gateway. Rows are enqueued as PENDING and delivered
+by the dispatcher (`manage.py dispatch_notifications`).
 """
 
 from django.conf import settings
 from django.core.cache import cache
+from django.utils import timezone
 
+from core.ratelimit import increment, throttle
 from core.utils import generate_otp
 from .models import NotificationLog
 
 
+OTP_MESSAGE = 'Your WaitFree OTP is: {otp}'
+
+
+class InvalidOTP(ValueError):
+    """A wrong OTP was entered; the same OTP may be tried again."""
+
+
+def _otp_key(mobile_number):
+    return f'otp:{mobile_number}'
+
+
+def _attempts_key(mobile_number):
+    return f'otp_attempts:{mobile_number}'
+
+
 def generate_and_store_otp(mobile_number):
     """
-    Generate a random OTP, store in Redis with TTL, and log it.
+    Generate a random OTP, store in Redis with TTL, and queue it for delivery.
     Returns the OTP string.
     """
     otp = generate_otp()
-    cache_key = f'otp:{mobile_number}'
     timeout = getattr(settings, 'OTP_EXPIRY_SECONDS', 300)
-    cache.set(cache_key, otp, timeout=timeout)
+    cache.set(_otp_key(mobile_number), otp, timeout=timeout)
+    cache.delete(_attempts_key(mobile_number))
 
-    # Log the notification
-    NotificationLog.objects.create(
+    # The code itself is never written to the log: the dispatcher fills
+    # in the placeholder from the cache at delivery time.
+    enqueue_notifications([NotificationLog(
         recipient_mobile=mobile_number,
         notification_type='otp',
-        message=f'Your WaitFree OTP is: {otp}',
-        status='sent',
-    )
+        message=OTP_MESSAGE,
+    )])
 
     return otp
 
 
-def verify_otp(mobile_number, otp_entered):
+def request_otp(mobile_number, client_ip=None):
     """
-    Verify OTP against Redis store.
-    Returns True if valid, False otherwise.
+    Issue an OTP to a mobile number, subject to the per-mobile and per-IP
+    request throttles. Throttles are checked before anything is written.
+    Raises ValueError (RateLimitExceeded) when a limit is hit.
     """
-    cache_key = f'otp:{mobile_number}'
-    stored_otp = cache.get(cache_key)
+    limit, window = getattr(settings, 'OTP_REQUEST_LIMIT_PER_MOBILE', (5, 900))
+    throttle(
+        'otp_mobile', mobile_number, limit, window,
+        'Too many OTP requests for this number. Please try again later.',
+    )
+    if client_ip:
+        limit, window = getattr(settings, 'OTP_REQUEST_LIMIT_PER_IP', (20, 900))
+        throttle(
+            'otp_ip', client_ip, limit, window,
+            'Too many OTP requests from this network. Please try again later.',
+        )
+    return generate_and_store_otp(mobile_number)
 
+
+def check_otp(mobile_number, otp_entered):
+    """
+    Verify an OTP and consume it on success.
+    Each wrong guess counts against OTP_MAX_ATTEMPTS; once exhausted, the
+    OTP is discarded and a new one must be requested.
+    Raises InvalidOTP for a wrong guess, ValueError when the OTP is gone.
+    """
+    stored_otp = cache.get(_otp_key(mobile_number))
     if stored_otp is None:
-        return False
+        raise ValueError('OTP expired. Please request a new one.')
 
     if str(stored_otp) != str(otp_entered):
-        return False
+        attempts = increment(
+            _attempts_key(mobile_number),
+            timeout=getattr(settings, 'OTP_EXPIRY_SECONDS', 300),
+        )
+        if attempts >= getattr(settings, 'OTP_MAX_ATTEMPTS', 5):
+            cache.delete_many([_otp_key(mobile_number), _attempts_key(mobile_number)])
+            raise ValueError('Too many incorrect attempts. Please request a new OTP.')
+        raise InvalidOTP('Invalid OTP. Please try again.')
 
     # Delete OTP after successful verification
-    cache.delete(cache_key)
+    cache.delete_many([_otp_key(mobile_number), _attempts_key(mobile_number)])
     return True
 
 
-def send_turn_alert(ticket):
+def render_otp_message(notification):
     """
-    Send a turn alert notification to a citizen when their ETA <= threshold.
-    Prevents duplicate alerts for the same ticket.
+    The deliverable text of an OTP notification, or None once the OTP has
+    expired or been used (there is nothing left worth sending).
     """
-    # Check if alert already sent for this ticket
-    existing = NotificationLog.objects.filter(
-        recipient=ticket.citizen,
-        notification_type='turn_alert',
-        message__contains=f'Token #{ticket.token_number}',
-    ).exists()
-
-    if existing:
-        return  # Don't send duplicate alerts
+    otp = cache.get(_otp_key(notification.recipient_mobile))
+    if otp is None:
+        return None
+    return notification.message.replace('{otp}', str(otp))
 
-    mobile = ticket.citizen.mobile_number or 'N/A'
-    message = (
-        f'Your turn is approaching! Token #{ticket.token_number} for '
-        f'{ticket.service.name}. Estimated wait: {ticket.estimated_wait_time} minutes.'
-    )
 
+def verify_otp(mobile_number, otp_entered):
+    """
+    Verify OTP against Redis store.
+    Returns True if valid, False otherwise.
+    """
     try:
-        # In production, this would send an SMS/push notification
-        NotificationLog.objects.create(
-            recipient=ticket.citizen,
-            recipient_mobile=mobile,
-            notification_type='turn_alert',
-            message=message,
-            status='sent',
-        )
-    except Exception:
-        log = NotificationLog.objects.create(
+        return check_otp(mobile_number, otp_entered)
+    except ValueError:
+        return False
+
+
+def enqueue_notifications(notifications):
+    """
+    Add unsaved NotificationLog rows to the outbox with a single bulk insert.
+    They are due immediately.
+    """
+    now = timezone.now()
+    for notification in notifications:
+        notification.status = 'pending'
+        notification.next_attempt_at = now
+    return NotificationLog.objects.bulk_create(notifications)
+
+
+def enqueue_turn_alerts(tickets):
+    """
+    Queue a turn alert for each ticket that has not had one yet.
+    One query finds earlier alerts, one insert queues the new ones.
+    Tickets should come with citizen and service selected.
+    """
+    tickets = list(tickets)
+    if not tickets:
+        return []
+
+    already_alerted = set(NotificationLog.objects.filter(
+        ticket__in=tickets,
+        notification_type='turn_alert',
+    ).values_list('ticket_id', flat=True))
+
+    alerts = []
+    for ticket in tickets:
+        if ticket.id in already_alerted:
+            continue  # Don't send duplicate alerts
+        alerts.append(NotificationLog(
             recipient=ticket.citizen,
-            recipient_mobile=mobile,
+            ticket=ticket,
+            recipient_mobile=ticket.citizen.mobile_number or 'N/A',
             notification_type='turn_alert',
-            message=message,
-            status='failed',
-        )
-        retry_notification(log.id)
+            message=(
+                f'Your turn is approaching! Token #{ticket.token_number} for '
+                f'{ticket.service.name}. Estimated wait: {ticket.estimated_wait_time} minutes.'
+            ),
+        ))
+    return enqueue_notifications(alerts)
 
 
-def retry_notification(log_id, max_retries=3):
-    """Retry a failed notification up to max_retries times."""
-    try:
-        log = NotificationLog.objects.get(id=log_id)
-    except NotificationLog.DoesNotExist:
-        return
+def send_turn_alert(ticket):
+    """
+    Queue a turn alert notification for a citizen whose ETA <= threshold.
+    Prevents duplicate alerts for the same ticket.
+    """
+    enqueue_turn_alerts([ticket])
 
-    if log.retries >= max_retries:
-        return
 
-    log.retries += 1
-    try:
-        # In production: actually resend the notification
-        log.status = 'retried'
-        log.save()
-    except Exception:
-        log.status = 'failed'
-        log.save()
+def retry_notification(log_id):
+    """Put a failed notification back in the outbox for an immediate attempt."""
+    NotificationLog.objects.filter(id=log_id, status='failed').update(
+        status='pending',
+        next_attempt_at=timezone.now(),
+        retries=0,
+    )
@@ -1,5 +1,7 @@
 from django.db import models
 
+from core import sharding
+
 
 class Organization(models.Model):
     """Top-level entity in the hierarchy: Global Admin → Organization → Branch → Counter → Operator."""
@@ -20,6 +22,9 @@ class Organization(models.Model):
         return self.name
 
     def save(self, *args, **kwargs):
+        if self.pk is None and sharding.is_sharded():
+            # The shard's id range then gives the organization an id that names it.
+            kwargs['using'] = sharding.shard_for_new_organization()
         if not self.slug:
             from django.utils.text import slugify
             base_slug = slugify(self.name)
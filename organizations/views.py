@@ -6,14 +6,24 @@ All views enforce organization-level ownership via RBAC mixins.
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.views import View
-from django.db.models import Count, Q, Avg
-
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from django.utils.decorators import method_decorator
+from collections import defaultdict
+from datetime import timedelta
+
+from core import cache as versioned_cache
 from core.mixins import OrganizationRequiredMixin
+from core.replicas import read_replica
 from core.roles import BRANCH
 from accounts.models import User
 from facilities.models import Branch, Service
+from analytics.models import BranchHourlyStats
+from analytics.rollups import histogram_percentile
 
 
+@method_decorator(read_replica, name='dispatch')
 class OrganizationDashboardView(OrganizationRequiredMixin, View):
     """Organization dashboard showing branches and stats."""
 
@@ -69,6 +79,7 @@ class RegisterBranchView(OrganizationRequiredMixin, View):
             organization=org,
             address=address,
         )
+        versioned_cache.bump(organization=org.id)
 
         User.objects.create_user(
             username=branch_username,
@@ -82,17 +93,73 @@ class RegisterBranchView(OrganizationRequiredMixin, View):
         return redirect('organizations:dashboard')
 
 
+@method_decorator(read_replica, name='dispatch')
 class BranchPerformanceView(OrganizationRequiredMixin, View):
-    """View performance stats for branches in the organization."""
+    """
+    View performance stats for branches in the organization.
+    Trends are read from the hourly rollups (see analytics.rollups), never from raw tickets.
+    """
+
+    default_weeks = 8
 
     def get(self, request):
         org = request.user.organization
+        try:
+            weeks = min(52, max(1, int(request.GET.get('weeks', self.default_weeks))))
+        except ValueError:
+            weeks = self.default_weeks
+
         branches = Branch.objects.filter(organization=org).annotate(
-            service_count=Count('services'),
-            counter_count=Count('counters'),
+            service_count=Count('services', distinct=True),
+            counter_count=Count('counters', distinct=True),
+        )
+
+        since = timezone.now() - timedelta(weeks=weeks)
+        hourly = BranchHourlyStats.objects.filter(
+            branch__organization=org,
+            hour__gte=since,
+        ).annotate(
+            week=TruncWeek('hour'),
         )
+        weekly = hourly.values('branch_id', 'week').annotate(
+            joined=Sum('tickets_joined'),
+            served=Sum('tickets_served'),
+            no_show=Sum('tickets_no_show'),
+            wait_total=Sum('wait_total_seconds'),
+            wait_count=Sum('wait_count'),
+            handle_total=Sum('handle_total_seconds'),
+            handle_count=Sum('handle_count'),
+        ).order_by('branch_id', '-week')
+
+        # A week's p90 comes from its hours' summed wait histograms.
+        histograms = defaultdict(list)
+        for branch_id, week, histogram in hourly.values_list('branch_id', 'week', 'wait_histogram'):
+            histograms[(branch_id, week)].append(histogram)
+
+        trends = {}
+        for row in weekly:
+            p90_wait = histogram_percentile(histograms[(row['branch_id'], row['week'])], 90)
+            trends.setdefault(row['branch_id'], []).append({
+                'week': row['week'],
+                'joined': row['joined'],
+                'served': row['served'],
+                'no_show': row['no_show'],
+                'avg_wait_minutes': _minutes(row['wait_total'], row['wait_count']),
+                'p90_wait_minutes': round(p90_wait / 60, 1),
+                'avg_handle_minutes': _minutes(row['handle_total'], row['handle_count']),
+            })
+        for branch in branches:
+            branch.weekly_trend = trends.get(branch.id, [])
+
         context = {
             'organization': org,
             'branches': branches,
+            'weeks': weeks,
         }
         return render(request, 'organization/branch_performance.html', context)
+
+
+def _minutes(total_seconds, count):
+    if not count:
+        return 0
+    return round(total_seconds / count / 60, 1)
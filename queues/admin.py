@@ -1,11 +1,39 @@
 from django.contrib import admin
-from .models import QueueTicket
+from .models import QueueTicket, QueueEvent, QueueSnapshot, NoShowSweep
 
 
 @admin.register(QueueTicket)
 class QueueTicketAdmin(admin.ModelAdmin):
     list_display = ('token_number', 'citizen', 'service', 'branch', 'status', 'position',
-                    'estimated_wait_time', 'joined_at', 'called_at', 'served_at')
+                    'estimated_wait_time', 'eta_p90', 'joined_at', 'called_at', 'served_at')
     list_filter = ('status', 'branch', 'service')
     search_fields = ('token_number', 'citizen__username', 'citizen__mobile_number')
     readonly_fields = ('joined_at', 'called_at', 'served_at', 'no_show_at')
+
+
+@admin.register(NoShowSweep)
+class NoShowSweepAdmin(admin.ModelAdmin):
+    list_display = ('ran_at', 'swept_count', 'service_ids')
+    readonly_fields = ('ran_at', 'swept_count', 'ticket_ids', 'service_ids')
+
+
+@admin.register(QueueEvent)
+class QueueEventAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'service', 'ticket_id', 'counter_id', 'actor_id', 'occurred_at')
+    list_filter = ('kind',)
+    list_select_related = ('service',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(QueueSnapshot)
+class QueueSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('service', 'last_event_id', 'taken_at', 'created_at')
+    readonly_fields = ('service', 'last_event_id', 'taken_at', 'state', 'created_at')
@@ -0,0 +1,66 @@
+"""
+Queue API for the citizen mobile app. Authenticated by JWT claims only
+(core.authentication.ClaimsJWTAuthentication): polling a ticket reads
+neither the session nor the user row.
+"""
+
+from itertools import chain
+
+from django.shortcuts import get_object_or_404
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core import sharding
+from core.authentication import ClaimsJWTAuthentication
+from core.permissions import IsCitizen
+from facilities.models import Service
+from . import engine
+from .models import QueueTicket
+from .serializers import QueueTicketSerializer
+
+ACTIVE_STATUSES = ['waiting', 'serving']
+
+
+class CitizenAPIView(APIView):
+    authentication_classes = [ClaimsJWTAuthentication]
+    permission_classes = [IsCitizen]
+
+    def tickets(self):
+        return QueueTicket.objects.filter(citizen_id=self.request.user.id).select_related(
+            'service', 'branch', 'counter',
+        )
+
+
+class TicketListAPIView(CitizenAPIView):
+    """The citizen's active tickets."""
+
+    def get(self, request):
+        # A citizen can hold tickets with organizations on any shard.
+        per_shard = sharding.fan_out(lambda alias: list(self.tickets().filter(status__in=ACTIVE_STATUSES)))
+        tickets = sorted(chain.from_iterable(per_shard), key=lambda ticket: ticket.joined_at)
+        return Response(QueueTicketSerializer(tickets, many=True).data)
+
+
+class TicketDetailAPIView(CitizenAPIView):
+    """One ticket's status, position and ETA. This is what the app polls."""
+
+    def get(self, request, ticket_id):
+        with sharding.use_shard_of(ticket_id):
+            ticket = get_object_or_404(self.tickets(), id=ticket_id)
+            return Response(QueueTicketSerializer(ticket).data)
+
+
+class JoinQueueAPIView(CitizenAPIView):
+    """Join a service's queue. The only endpoint here that loads the user row."""
+
+    def post(self, request):
+        service_id = request.data.get('service_id')
+        with sharding.use_shard_of(service_id):
+            service = get_object_or_404(Service, id=service_id, is_active=True)
+            try:
+                ticket = engine.join_queue(request.user.instance, service)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            ticket = self.tickets().get(id=ticket.id)
+            return Response(QueueTicketSerializer(ticket).data, status=status.HTTP_201_CREATED)
@@ -0,0 +1,138 @@
+"""
+Lobby display boards: one JSON snapshot per branch, kept in the cache.
+
+The snapshot lists every counter with the token it is serving, and each
+active service with its next few waiting tokens. The engine republishes it
+after every queue change. Facility edits bump the branch's cache version
+instead; a snapshot built under an older version is rebuilt the next time
+a screen asks. Screens look snapshots up by display token through the
+cache as well, so polling costs no database queries once the board has
+been built.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from core import cache as versioned_cache
+from core import sharding
+from .models import QueueTicket
+
+DEFAULTS = {
+    'NEXT_TOKENS': 5,            # waiting tokens shown per service
+    'LONG_POLL_SECONDS': 20,     # how long a screen's request may wait for a change
+    'POLL_INTERVAL_SECONDS': 0.5,
+    'TOKEN_CACHE_SECONDS': 300,  # display token → branch lookups
+}
+
+
+def display_setting(name):
+    return getattr(settings, 'DISPLAY_BOARD', {}).get(name, DEFAULTS[name])
+
+
+def _board_key(branch_id):
+    return f'{sharding.key_prefix()}display:board:{branch_id}'
+
+
+def _token_key(token):
+    return f'display:token:{token}'
+
+
+def build_board(branch_id):
+    """The branch's board as a JSON-ready dict. Costs 3 queries plus one per active service."""
+    from counters.models import Counter
+    from facilities.models import Service
+
+    version = versioned_cache.get_version('branch', branch_id)
+    serving = dict(
+        QueueTicket.objects.filter(branch_id=branch_id, status='serving', counter__isnull=False)
+        .values_list('counter_id', 'token_number')
+    )
+    counters = [
+        {
+            'number': counter.number,
+            'service': counter.service.name,
+            'is_open': counter.is_open,
+            'token': serving.get(counter.id),
+        }
+        for counter in Counter.objects.filter(branch_id=branch_id).select_related('service').order_by('number')
+    ]
+    next_tokens = display_setting('NEXT_TOKENS')
+    services = [
+        {
+            'name': service.name,
+            'waiting': service.queue_length,
+            'next': list(
+                QueueTicket.objects.filter(service=service, status='waiting')
+                .order_by('joined_at').values_list('token_number', flat=True)[:next_tokens]
+            ),
+        }
+        for service in Service.objects.filter(branch_id=branch_id, is_active=True).order_by('name')
+    ]
+    return {
+        'branch_id': branch_id,
+        'version': version,
+        'generated_at': timezone.now().isoformat(),
+        'counters': counters,
+        'services': services,
+    }
+
+
+def publish(branch_id):
+    """Rebuild the branch's board and store it. Called by the engine after queue changes."""
+    board = build_board(branch_id)
+    cache.set(_board_key(branch_id), board, timeout=None)
+    return board
+
+
+def get_board(branch_id):
+    """The branch's current board, rebuilt only if the cached one predates the branch's version."""
+    board = cache.get(_board_key(branch_id))
+    if board is None or board['version'] != versioned_cache.get_version('branch', branch_id):
+        board = publish(branch_id)
+    return board
+
+
+def wait_for_change(branch_id, since, timeout):
+    """
+    Long-poll: return the board as soon as its version differs from
+    `since`, or the unchanged board once `timeout` seconds have passed.
+    """
+    deadline = time.monotonic() + timeout
+    board = get_board(branch_id)
+    while board['version'] == since and time.monotonic() < deadline:
+        time.sleep(display_setting('POLL_INTERVAL_SECONDS'))
+        board = get_board(branch_id)
+    return board
+
+
+def branch_for_token(token):
+    """Branch id for a display token, or None. Cached; rotate_token drops the old entry."""
+    from facilities.models import Branch
+
+    key = _token_key(token)
+    branch_id = cache.get(key)
+    if branch_id is None:
+        # Tokens are unique across shards; the board's branch can be on any of them.
+        found = sharding.fan_out(
+            lambda alias: Branch.objects.filter(display_token=token, is_active=True).values_list('id', flat=True).first()
+        )
+        branch_id = next((found_id for found_id in found if found_id is not None), None)
+        if branch_id is None:
+            return None
+        cache.set(key, branch_id, timeout=display_setting('TOKEN_CACHE_SECONDS'))
+    return branch_id
+
+
+def rotate_token(branch):
+    """Issue a new display token; screens using the old URL stop updating at once."""
+    from facilities.models import new_display_token
+
+    old = branch.display_token
+    branch.display_token = new_display_token()
+    branch.save(update_fields=['display_token'])
+    cache.delete(_token_key(old))
+    versioned_cache.bump(branch=branch.id)  # cached tenant contexts hold the branch row
+    return branch.display_token
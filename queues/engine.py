@@ -3,14 +3,22 @@ Queue Engine: core FIFO queue logic with ETA calculation.
 No skipping. No manual selection. Strict FIFO enforcement.
 """
 
+from datetime import timedelta
+
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Max, F
 from django.conf import settings
 
-from core.utils import calculate_eta
-from .models import QueueTicket
+from core import cache as versioned_cache
+from core import metrics
+from core.sharding import join_users, tenant_db
+from . import display, events
+from .eta import get_predictor
+from .models import QueueTicket, QueueEvent, NoShowSweep
 
 
+@metrics.timed('join_queue')
 def join_queue(citizen, service):
     """
     Add a citizen to the queue for a service. FIFO order.
@@ -19,6 +27,7 @@ def join_queue(citizen, service):
     Raises ValueError if no counters are open for this service.
     """
     from counters.models import Counter
+    from facilities.models import Service
 
     # Check for existing active ticket
     existing = QueueTicket.objects.filter(
@@ -48,42 +57,61 @@ def join_queue(citizen, service):
         status='waiting',
     ).count() + 1
 
-    # Calculate ETA
+    # Calculate ETA (the predictor works on the whole line up to this position)
     active_counters = open_counters
-    eta = calculate_eta(position, service.avg_service_time, active_counters)
-
-    ticket = QueueTicket.objects.create(
-        citizen=citizen,
-        service=service,
-        branch=service.branch,
-        token_number=token_number,
-        status='waiting',
-        position=position,
-        estimated_wait_time=eta,
-    )
+    p50, p90 = get_predictor().predict(service, position, active_counters)
+
+    with transaction.atomic(using=tenant_db()):
+        ticket = QueueTicket.objects.create(
+            citizen=citizen,
+            service=service,
+            branch=service.branch,
+            token_number=token_number,
+            status='waiting',
+            position=position,
+            estimated_wait_time=p50[-1],
+            eta_p50=p50[-1],
+            eta_p90=p90[-1],
+        )
+        events.record(QueueEvent.JOIN, service, ticket=ticket, actor=citizen, at=ticket.joined_at)
+        Service.objects.filter(id=service.id).update(queue_length=F('queue_length') + 1)
+    metrics.inc('waitfree_queue_joins_total')
+    _queue_changed(service)
 
     return ticket
 
 
-def serve_next(counter):
+@metrics.timed('serve_next')
+def serve_next(counter, operator=None):
     """
     Get the next WAITING ticket for the counter's service (strict FIFO).
     Marks it as SERVING with called_at timestamp.
     Returns the ticket or None if queue is empty.
     """
-    # Get the earliest waiting ticket for this service (FIFO)
-    ticket = QueueTicket.objects.filter(
-        service=counter.service,
-        branch=counter.branch,
-        status='waiting',
-    ).order_by('joined_at').first()
-
-    if ticket is None:
-        return None
-
-    ticket.status = 'serving'
-    ticket.called_at = timezone.now()
-    ticket.save()
+    from facilities.models import Service
+
+    with transaction.atomic(using=tenant_db()):
+        # Get the earliest waiting ticket for this service (FIFO)
+        ticket = QueueTicket.objects.select_for_update().filter(
+            service=counter.service,
+            branch=counter.branch,
+            status='waiting',
+        ).order_by('joined_at').first()
+
+        if ticket is None:
+            return None
+
+        ticket.status = 'serving'
+        ticket.called_at = timezone.now()
+        ticket.counter = counter
+        ticket.save()
+        events.record(QueueEvent.CALL, counter.service, ticket=ticket, counter_id=counter.id,
+                      actor=operator, at=ticket.called_at)
+        Service.objects.filter(id=counter.service_id, queue_length__gt=0).update(
+            queue_length=F('queue_length') - 1,
+        )
+    metrics.inc('waitfree_queue_serves_total')
+    _queue_changed(counter.service)
 
     # Check and send turn alerts for upcoming tickets
     _check_turn_alerts(counter.service)
@@ -91,11 +119,15 @@ def serve_next(counter):
     return ticket
 
 
-def mark_served(ticket):
+@metrics.timed('mark_served')
+def mark_served(ticket, operator=None):
     """Mark a ticket as served and update service avg time."""
-    ticket.status = 'served'
-    ticket.served_at = timezone.now()
-    ticket.save()
+    with transaction.atomic(using=tenant_db()):
+        ticket.status = 'served'
+        ticket.served_at = timezone.now()
+        ticket.save()
+        events.record(QueueEvent.SERVE, ticket.service, ticket=ticket, counter_id=ticket.counter_id,
+                      actor=operator, at=ticket.served_at)
 
     # Update average service time
     if ticket.called_at:
@@ -108,58 +140,211 @@ def mark_served(ticket):
 
     # Recalculate positions and ETAs
     recalculate_eta(ticket.service)
+    _queue_changed(ticket.service)
 
 
-def mark_no_show(ticket):
+@metrics.timed('mark_no_show')
+def mark_no_show(ticket, operator=None):
     """Mark a ticket as no-show and advance the queue."""
-    ticket.status = 'no_show'
-    ticket.no_show_at = timezone.now()
-    ticket.save()
+    with transaction.atomic(using=tenant_db()):
+        ticket.status = 'no_show'
+        ticket.no_show_at = timezone.now()
+        ticket.save()
+        events.record(QueueEvent.NO_SHOW, ticket.service, ticket=ticket, counter_id=ticket.counter_id,
+                      actor=operator, at=ticket.no_show_at)
+    metrics.inc('waitfree_queue_no_shows_total')
 
     # Recalculate positions and ETAs for remaining tickets
     recalculate_eta(ticket.service)
+    _queue_changed(ticket.service)
+
+
+def sweep_no_shows(now=None):
+    """
+    Close tickets stuck in SERVING past their service's no-show grace period.
+    Finds them with one indexed query, closes each with an UPDATE that only
+    matches it while it is still serving the same call, and recalculates each
+    affected service once. Always records a NoShowSweep of what it closed.
+    """
+    from facilities.models import Service
+
+    now = now or timezone.now()
+    with transaction.atomic(using=tenant_db()):
+        # Only a handful of tickets are ever serving (one per open counter),
+        # so the per-service grace is applied to the (status, called_at) scan here.
+        serving = QueueTicket.objects.select_for_update(of=('self',)).filter(
+            status='serving',
+            called_at__lt=now,
+        ).values_list(
+            'id', 'service_id', 'branch_id', 'counter_id', 'called_at', 'service__no_show_grace_minutes',
+        )
+        stale = [
+            (ticket_id, service_id, branch_id, counter_id, called_at)
+            for ticket_id, service_id, branch_id, counter_id, called_at, grace in serving
+            if called_at <= now - timedelta(minutes=grace)
+        ]
+        # Not every backend honours the row lock: a ticket finished or recalled
+        # since the scan no longer matches, and is left alone.
+        swept = [
+            (ticket_id, service_id, branch_id, counter_id)
+            for ticket_id, service_id, branch_id, counter_id, called_at in stale
+            if QueueTicket.objects.filter(id=ticket_id, status='serving', called_at=called_at).update(
+                status='no_show', no_show_at=now,
+            )
+        ]
+        ticket_ids = [row[0] for row in swept]
+        service_ids = sorted({row[1] for row in swept})
+        QueueEvent.objects.bulk_create([
+            QueueEvent(
+                kind=QueueEvent.NO_SHOW,
+                service_id=service_id,
+                branch_id=branch_id,
+                ticket_id=ticket_id,
+                counter_id=counter_id,
+                occurred_at=now,
+            )
+            for ticket_id, service_id, branch_id, counter_id in swept
+        ])
+        sweep = NoShowSweep.objects.create(
+            ran_at=now,
+            swept_count=len(ticket_ids),
+            ticket_ids=ticket_ids,
+            service_ids=service_ids,
+        )
+    metrics.inc('waitfree_queue_no_shows_total', len(ticket_ids))
+
+    for service in Service.objects.filter(id__in=service_ids):
+        recalculate_eta(service)
+        _queue_changed(service)
 
+    return sweep
 
-def recalculate_eta(service):
+
+def open_counter(counter, operator=None):
+    """Open a counter and recalculate ETAs for its service."""
+    _set_counter_open(counter, True, operator)
+
+
+def close_counter(counter, operator=None):
+    """Close a counter and recalculate ETAs for its service."""
+    _set_counter_open(counter, False, operator)
+
+
+def _set_counter_open(counter, is_open, operator):
+    with transaction.atomic(using=tenant_db()):
+        counter.is_open = is_open
+        counter.save(update_fields=['is_open'])
+        events.record(
+            QueueEvent.COUNTER_OPEN if is_open else QueueEvent.COUNTER_CLOSE,
+            counter.service, counter_id=counter.id, actor=operator,
+        )
+    recalculate_eta(counter.service)
+    _queue_changed(counter.service)
+
+
+@metrics.timed('set_counters_open')
+def set_counters_open(branch_id, is_open, counter_ids=None, actor=None):
+    """
+    Open or close many of a branch's counters at once (opening time, lunch
+    break): all of them, or those in counter_ids. Counters already in that
+    state are left alone. One UPDATE flips the rest; each affected service
+    is then recalculated exactly once, all in one transaction, and the turn
+    alerts that follow are queued as one batch.
+    Returns the ids of the counters that changed.
+    """
+    from counters.models import Counter
+    from facilities.models import Service
+
+    now = timezone.now()
+    with transaction.atomic(using=tenant_db()):
+        counters = Counter.objects.select_for_update().filter(branch_id=branch_id).exclude(is_open=is_open)
+        if counter_ids is not None:
+            counters = counters.filter(id__in=counter_ids)
+        changed = list(counters.values_list('id', 'service_id'))
+        if not changed:
+            return []
+        Counter.objects.filter(id__in=[counter_id for counter_id, _ in changed]).update(is_open=is_open)
+        QueueEvent.objects.bulk_create([
+            QueueEvent(
+                kind=QueueEvent.COUNTER_OPEN if is_open else QueueEvent.COUNTER_CLOSE,
+                service_id=service_id,
+                branch_id=branch_id,
+                counter_id=counter_id,
+                actor_id=actor.id if actor is not None and actor.is_authenticated else None,
+                occurred_at=now,
+            )
+            for counter_id, service_id in changed
+        ])
+        services = list(Service.objects.filter(id__in={service_id for _, service_id in changed}))
+        for service in services:
+            recalculate_eta(service, alerts=False)
+        _check_turn_alerts(*services)
+
+    for service in services:
+        versioned_cache.bump_service(service)
+    transaction.on_commit(lambda: display.publish(branch_id), using=tenant_db())  # one board for the branch
+    return [counter_id for counter_id, _ in changed]
+
+
+@metrics.timed('recalculate_eta')
+def recalculate_eta(service, alerts=True):
     """
     Recalculate ETA for all waiting tickets in a service.
     Called when: counter opens/closes, ticket served, ticket no-show.
-    ETA = (position * avg_service_time) / active_counters
+    One predictor call covers every position; rows are written in one bulk update.
+    With alerts=False the caller queues the turn alerts itself.
     """
     from counters.models import Counter
+    from facilities.models import Service
 
     active_counters = Counter.objects.filter(
         service=service,
         is_open=True,
     ).count()
 
-    waiting_tickets = QueueTicket.objects.filter(
+    waiting_tickets = list(QueueTicket.objects.filter(
         service=service,
         status='waiting',
-    ).order_by('joined_at')
-
-    for idx, ticket in enumerate(waiting_tickets, start=1):
-        ticket.position = idx
-        ticket.estimated_wait_time = calculate_eta(
-            idx, service.avg_service_time, active_counters
-        )
-        ticket.save(update_fields=['position', 'estimated_wait_time'])
+    ).order_by('joined_at'))
+
+    p50, p90 = get_predictor().predict(service, len(waiting_tickets), active_counters)
+    for idx, ticket in enumerate(waiting_tickets):
+        ticket.position = idx + 1
+        ticket.estimated_wait_time = p50[idx]
+        ticket.eta_p50 = p50[idx]
+        ticket.eta_p90 = p90[idx]
+    QueueTicket.objects.bulk_update(
+        waiting_tickets,
+        ['position', 'estimated_wait_time', 'eta_p50', 'eta_p90'],
+        batch_size=500,
+    )
+    # Resync the denormalized length; joins and calls only adjust it by one.
+    service.queue_length = len(waiting_tickets)
+    Service.objects.filter(id=service.id).update(queue_length=service.queue_length)
 
     # After recalculating, check for turn alerts
-    _check_turn_alerts(service)
+    if alerts:
+        _check_turn_alerts(service)
+
 
+def _queue_changed(service):
+    """Invalidate the service's cached views and republish its branch's display board."""
+    versioned_cache.bump_service(service)
+    branch_id = service.branch_id
+    transaction.on_commit(lambda: display.publish(branch_id), using=tenant_db())
+
+
+def _check_turn_alerts(*services):
+    """Queue turn alerts for tickets with ETA <= threshold, in one batch for all the given services."""
+    from notifications.services import enqueue_turn_alerts
 
-def _check_turn_alerts(service):
-    """Send turn alerts for tickets with ETA <= threshold."""
     threshold = getattr(settings, 'TURN_ALERT_THRESHOLD_MINUTES', 5)
 
-    tickets_to_alert = QueueTicket.objects.filter(
-        service=service,
+    tickets_to_alert = join_users(QueueTicket.objects.filter(
+        service__in=services,
         status='waiting',
         estimated_wait_time__lte=threshold,
         estimated_wait_time__gt=0,
-    )
+    ).select_related('service'), 'citizen')
 
-    for ticket in tickets_to_alert:
-        from notifications.services import send_turn_alert
-        send_turn_alert(ticket)
+    enqueue_turn_alerts(tickets_to_alert)
@@ -0,0 +1,191 @@
+"""
+Queue event log: recording, replay, snapshots and FIFO verification.
+
+The engine calls record() inside the transaction of every mutation. Replay
+folds events into a QueueState per service. Events are streamed in
+primary-key pages, so memory stays bounded by the number of tickets that
+are open at one time, not by the length of the log.
+"""
+
+from collections import OrderedDict
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.sharding import tenant_db
+from .models import QueueEvent, QueueSnapshot
+
+EVENT_FIELDS = ('id', 'kind', 'service_id', 'ticket_id', 'counter_id', 'occurred_at')
+
+
+def record(kind, service, ticket=None, counter_id=None, actor=None, at=None):
+    """Append one event. Call it inside the transaction of the change it describes."""
+    return QueueEvent.objects.create(
+        kind=kind,
+        service_id=service.id,
+        branch_id=service.branch_id,
+        ticket=ticket,
+        counter_id=counter_id,
+        actor=actor if actor is not None and actor.is_authenticated else None,
+        occurred_at=at or timezone.now(),
+    )
+
+
+def stream_events(service_id=None, after_id=0, until=None, chunk_size=10000):
+    """
+    Yield events as tuples in EVENT_FIELDS order, oldest first.
+    Pages by primary key instead of holding a cursor open.
+    """
+    queryset = QueueEvent.objects.all()
+    if service_id is not None:
+        queryset = queryset.filter(service_id=service_id)
+    if until is not None:
+        queryset = queryset.filter(occurred_at__lte=until)
+    while True:
+        page = list(
+            queryset.filter(id__gt=after_id).order_by('id').values_list(*EVENT_FIELDS)[:chunk_size]
+        )
+        if not page:
+            return
+        yield from page
+        after_id = page[-1][0]
+
+
+class QueueState:
+    """
+    One service's queue as implied by its events: the FIFO waiting line,
+    who is being served where, and which counters are open.
+    """
+
+    def __init__(self, state=None):
+        state = state or {}
+        self.waiting = OrderedDict((ticket_id, None) for ticket_id in state.get('waiting', []))
+        self.serving = {ticket_id: counter_id for ticket_id, counter_id in state.get('serving', [])}
+        self.open_counters = set(state.get('open_counters', []))
+
+    def apply(self, kind, ticket_id, counter_id):
+        """
+        Fold one event in. Returns the ticket that should have been called
+        when a CALL skipped the head of the line, else None.
+        """
+        skipped = None
+        if kind == QueueEvent.JOIN:
+            self.waiting[ticket_id] = None
+        elif kind == QueueEvent.CALL:
+            head = next(iter(self.waiting), None)
+            if ticket_id in self.waiting:
+                if head != ticket_id:
+                    skipped = head
+                del self.waiting[ticket_id]
+            self.serving[ticket_id] = counter_id
+        elif kind in (QueueEvent.SERVE, QueueEvent.NO_SHOW):
+            self.serving.pop(ticket_id, None)
+            self.waiting.pop(ticket_id, None)
+        elif kind == QueueEvent.COUNTER_OPEN:
+            self.open_counters.add(counter_id)
+        elif kind == QueueEvent.COUNTER_CLOSE:
+            self.open_counters.discard(counter_id)
+        return skipped
+
+    def as_dict(self):
+        return {
+            'waiting': list(self.waiting),
+            'serving': sorted([ticket_id, counter_id] for ticket_id, counter_id in self.serving.items()),
+            'open_counters': sorted(self.open_counters),
+        }
+
+
+def _latest_snapshot(service_id, at=None):
+    snapshots = QueueSnapshot.objects.filter(service_id=service_id)
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    return snapshots.order_by('-last_event_id').first()
+
+
+def rebuild_state(service_id, at=None):
+    """
+    Queue state of a service at `at` (default: now), starting from the
+    nearest earlier snapshot. Returns (QueueState, last applied event id).
+    """
+    snapshot = _latest_snapshot(service_id, at)
+    state = QueueState(snapshot.state if snapshot else None)
+    last_id = snapshot.last_event_id if snapshot else 0
+    for event_id, kind, _, ticket_id, counter_id, _ in stream_events(service_id, after_id=last_id, until=at):
+        state.apply(kind, ticket_id, counter_id)
+        last_id = event_id
+    return state, last_id
+
+
+def take_snapshot(service_id):
+    """Snapshot one service's current state if it has new events. Returns the snapshot or None."""
+    snapshot = _latest_snapshot(service_id)
+    state = QueueState(snapshot.state if snapshot else None)
+    last_id = snapshot.last_event_id if snapshot else 0
+    last_at = None
+    for event_id, kind, _, ticket_id, counter_id, occurred_at in stream_events(service_id, after_id=last_id):
+        state.apply(kind, ticket_id, counter_id)
+        last_id, last_at = event_id, occurred_at
+    if last_at is None:
+        return None
+    return QueueSnapshot.objects.create(
+        service_id=service_id,
+        last_event_id=last_id,
+        taken_at=last_at,
+        state=state.as_dict(),
+    )
+
+
+def take_snapshots():
+    """Snapshot every service with events since its last snapshot."""
+    service_ids = QueueEvent.objects.values_list('service_id', flat=True).distinct().order_by()
+    snapshots = []
+    for service_id in service_ids:
+        with transaction.atomic(using=tenant_db()):
+            snapshot = take_snapshot(service_id)
+        if snapshot:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+class FifoReport:
+    """Outcome of verify_fifo: event totals and calls that skipped the head of the line."""
+
+    max_examples = 100
+
+    def __init__(self):
+        self.events = 0
+        self.calls = 0
+        self.violations = 0
+        self.examples = []
+        self.services = set()
+
+    def add_violation(self, event_id, service_id, called, skipped):
+        self.violations += 1
+        if len(self.examples) < self.max_examples:
+            self.examples.append({
+                'event_id': event_id,
+                'service_id': service_id,
+                'called_ticket_id': called,
+                'skipped_ticket_id': skipped,
+            })
+
+
+def verify_fifo(service_id=None, chunk_size=10000):
+    """
+    Replay the whole log (or one service) and report every CALL that did
+    not take the ticket at the head of its service's waiting line.
+    """
+    report = FifoReport()
+    states = {}
+    for event_id, kind, event_service_id, ticket_id, counter_id, _ in stream_events(service_id, chunk_size=chunk_size):
+        state = states.get(event_service_id)
+        if state is None:
+            state = states[event_service_id] = QueueState()
+            report.services.add(event_service_id)
+        report.events += 1
+        if kind == QueueEvent.CALL:
+            report.calls += 1
+        skipped = state.apply(kind, ticket_id, counter_id)
+        if skipped is not None:
+            report.add_violation(event_id, event_service_id, ticket_id, skipped)
+    return report
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from queues.events import take_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Snapshots the queue state of every service with new events (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep snapshotting until interrupted.')
+        parser.add_argument('--interval', type=int, default=900, help='Seconds between rounds with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            snapshots = take_snapshots()
+            self.stdout.write(
+                f'Snapshotted {len(snapshots)} services in {time.monotonic() - started:.2f}s.'
+            )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core import sharding
+from queues.engine import sweep_no_shows
+
+
+class Command(BaseCommand):
+    help = 'Marks tickets left in serving past their service grace period as no-show'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep sweeping until interrupted.')
+        parser.add_argument('--interval', type=int, default=60, help='Seconds between sweeps with --loop.')
+
+    def handle(self, *args, **options):
+        while True:
+            for alias in sharding.shards():
+                with sharding.use_shard(alias):
+                    sweep = sweep_no_shows()
+                self.stdout.write(
+                    f'[{sweep.ran_at:%H:%M:%S}] swept {sweep.swept_count} tickets '
+                    f'across {len(sweep.service_ids)} services'
+                    + (f' on {alias}' if sharding.is_sharded() else '')
+                )
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-19 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['branch', 'joined_at'], name='waitfree_qu_branch__d088f8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['served_at'], name='waitfree_qu_served__4e9d61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['no_show_at'], name='waitfree_qu_no_show_2cf449_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0002_ticket_close_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queueticket',
+            name='eta_p50',
+            field=models.IntegerField(default=0, help_text='Median predicted wait in minutes'),
+        ),
+        migrations.AddField(
+            model_name='queueticket',
+            name='eta_p90',
+            field=models.IntegerField(default=0, help_text='90th percentile predicted wait in minutes'),
+        ),
+    ]
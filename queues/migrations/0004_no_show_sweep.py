@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0003_ticket_eta_bands'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NoShowSweep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ran_at', models.DateTimeField()),
+                ('swept_count', models.PositiveIntegerField(default=0)),
+                ('ticket_ids', models.JSONField(default=list)),
+                ('service_ids', models.JSONField(default=list)),
+            ],
+            options={
+                'db_table': 'waitfree_no_show_sweep',
+                'ordering': ['-ran_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['status', 'called_at'], name='waitfree_qu_status_2491fa_idx'),
+        ),
+    ]
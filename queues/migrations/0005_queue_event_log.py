@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:41
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('facilities', '0002_service_no_show_grace'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('counters', '0001_initial'),
+        ('queues', '0004_no_show_sweep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='queueticket',
+            name='counter',
+            field=models.ForeignKey(blank=True, help_text='Counter that called this ticket', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='queue_tickets', to='counters.counter'),
+        ),
+        migrations.CreateModel(
+            name='QueueSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField()),
+                ('taken_at', models.DateTimeField(help_text='occurred_at of the last event included')),
+                ('state', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='queue_snapshots', to='facilities.service')),
+            ],
+            options={
+                'db_table': 'waitfree_queue_snapshot',
+                'ordering': ['-last_event_id'],
+                'indexes': [models.Index(fields=['service', 'taken_at'], name='waitfree_qu_service_7b4b58_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='QueueEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(choices=[('join', 'Joined'), ('call', 'Called'), ('serve', 'Served'), ('no_show', 'No Show'), ('counter_open', 'Counter Opened'), ('counter_close', 'Counter Closed')], max_length=20)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('branch', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='facilities.branch')),
+                ('counter', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='counters.counter')),
+                ('service', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='facilities.service')),
+                ('ticket', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='queues.queueticket')),
+            ],
+            options={
+                'db_table': 'waitfree_queue_event',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['service', 'id'], name='waitfree_qu_service_9c0511_idx'), models.Index(fields=['occurred_at'], name='waitfree_qu_occurre_41cd49_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0005_queue_event_log'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['service', 'joined_at'], name='waitfree_qu_service_479b0f_idx'),
+        ),
+    ]
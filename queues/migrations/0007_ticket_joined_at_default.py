@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-19 02:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0006_ticket_service_joined_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='queueticket',
+            name='joined_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-19 03:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('queues', '0007_ticket_joined_at_default'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='queueticket',
+            name='citizen',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='queue_tickets', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-19 04:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('queues', '0008_ticket_citizen_cross_shard'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='queueticket',
+            index=models.Index(fields=['counter', 'status'], name='waitfree_qu_counter_a31b7a_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 """
 QueueTicket model: tracks every citizen's position in a queue.
+NoShowSweep: audit record of each automatic no-show sweep.
+QueueEvent / QueueSnapshot: append-only event log of every engine action,
+with periodic per-service snapshots for fast point-in-time rebuilds.
 """
 
 from django.db import models
@@ -18,6 +21,7 @@ class QueueTicket(models.Model):
     citizen = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
+        db_constraint=False,  # users stay on the default database (core.sharding)
         related_name='queue_tickets',
     )
     service = models.ForeignKey(
@@ -30,6 +34,14 @@ class QueueTicket(models.Model):
         on_delete=models.CASCADE,
         related_name='queue_tickets',
     )
+    counter = models.ForeignKey(
+        'counters.Counter',
+        on_delete=models.SET_NULL,
+        related_name='queue_tickets',
+        null=True,
+        blank=True,
+        help_text='Counter that called this ticket',
+    )
     token_number = models.PositiveIntegerField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
     position = models.PositiveIntegerField(default=0)
@@ -37,7 +49,9 @@ class QueueTicket(models.Model):
         default=0,
         help_text='Estimated wait time in minutes',
     )
-    joined_at = models.DateTimeField(auto_now_add=True)
+    eta_p50 = models.IntegerField(default=0, help_text='Median predicted wait in minutes')
+    eta_p90 = models.IntegerField(default=0, help_text='90th percentile predicted wait in minutes')
+    joined_at = models.DateTimeField(default=timezone.now)
     called_at = models.DateTimeField(null=True, blank=True)
     served_at = models.DateTimeField(null=True, blank=True)
     no_show_at = models.DateTimeField(null=True, blank=True)
@@ -49,6 +63,12 @@ class QueueTicket(models.Model):
             models.Index(fields=['service', 'status', 'joined_at']),
             models.Index(fields=['branch', 'status']),
             models.Index(fields=['citizen', 'status']),
+            models.Index(fields=['branch', 'joined_at']),
+            models.Index(fields=['served_at']),
+            models.Index(fields=['no_show_at']),
+            models.Index(fields=['status', 'called_at']),
+            models.Index(fields=['service', 'joined_at']),
+            models.Index(fields=['counter', 'status']),
         ]
 
     def __str__(self):
@@ -64,3 +84,127 @@ class QueueTicket(models.Model):
         end_time = self.called_at or timezone.now()
         delta = end_time - self.joined_at
         return int(delta.total_seconds() / 60)
+
+
+class NoShowSweep(models.Model):
+    """One run of the no-show sweeper and the tickets it closed."""
+    ran_at = models.DateTimeField()
+    swept_count = models.PositiveIntegerField(default=0)
+    ticket_ids = models.JSONField(default=list)
+    service_ids = models.JSONField(default=list)
+
+    class Meta:
+        db_table = 'waitfree_no_show_sweep'
+        ordering = ['-ran_at']
+
+    def __str__(self):
+        return f"No-show sweep @ {self.ran_at:%Y-%m-%d %H:%M} ({self.swept_count} tickets)"
+
+
+class QueueEvent(models.Model):
+    """
+    One engine action, written in the same transaction as the change it
+    records. Rows are never updated or deleted. References are plain
+    columns without DB constraints so the log outlives the tickets,
+    counters and users it mentions.
+    """
+    JOIN = 'join'
+    CALL = 'call'
+    SERVE = 'serve'
+    NO_SHOW = 'no_show'
+    COUNTER_OPEN = 'counter_open'
+    COUNTER_CLOSE = 'counter_close'
+    KIND_CHOICES = [
+        (JOIN, 'Joined'),
+        (CALL, 'Called'),
+        (SERVE, 'Served'),
+        (NO_SHOW, 'No Show'),
+        (COUNTER_OPEN, 'Counter Opened'),
+        (COUNTER_CLOSE, 'Counter Closed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    service = models.ForeignKey(
+        'facilities.Service',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    branch = models.ForeignKey(
+        'facilities.Branch',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    ticket = models.ForeignKey(
+        QueueTicket,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+    counter = models.ForeignKey(
+        'counters.Counter',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        null=True,
+        blank=True,
+    )
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'waitfree_queue_event'
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['service', 'id']),
+            models.Index(fields=['occurred_at']),
+        ]
+
+    def __str__(self):
+        return f"#{self.id} {self.kind} service={self.service_id} ticket={self.ticket_id}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None and not self._state.adding:
+            raise ValueError('Queue events are append-only.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Queue events are append-only.')
+
+
+class QueueSnapshot(models.Model):
+    """
+    A service's queue state after applying every event up to last_event_id.
+    state: {"waiting": [ticket ids, FIFO order], "serving": [[ticket id, counter id], ...],
+            "open_counters": [counter ids]}
+    """
+    service = models.ForeignKey(
+        'facilities.Service',
+        on_delete=models.CASCADE,
+        related_name='queue_snapshots',
+    )
+    last_event_id = models.BigIntegerField()
+    taken_at = models.DateTimeField(help_text='occurred_at of the last event included')
+    state = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'waitfree_queue_snapshot'
+        ordering = ['-last_event_id']
+        indexes = [
+            models.Index(fields=['service', 'taken_at']),
+        ]
+
+    def __str__(self):
+        return f"Snapshot of service {self.service_id} @ event {self.last_event_id}"
@@ -0,0 +1,18 @@
+from rest_framework import serializers
+
+from .models import QueueTicket
+
+
+class QueueTicketSerializer(serializers.ModelSerializer):
+    service_name = serializers.CharField(source='service.name', read_only=True)
+    branch_name = serializers.CharField(source='branch.name', read_only=True)
+    counter_number = serializers.CharField(source='counter.number', read_only=True, default=None)
+
+    class Meta:
+        model = QueueTicket
+        fields = [
+            'id', 'token_number', 'status', 'position', 'eta_p50', 'eta_p90',
+            'service_id', 'service_name', 'branch_id', 'branch_name', 'counter_number',
+            'joined_at', 'called_at', 'served_at',
+        ]
+        read_only_fields = fields
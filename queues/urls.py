@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'queues'
 
@@ -10,4 +10,11 @@ urlpatterns = [
     path('my-tickets/', views.MyTicketsView.as_view(), name='my_tickets'),
     path('serve-next/', views.ServeNextView.as_view(), name='serve_next'),
     path('no-show/', views.MarkNoShowView.as_view(), name='mark_no_show'),
+    path('display/<str:token>/', views.DisplayBoardView.as_view(), name='display_board'),
+    path('display/<str:token>/board.json', views.DisplayBoardDataView.as_view(), name='display_board_data'),
+
+    # Mobile API (JWT)
+    path('api/tickets/', api.TicketListAPIView.as_view(), name='api_tickets'),
+    path('api/tickets/<int:ticket_id>/', api.TicketDetailAPIView.as_view(), name='api_ticket'),
+    path('api/join/', api.JoinQueueAPIView.as_view(), name='api_join'),
 ]
@@ -1,18 +1,27 @@
 """
-Queue views: join queue, ticket view, queue overview, serve next, mark no-show.
-All views enforce RBAC.
+Queue views: join queue, ticket view, queue overview, serve next, mark no-show,
+lobby display board. All views enforce RBAC; the display board is guarded by
+its branch's display token instead of a login.
 """
 
+from itertools import chain
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.template.loader import render_to_string
 from django.contrib import messages
+from django.http import Http404, HttpResponseNotModified, JsonResponse
+from django.utils.decorators import method_decorator
 from django.views import View
 
+from core import cache as versioned_cache
+from core import sharding
 from core.mixins import CitizenRequiredMixin, OperatorRequiredMixin
+from core.replicas import pin_to_primary, read_replica
 from core.roles import CITIZEN
 from .models import QueueTicket
-from . import engine
+from . import display, engine
 from facilities.models import Service
-from counters.models import OperatorAssignment
 
 
 class JoinQueueView(CitizenRequiredMixin, View):
@@ -20,63 +29,90 @@ class JoinQueueView(CitizenRequiredMixin, View):
 
     def post(self, request):
         service_id = request.POST.get('service_id')
-        service = get_object_or_404(Service, id=service_id, is_active=True)
+        with sharding.use_shard_of(service_id):
+            service = get_object_or_404(Service, id=service_id, is_active=True)
 
-        try:
-            ticket = engine.join_queue(request.user, service)
-            messages.success(request, f'Joined queue! Your token number is #{ticket.token_number}')
-            return redirect('queues:ticket', ticket_id=ticket.id)
-        except ValueError as e:
-            messages.error(request, str(e))
-            return redirect('facilities:branch_detail', branch_id=service.branch.id)
+            try:
+                ticket = engine.join_queue(request.user, service)
+                pin_to_primary(request)
+                messages.success(request, f'Joined queue! Your token number is #{ticket.token_number}')
+                return redirect('queues:ticket', ticket_id=ticket.id)
+            except ValueError as e:
+                messages.error(request, str(e))
+                return redirect('facilities:branch_detail', branch_id=service.branch_id)
 
 
+@method_decorator(read_replica, name='dispatch')
 class QueueTicketView(CitizenRequiredMixin, View):
     """Citizen views their queue ticket."""
 
     def get(self, request, ticket_id):
-        ticket = get_object_or_404(QueueTicket, id=ticket_id, citizen=request.user)
-        return render(request, 'citizen/ticket.html', {'ticket': ticket})
+        with sharding.use_shard_of(ticket_id):
+            ticket = get_object_or_404(QueueTicket, id=ticket_id, citizen=request.user)
+            return render(request, 'citizen/ticket.html', {'ticket': ticket})
 
 
+@method_decorator(read_replica, name='dispatch')
 class QueueOverviewView(View):
-    """Public queue overview for a service."""
+    """
+    Public queue overview for a service: who is being served and the next
+    QUEUE_OVERVIEW_WINDOW tokens. The board is rendered once per queue
+    change and shared by every viewer until the next one.
+    """
 
     def get(self, request, service_id):
-        service = get_object_or_404(Service, id=service_id)
-        waiting = QueueTicket.objects.filter(
-            service=service,
-            status='waiting',
-        ).order_by('joined_at')
-
-        serving = QueueTicket.objects.filter(
-            service=service,
-            status='serving',
+        with sharding.use_shard_of(service_id):
+            service = get_object_or_404(Service.objects.select_related('branch'), id=service_id)
+            board = versioned_cache.get_or_set(
+                'queue_overview', lambda: self.render_board(service), service.id, service=service.id,
+            )
+            return render(request, 'citizen/queue_overview.html', {
+                'service': service,
+                'branch': service.branch,
+                'board': board,
+            })
+
+    @staticmethod
+    def render_board(service):
+        window = getattr(settings, 'QUEUE_OVERVIEW_WINDOW', 20)
+        waiting = list(
+            QueueTicket.objects.filter(service=service, status='waiting')
+            .order_by('joined_at')
+            .only('token_number', 'position', 'joined_at')[:window]
         )
-
-        context = {
-            'service': service,
-            'branch': service.branch,
+        serving = list(
+            QueueTicket.objects.filter(service=service, status='serving')
+            .order_by('called_at')
+            .only('token_number')
+        )
+        return render_to_string('includes/queue_overview_board.html', {
             'waiting_tickets': waiting,
             'serving_tickets': serving,
-            'waiting_count': waiting.count(),
-        }
-        return render(request, 'citizen/queue_overview.html', context)
+            'waiting_count': service.queue_length,
+            'more_waiting': max(0, service.queue_length - len(waiting)),
+        })
 
 
+@method_decorator(read_replica, name='dispatch')
 class MyTicketsView(CitizenRequiredMixin, View):
     """Citizen views all their active tickets."""
 
-    def get(self, request):
-        active_tickets = QueueTicket.objects.filter(
-            citizen=request.user,
-            status__in=['waiting', 'serving'],
-        ).select_related('service', 'branch')
+    @staticmethod
+    def shard_tickets(citizen_id):
+        tickets = QueueTicket.objects.filter(citizen_id=citizen_id).select_related('service', 'branch')
+        return (
+            list(tickets.filter(status__in=['waiting', 'serving'])),
+            list(tickets.filter(status__in=['served', 'no_show']).order_by('-joined_at')[:20]),
+        )
 
-        past_tickets = QueueTicket.objects.filter(
-            citizen=request.user,
-            status__in=['served', 'no_show'],
-        ).select_related('service', 'branch').order_by('-joined_at')[:20]
+    def get(self, request):
+        # A citizen can hold tickets with organizations on any shard.
+        citizen_id = request.user.id
+        per_shard = sharding.fan_out(lambda alias: self.shard_tickets(citizen_id))
+        active_tickets = sorted(chain.from_iterable(active for active, _ in per_shard), key=lambda t: t.joined_at)
+        past_tickets = sorted(
+            chain.from_iterable(past for _, past in per_shard), key=lambda t: t.joined_at, reverse=True,
+        )[:20]
 
         return render(request, 'citizen/my_tickets.html', {
             'active_tickets': active_tickets,
@@ -88,10 +124,8 @@ class ServeNextView(OperatorRequiredMixin, View):
     """Operator serves the next citizen in FIFO order. No skipping."""
 
     def post(self, request):
-        try:
-            assignment = request.user.operator_assignment
-            counter = assignment.counter
-        except OperatorAssignment.DoesNotExist:
+        counter = request.tenant.counter
+        if counter is None:
             messages.error(request, 'You are not assigned to any counter.')
             return redirect('counters:operator_dashboard')
 
@@ -99,19 +133,19 @@ class ServeNextView(OperatorRequiredMixin, View):
             messages.error(request, 'Your counter is closed. Open it first.')
             return redirect('counters:operator_dashboard')
 
-        # Complete current ticket if any
+        # Complete this counter's current ticket if any
         current_serving = QueueTicket.objects.filter(
-            service=counter.service,
-            branch=counter.branch,
+            counter=counter,
             status='serving',
         ).first()
 
         if current_serving:
-            engine.mark_served(current_serving)
+            engine.mark_served(current_serving, operator=request.user)
             messages.info(request, f'Token #{current_serving.token_number} marked as served.')
 
         # Get next ticket (strict FIFO)
-        ticket = engine.serve_next(counter)
+        ticket = engine.serve_next(counter, operator=request.user)
+        pin_to_primary(request)
         if ticket:
             messages.success(request, f'Now serving Token #{ticket.token_number}')
         else:
@@ -124,10 +158,8 @@ class MarkNoShowView(OperatorRequiredMixin, View):
     """Mark the current ticket as no-show."""
 
     def post(self, request):
-        try:
-            assignment = request.user.operator_assignment
-            counter = assignment.counter
-        except OperatorAssignment.DoesNotExist:
+        counter = request.tenant.counter
+        if counter is None:
             messages.error(request, 'You are not assigned to any counter.')
             return redirect('counters:operator_dashboard')
 
@@ -140,6 +172,54 @@ class MarkNoShowView(OperatorRequiredMixin, View):
             status='serving',
         )
 
-        engine.mark_no_show(ticket)
+        engine.mark_no_show(ticket, operator=request.user)
+        pin_to_primary(request)
         messages.warning(request, f'Token #{ticket.token_number} marked as NO SHOW.')
         return redirect('counters:operator_dashboard')
+
+
+class DisplayBoardMixin:
+    """Resolves the display token in the URL to a branch id, from the cache when possible."""
+
+    def dispatch(self, request, token, *args, **kwargs):
+        self.branch_id = display.branch_for_token(token)
+        if self.branch_id is None:
+            raise Http404('Unknown display board.')
+        with sharding.use_shard_of(self.branch_id):
+            return super().dispatch(request, token, *args, **kwargs)
+
+
+class DisplayBoardView(DisplayBoardMixin, View):
+    """Full-screen lobby board. The page long-polls DisplayBoardDataView for updates."""
+
+    def get(self, request, token):
+        return render(request, 'display/board.html', {
+            'board': display.get_board(self.branch_id),
+            'token': token,
+            'long_poll_seconds': display.display_setting('LONG_POLL_SECONDS'),
+        })
+
+
+class DisplayBoardDataView(DisplayBoardMixin, View):
+    """
+    The board snapshot as JSON, with the snapshot version as its ETag.
+    With ?since=<version> the request waits (up to LONG_POLL_SECONDS) for a
+    newer snapshot; screens that cannot long-poll send If-None-Match instead.
+    """
+
+    def get(self, request, token):
+        since = request.GET.get('since')
+        if since and since.isdigit():
+            board = display.wait_for_change(
+                self.branch_id, int(since), display.display_setting('LONG_POLL_SECONDS'),
+            )
+        else:
+            board = display.get_board(self.branch_id)
+        etag = f'"{board["version"]}"'
+        if request.headers.get('If-None-Match') == etag:
+            response = HttpResponseNotModified()
+        else:
+            response = JsonResponse(board)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,252 @@
+"""
+Analytics tests: hourly rollups feeding the branch performance page, wait profiles,
+ticket archive, FIFO audit.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+import numpy as np
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from analytics.archive import STATUS_CODES, TicketArchive, export_closed_tickets
+from analytics.fifo import audit_service, branch_summary
+from analytics.models import BranchHourlyStats, ServiceHourlyStats, WaitTimeProfile
+from analytics.rollups import rollup_hourly_stats
+from analytics.waits import WaitHistogram
+from core.roles import CITIZEN
+from queues.models import QueueEvent, QueueTicket
+from tests.test_validation import BaseTestCase
+
+
+class TicketFactoryMixin:
+    """Creates closed tickets with explicit timestamps."""
+
+    def make_ticket(self, joined_at, wait_minutes=None, handle_minutes=None, status='served'):
+        n = QueueTicket.objects.count()
+        citizen = User.objects.create_user(
+            username=f'hist_citizen_{n}',
+            role=CITIZEN,
+            mobile_number=f'90000{n:05d}',
+        )
+        ticket = QueueTicket.objects.create(
+            citizen=citizen,
+            service=self.service,
+            branch=self.branch,
+            token_number=n + 1,
+            status=status,
+        )
+        called_at = joined_at + timedelta(minutes=wait_minutes) if wait_minutes is not None else None
+        served_at = called_at + timedelta(minutes=handle_minutes) if handle_minutes is not None else None
+        QueueTicket.objects.filter(pk=ticket.pk).update(
+            joined_at=joined_at,
+            called_at=called_at,
+            served_at=served_at if status == 'served' else None,
+            no_show_at=called_at if status == 'no_show' else None,
+        )
+        return ticket
+
+
+class TestHourlyRollups(TicketFactoryMixin, BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.hour = timezone.localtime().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+
+    def test_rollup_computes_counts_and_percentiles(self):
+        for i in range(10):
+            self.make_ticket(self.hour + timedelta(minutes=i), wait_minutes=i + 1, handle_minutes=5)
+        self.make_ticket(self.hour + timedelta(minutes=30), wait_minutes=2, status='no_show')
+
+        rollup_hourly_stats()
+
+        stats = BranchHourlyStats.objects.get(branch=self.branch)
+        self.assertEqual(stats.hour, self.hour)
+        self.assertEqual(stats.tickets_joined, 11)
+        self.assertEqual(stats.tickets_served, 10)
+        self.assertEqual(stats.tickets_no_show, 1)
+        self.assertEqual(stats.wait_count, 11)
+        self.assertEqual(stats.wait_p90_seconds, 9 * 60)
+        self.assertEqual(stats.wait_histogram, {**{str(m): 1 for m in range(1, 11)}, '2': 2})
+        self.assertEqual(stats.handle_mean_seconds, 5 * 60)
+        self.assertEqual(ServiceHourlyStats.objects.get(service=self.service).tickets_joined, 11)
+
+    def test_rollup_is_incremental(self):
+        self.make_ticket(self.hour, wait_minutes=4, handle_minutes=5)
+        rollup_hourly_stats()
+
+        # Nothing changed: no buckets are rewritten.
+        self.assertEqual(rollup_hourly_stats(), (0, 0))
+
+        # A late close in the same hour re-folds only that bucket.
+        ticket = self.make_ticket(self.hour + timedelta(minutes=10), status='waiting')
+        QueueTicket.objects.filter(pk=ticket.pk).update(
+            status='served',
+            called_at=self.hour + timedelta(minutes=15),
+            served_at=timezone.now(),
+        )
+        self.assertEqual(rollup_hourly_stats(), (1, 1))
+        self.assertEqual(BranchHourlyStats.objects.get(branch=self.branch).tickets_served, 2)
+
+    def test_performance_page_reads_rollups(self):
+        self.make_ticket(self.hour, wait_minutes=6, handle_minutes=5)
+        rollup_hourly_stats()
+
+        self.client.force_login(self.org_user)
+        response = self.client.get(reverse('organizations:branch_performance'))
+        self.assertEqual(response.status_code, 200)
+        trend = response.context['branches'][0].weekly_trend
+        self.assertEqual(trend[0]['served'], 1)
+        self.assertEqual(trend[0]['avg_wait_minutes'], 6.0)
+
+
+    def test_weekly_p90_merges_hourly_histograms(self):
+        monday = timezone.localtime().replace(hour=1, minute=0, second=0, microsecond=0)
+        monday -= timedelta(days=monday.weekday() + 7)
+        for i in range(10):
+            self.make_ticket(monday + timedelta(minutes=i), wait_minutes=1, handle_minutes=5)
+        self.make_ticket(monday + timedelta(hours=1), wait_minutes=60, handle_minutes=5)
+        rollup_hourly_stats()
+
+        self.client.force_login(self.org_user)
+        trend = self.client.get(reverse('organizations:branch_performance')).context['branches'][0].weekly_trend
+        # The hourly p90s are 1 and 60 minutes; the week's 10th of 11 waits is 1 minute.
+        self.assertEqual(trend[0]['p90_wait_minutes'], 1.0)
+
+
+class TestWaitProfiles(TicketFactoryMixin, BaseTestCase):
+
+    def test_histogram_percentiles_per_slot(self):
+        histogram = WaitHistogram(bin_seconds=60, max_wait_seconds=3600)
+        waits = np.arange(1, 101) * 60 - 30  # 0.5 … 99.5 minutes
+        histogram.add(np.zeros(100, dtype=np.int64), np.full(100, 9), waits)
+
+        self.assertEqual(histogram.sample_counts[0, 9], 100)
+        self.assertEqual(histogram.percentile(50)[0, 9], 50 * 60)
+        self.assertEqual(histogram.percentile(90)[0, 9], 60 * 60 + 60)  # overflow bin
+        self.assertEqual(histogram.percentile(50)[1, 9], 0)
+
+    def test_analyze_waits_command_stores_profiles(self):
+        joined = timezone.localtime() - timedelta(days=1)
+        for minutes in (2, 4, 6, 8):
+            self.make_ticket(joined, wait_minutes=minutes, handle_minutes=5)
+
+        call_command('analyze_waits', days=7, chunk_size=3, stdout=StringIO())
+
+        profile = WaitTimeProfile.objects.get(service=self.service)
+        self.assertEqual((profile.weekday, profile.hour), (joined.weekday(), joined.hour))
+        self.assertEqual(profile.sample_count, 4)
+        self.assertEqual(profile.mean_seconds, 5 * 60)
+        self.assertEqual(profile.p50_seconds, 5 * 60)
+
+
+class TestTicketArchive(TicketFactoryMixin, BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def test_export_is_incremental_and_memory_mapped(self):
+        joined = timezone.now() - timedelta(hours=2)
+        first = self.make_ticket(joined, wait_minutes=3, handle_minutes=4)
+        self.make_ticket(joined, status='waiting')
+        self.assertEqual(export_closed_tickets(self.root), 1)
+
+        second = self.make_ticket(joined, wait_minutes=1, status='no_show')
+        QueueTicket.objects.filter(pk=second.pk).update(no_show_at=timezone.now())
+        self.assertEqual(export_closed_tickets(self.root), 1)
+        self.assertEqual(export_closed_tickets(self.root), 0)
+
+        archive = TicketArchive(self.root)
+        self.assertEqual(archive.total_rows, 2)
+        month = archive.months[0]
+        self.assertEqual(len(archive.manifest['months'][month]['segments']), 2)
+
+        segment = next(archive.segments())
+        self.assertIsInstance(segment['ticket_id'], np.memmap)
+        self.assertEqual(list(archive.column('ticket_id')), [first.id, second.id])
+        self.assertEqual(list(archive.column('status')), [STATUS_CODES['served'], STATUS_CODES['no_show']])
+        self.assertEqual(archive.column('served_at')[1], -1)
+        self.assertEqual(archive.column('called_at')[0] - archive.column('joined_at')[0], 180)
+
+
+class TestFifoAudit(TicketFactoryMixin, BaseTestCase):
+
+    def test_in_order_history_is_clean(self):
+        start = timezone.now() - timedelta(hours=3)
+        for i in range(5):
+            self.make_ticket(start + timedelta(minutes=i), wait_minutes=10 + i, handle_minutes=5)
+
+        audit = audit_service(self.service.id, self.branch.id, chunk_size=2)
+
+        self.assertEqual((audit.tickets, audit.called, audit.inversions), (5, 5, []))
+
+    def test_overtaking_is_flagged_with_operator(self):
+        # Early in a past service day, so every call below lands on the day the tickets joined.
+        start = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        skipped = self.make_ticket(start, wait_minutes=30, handle_minutes=5)
+        overtaker = self.make_ticket(start + timedelta(minutes=1), wait_minutes=5, handle_minutes=5)
+        QueueTicket.objects.filter(pk=overtaker.pk).update(counter=self.counter)
+        QueueEvent.objects.create(
+            kind=QueueEvent.CALL, service=self.service, branch=self.branch, ticket=overtaker,
+            counter=self.counter, actor=self.operator,
+        )
+        self.assignment.delete()  # moving off the counter later does not change who made the call
+        still_waiting = self.make_ticket(start + timedelta(minutes=2), status='waiting')
+        after_waiting = self.make_ticket(start + timedelta(minutes=3), wait_minutes=60, handle_minutes=5)
+
+        audit = audit_service(self.service.id, self.branch.id)
+
+        self.assertEqual(
+            [(i['skipped_ticket_id'], i['ticket_id']) for i in audit.inversions],
+            [(skipped.id, overtaker.id), (still_waiting.id, after_waiting.id)],
+        )
+        self.assertEqual(audit.inversions[0]['operator'], self.operator.username)
+        summary, = branch_summary([audit.as_dict()])
+        self.assertEqual(summary['inversions'], 2)
+        self.assertAlmostEqual(summary['inversion_rate'], 2 / 3)
+
+    def test_waiting_ticket_only_holds_back_its_own_service_day(self):
+        yesterday = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        self.make_ticket(yesterday, status='waiting')  # abandoned, never called
+        self.make_ticket(yesterday + timedelta(minutes=5), wait_minutes=None, status='no_show')
+        for i in range(3):
+            self.make_ticket(yesterday + timedelta(days=1, minutes=i), wait_minutes=10, handle_minutes=5)
+
+        audit = audit_service(self.service.id, self.branch.id)
+
+        self.assertEqual((audit.tickets, audit.called, audit.inversion_count), (5, 3, 0))
+
+    def test_inversions_are_counted_beyond_the_sample(self):
+        start = timezone.localtime().replace(hour=9, minute=0, second=0, microsecond=0) - timedelta(days=1)
+        self.make_ticket(start, wait_minutes=60, handle_minutes=5)
+        overtakers = [
+            self.make_ticket(start + timedelta(minutes=1 + i), wait_minutes=5, handle_minutes=5) for i in range(3)
+        ]
+
+        audit = audit_service(self.service.id, self.branch.id, sample_size=2)
+
+        self.assertEqual(audit.inversion_count, 3)
+        self.assertEqual([i['ticket_id'] for i in audit.inversions], [t.id for t in overtakers[:2]])
+        summary, = branch_summary([audit.as_dict()])
+        self.assertEqual(summary['inversions'], 3)
+
+    def test_command_writes_report(self):
+        start = timezone.now() - timedelta(hours=3)
+        self.make_ticket(start, wait_minutes=30, handle_minutes=5)
+        self.make_ticket(start + timedelta(minutes=1), wait_minutes=5, handle_minutes=5)
+        output = tempfile.NamedTemporaryFile(suffix='.json', delete=False).name
+        self.addCleanup(os.remove, output)
+
+        call_command('audit_fifo', workers=1, output=output, stdout=StringIO())
+
+        with open(output) as fh:
+            self.assertEqual(len(json.load(fh)), 1)
@@ -0,0 +1,580 @@
+"""
+Tests for shared infrastructure in core: request profiling, metrics,
+versioned cache, demo data seeding, load testing, tenant context, cached
+sessions and user lookup, tenant sharding, read replicas.
+"""
+
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import SESSION_KEY
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from analytics.fifo import audit_service
+from core import cache as versioned_cache
+from core import metrics, sharding
+from core.backends import CachedUserBackend
+from core.loadtest import parse_mix, run_worker, summarize
+from core.profiling import RequestProfile, install_hooks, recent_slow_requests
+from core.replicas import PIN_SESSION_KEY, use_replica
+from core.roles import CITIZEN, GLOBAL_ADMIN, OPERATOR
+from core.sessions import SessionStore
+from core.tenant import get_tenant
+from counters.models import Counter, OperatorAssignment
+from facilities.models import Branch, Service
+from organizations.models import Organization
+from queues import engine
+from queues.models import QueueTicket
+from tests.test_validation import BaseTestCase
+
+
+@override_settings(REQUEST_PROFILING={'ENABLED': True, 'SLOW_REQUEST_MS': 0, 'SLOW_SAMPLE_RATE': 1.0, 'RING_SIZE': 3})
+class TestRequestProfiling(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard:system_health'))
+
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertIn('cache;desc=', timing)
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_slow_requests_fill_a_ring_buffer(self):
+        self.client.force_login(self.admin)
+        for _ in range(5):
+            self.client.get(reverse('dashboard:system_health'))
+
+        entries = recent_slow_requests()
+        self.assertEqual(len(entries), 3)
+        self.assertEqual([entry['seq'] for entry in entries], [5, 4, 3])
+        self.assertGreater(entries[0]['query_count'], 0)
+        self.assertTrue(entries[0]['queries'])
+
+        response = self.client.get(reverse('dashboard:system_health'))
+        self.assertContains(response, 'Slow Requests')
+        self.assertContains(response, 'GET /dashboard/admin/health/')
+
+    def test_cache_hits_and_misses_are_counted(self):
+        install_hooks()
+        profile = RequestProfile(max_queries=0)
+        token = profile.activate()
+        try:
+            cache.set('present', 1)
+            cache.get('present')
+            cache.get('absent')
+            cache.get_many(['present', 'absent'])
+        finally:
+            profile.deactivate(token)
+        self.assertEqual((profile.cache_hits, profile.cache_misses), (2, 2))
+
+
+class TestMetrics(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        override = override_settings(METRICS={'DIR': self.metrics_dir.name, 'TOKEN': ''})
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_render_histogram_is_cumulative(self):
+        registry = metrics.Registry()
+        for value in (0.0005, 0.003, 0.003, 30):
+            registry.observe('waitfree_engine_duration_seconds', value, op='x')
+        snapshot = registry.snapshot()
+
+        body = metrics.render(snapshot['counters'], snapshot['histograms'])
+
+        self.assertIn('waitfree_engine_duration_seconds_bucket{le="0.001",op="x"} 1', body)
+        self.assertIn('waitfree_engine_duration_seconds_bucket{le="0.005",op="x"} 3', body)
+        self.assertIn('waitfree_engine_duration_seconds_bucket{le="+Inf",op="x"} 4', body)
+        self.assertIn('waitfree_engine_duration_seconds_count{op="x"} 4', body)
+
+    def test_collect_sums_process_files(self):
+        other = {'counters': {'waitfree_queue_joins_total|': 5}, 'histograms': {}}
+        with open(os.path.join(self.metrics_dir.name, '999999.json'), 'w') as fh:
+            json.dump(other, fh)
+        before = metrics.registry.snapshot()['counters'].get('waitfree_queue_joins_total|', 0)
+
+        engine.join_queue(self.citizen, self.service)
+
+        counters, histograms = metrics.collect()
+        self.assertEqual(counters['waitfree_queue_joins_total|'], before + 1 + 5)
+        self.assertIn('waitfree_engine_db_queries|op=join_queue', histograms)
+
+    def test_endpoint_exposes_engine_metrics_and_queue_depth(self):
+        engine.join_queue(self.citizen, self.service)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('# TYPE waitfree_engine_duration_seconds histogram', body)
+        self.assertIn('waitfree_engine_duration_seconds_count{op="join_queue"}', body)
+        self.assertIn(f'waitfree_queue_waiting{{service="{self.service.id}"}} 1', body)
+
+    def test_endpoint_token(self):
+        with override_settings(METRICS={'DIR': self.metrics_dir.name, 'TOKEN': 's3cret'}):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer s3cret')
+            self.assertEqual(response.status_code, 200)
+
+
+class TestVersionedCache(BaseTestCase):
+    """Cached values are keyed by scope versions; every mutation bumps them."""
+
+    def test_hits_until_bumped(self):
+        builds = []
+
+        def build():
+            builds.append(1)
+            return len(builds)
+
+        get = lambda: versioned_cache.get_or_set('thing', build, 'x', branch=self.branch.id, service=self.service.id)
+        self.assertEqual((get(), get()), (1, 1))
+        versioned_cache.bump(branch=self.branch.id)
+        self.assertEqual(get(), 2)
+        versioned_cache.bump_service(self.service)
+        self.assertEqual(get(), 3)
+        versioned_cache.bump(organization=self.org.id)  # not a scope of this key
+        self.assertEqual(get(), 3)
+
+        counters = metrics.registry.snapshot()['counters']
+        self.assertGreaterEqual(counters['waitfree_cache_requests_total|cache=thing,result=hit'], 2)
+        self.assertGreaterEqual(counters['waitfree_cache_requests_total|cache=thing,result=miss'], 3)
+
+    def test_evicted_version_never_reuses_a_key(self):
+        key = versioned_cache.make_key('thing', service=self.service.id)
+        cache.delete(f'cachever:service:{self.service.id}')
+        self.assertNotEqual(versioned_cache.make_key('thing', service=self.service.id), key)
+
+    def test_bump_inside_transaction_repeats_on_commit(self):
+        key = versioned_cache.make_key('thing', service=self.service.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            versioned_cache.bump(service=self.service.id)
+        bumped = versioned_cache.make_key('thing', service=self.service.id)
+        self.assertNotEqual(bumped, key)
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        self.assertNotEqual(versioned_cache.make_key('thing', service=self.service.id), bumped)
+
+    def test_branch_page_never_outlives_a_queue_change(self):
+        url = reverse('facilities:branch_detail', args=[self.branch.id])
+
+        def shown():
+            item, = self.client.get(url).context['service_data']
+            return item['waiting_count'], item['open_counters']
+
+        self.assertEqual(shown(), (0, 1))
+        self.assertEqual(shown(), (0, 1))  # served from cache
+        ticket = engine.join_queue(self.citizen, self.service)
+        self.assertEqual(shown(), (1, 1))
+        engine.serve_next(self.counter)
+        self.assertEqual(shown(), (0, 1))
+        ticket.refresh_from_db()
+        engine.mark_no_show(ticket)
+        engine.close_counter(self.counter)
+        self.assertEqual(shown(), (0, 0))
+
+        self.client.force_login(self.branch_user)
+        self.client.post(reverse('facilities:manage_counters'), {
+            'action': 'create', 'number': '2', 'service_id': self.service.id,
+        })
+        self.assertEqual(self.client.get(url).context['service_data'][0]['open_counters'], 0)
+        self.client.post(reverse('facilities:manage_services'), {
+            'action': 'toggle', 'service_id': self.service.id,
+        })
+        self.assertEqual(self.client.get(url).context['service_data'], [])
+
+
+class TestSeedDemoData(BaseTestCase):
+    """seed_demo_data replaces the fixture data with a reproducible dataset."""
+
+    def test_history_is_fifo_and_live_queues_have_etas(self):
+        call_command('seed_demo_data', history_days=2, tickets_per_day=10, seed=1, stdout=StringIO())
+
+        self.assertEqual(Organization.objects.count(), 9)
+        self.assertEqual(Service.objects.count(), Branch.objects.count() * 3)
+        self.assertTrue(User.objects.filter(username='citizen_9999922222').exists())
+
+        history = QueueTicket.objects.filter(joined_at__date__lt=timezone.localdate())
+        self.assertTrue(history.exists())
+        self.assertFalse(history.exclude(status__in=['served', 'no_show']).exists())
+        for service in Service.objects.all():
+            self.assertEqual(audit_service(service.id, service.branch_id).inversions, [])
+
+        waiting = QueueTicket.objects.filter(status='waiting')
+        self.assertTrue(waiting.exists())
+        self.assertFalse(waiting.filter(position=0).exists())
+        self.assertFalse(QueueTicket.objects.filter(status='serving', counter__isnull=True).exists())
+
+
+class TestLoadTest(BaseTestCase):
+    """The load generator logs in through the real views and drives the queue."""
+
+    def plan(self, **overrides):
+        plan = {
+            'mix': {'poll': 1, 'branch': 1, 'join': 1, 'serve': 1},
+            'services': [self.service.id],
+            'branches': [self.branch.id],
+            'operators': [self.operator.username],
+            'password': 'testpass123',
+            'duration': None,
+            'requests': 40,
+            'think_seconds': 0,
+            'seed': 1,
+        }
+        plan.update(overrides)
+        return plan
+
+    def test_worker_logs_in_and_runs_the_mix(self):
+        result = run_worker(0, self.plan())
+
+        samples = result['samples']
+        for endpoint in ('otp_request', 'otp_verify', 'password_login'):
+            self.assertEqual(len(samples[endpoint]), 1)
+        self.assertEqual(
+            sum(len(samples.get(endpoint, [])) for endpoint in ('ticket', 'branch', 'join', 'serve')), 40,
+        )
+        self.assertEqual(result['errors'], {})
+        self.assertEqual(result['lock_timeouts'], {})
+        self.assertTrue(User.objects.filter(mobile_number='7010000000').exists())
+        self.assertTrue(QueueTicket.objects.filter(service=self.service, status__in=['served', 'serving']).exists())
+
+    def test_failed_login_stops_the_worker(self):
+        result = run_worker(0, self.plan(password='wrong', mix={'serve': 1}))
+        self.assertEqual(list(result['samples']), ['password_login'])
+
+    def test_summary_percentiles_and_rates(self):
+        report = summarize({
+            'samples': {'ticket': [i / 1000 for i in range(1, 101)]},
+            'errors': {'ticket': 2},
+            'lock_timeouts': {'ticket': 1},
+        }, elapsed=10)
+        ticket = report['endpoints']['ticket']
+        self.assertEqual((ticket['p50_ms'], ticket['p95_ms'], ticket['p99_ms']), (50.0, 95.0, 99.0))
+        self.assertEqual(ticket['throughput_rps'], 10.0)
+        self.assertEqual((ticket['error_rate'], ticket['lock_timeout_rate']), (0.02, 0.01))
+
+    def test_mix_validation(self):
+        self.assertEqual(parse_mix('poll=3,serve=1'), {'poll': 3.0, 'serve': 1.0})
+        with self.assertRaises(ValueError):
+            parse_mix('poll=3,dance=1')
+
+    def test_command_refuses_in_memory_database(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', requests=1, stdout=StringIO())
+
+
+class TestTenantContext(BaseTestCase):
+
+    def test_request_tenant_for_operator(self):
+        self.client.force_login(self.operator)
+        response = self.client.get(reverse('counters:operator_dashboard'))
+        tenant = response.wsgi_request.tenant
+        self.assertEqual(tenant.branch, self.branch)
+        self.assertEqual(tenant.organization, self.org)
+        self.assertEqual(tenant.counter, self.counter)
+        self.assertEqual(tenant.service, self.service)
+
+    def test_cached_context_needs_no_relation_queries(self):
+        get_tenant(self.operator)
+        user = User.objects.get(pk=self.operator.pk)
+        with self.assertNumQueries(0):
+            get_tenant(user).attach(user)
+            self.assertEqual(user.branch.organization.name, self.org.name)
+            self.assertEqual(user.operator_assignment.counter.service.name, self.service.name)
+            self.assertEqual(user.current_counter.service.name, self.service.name)
+            self.assertIs(user.operator_assignment.user, user)
+
+    def test_reassignment_refreshes_context(self):
+        self.assertEqual(get_tenant(self.operator).counter, self.counter)
+        other = Counter.objects.create(number='C2', branch=self.branch, service=self.service)
+        self.client.force_login(self.branch_user)
+        self.client.post(reverse('facilities:manage_operators'), {
+            'action': 'assign', 'operator_id': self.operator.id, 'counter_id': other.id,
+        })
+        self.assertEqual(get_tenant(self.operator).counter, other)
+
+    def test_citizen_context_is_empty(self):
+        with self.assertNumQueries(0):
+            tenant = get_tenant(self.citizen)
+        self.assertIsNone(tenant.branch)
+        self.assertIsNone(tenant.counter)
+
+
+class TestCachedSessions(BaseTestCase):
+    """core.sessions writes the session row only when the signed-in user changes."""
+
+    def row(self, store):
+        return Session.objects.filter(session_key=store.session_key).first()
+
+    def test_only_sign_in_reaches_the_database(self):
+        store = SessionStore()
+        store['otp_mobile'] = '9999900000'
+        store.save()
+        self.assertIsNone(self.row(store))
+
+        store[SESSION_KEY] = str(self.citizen.pk)
+        store.save()
+        self.assertEqual(self.row(store).get_decoded()[SESSION_KEY], str(self.citizen.pk))
+
+        store = SessionStore(store.session_key)
+        store['last_seen'] = 'now'
+        store.save()
+        self.assertNotIn('last_seen', self.row(store).get_decoded())
+        self.assertEqual(SessionStore(store.session_key)['last_seen'], 'now')
+
+    def test_sign_in_survives_cache_loss(self):
+        store = SessionStore()
+        store[SESSION_KEY] = str(self.citizen.pk)
+        store.save()
+        cache.clear()
+        self.assertEqual(SessionStore(store.session_key)[SESSION_KEY], str(self.citizen.pk))
+
+    def test_cycled_key_gets_its_own_row(self):
+        store = SessionStore()
+        store[SESSION_KEY] = str(self.citizen.pk)
+        store.save()
+        old = store.session_key
+        store.cycle_key()
+        self.assertFalse(Session.objects.filter(session_key=old).exists())
+        self.assertIsNotNone(self.row(store))
+
+    @override_settings(SESSION_ENGINE='core.sessions')
+    def test_ticket_polls_do_not_touch_sessions_or_users(self):
+        ticket = engine.join_queue(self.citizen, self.service)
+        self.client.force_login(self.citizen)
+        url = reverse('queues:ticket', args=[ticket.id])
+        self.client.get(url)
+        self.assertIsNotNone(Session.objects.filter(session_key=self.client.session.session_key).first())
+
+        with CaptureQueriesContext(connection) as captured:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        tables = ' '.join(query['sql'] for query in captured.captured_queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('waitfree_user', tables)
+
+        self.client.logout()
+        self.assertFalse(Session.objects.exists())
+
+    def test_bench_sessions_reports_every_mode(self):
+        for i in range(3):
+            citizen = User.objects.create_user(username=f'bench_{i}', role='citizen', mobile_number=f'70000000{i:02d}')
+            engine.join_queue(citizen, self.service)
+        out = StringIO()
+        call_command('bench_sessions', requests=3, json=True, stdout=out)
+        report = {row['mode']: row for row in json.loads(out.getvalue())}
+        self.assertEqual(set(report), {'db', 'cached_db', 'cache'})
+        self.assertEqual(report['db']['session_queries_per_request'], 1)
+        self.assertEqual(report['cache']['session_queries_per_request'], 0)
+        self.assertEqual(report['cache']['user_queries_per_request'], 0)
+
+
+class TestCachedUserBackend(BaseTestCase):
+
+    def test_user_is_cached_until_saved(self):
+        backend = CachedUserBackend()
+        backend.get_user(self.citizen.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.citizen.pk), self.citizen)
+
+        self.citizen.is_active = False
+        self.citizen.save()
+        self.assertIsNone(backend.get_user(self.citizen.pk))
+
+    def test_deleted_user_is_not_served_from_cache(self):
+        backend = CachedUserBackend()
+        backend.get_user(self.citizen.pk)
+        pk = self.citizen.pk
+        self.citizen.delete()
+        self.assertIsNone(backend.get_user(pk))
+
+
+@override_settings(DATABASE_SHARDING={'SHARDS': ['default', 'shard_b'], 'ORGANIZATIONS': {}})
+class TestTenantSharding(TransactionTestCase):
+    """Two SQLite databases; South Bank is created first and lands on default, North Hospital on shard_b."""
+
+    databases = {'default', 'shard_b'}
+
+    def setUp(self):
+        cache.clear()
+        # What migrate does for a shard; the test databases were migrated before the override.
+        sharding.reserve_id_range('shard_b')
+        self.citizen = User.objects.create_user(username='citizen_1', role=CITIZEN, mobile_number='9000000001')
+        self.admin = User.objects.create_user(username='root', password='testpass123', role=GLOBAL_ADMIN)
+        self.south = self.make_tenant('South Bank', 'op_south')
+        self.north = self.make_tenant('North Hospital', 'op_north')
+
+    def tearDown(self):
+        cache.clear()
+
+    def make_tenant(self, name, operator_username):
+        org = Organization.objects.create(name=name)
+        with sharding.use_organization(org.id):
+            branch = Branch.objects.create(name=f'{name} Main', organization=org)
+            service = Service.objects.create(name='Desk', branch=branch)
+            counter = Counter.objects.create(number='1', branch=branch, service=service, is_open=True)
+            operator = User.objects.create_user(
+                username=operator_username, password='testpass123', role=OPERATOR, organization=org, branch=branch,
+            )
+            OperatorAssignment.objects.create(user=operator, counter=counter)
+            counter.current_operator = operator
+            counter.save()
+            engine.join_queue(self.citizen, service)
+        return org
+
+    def test_organizations_and_their_data_land_on_their_shard(self):
+        self.assertEqual([sharding.shard_for_id(org.id) for org in (self.south, self.north)], ['default', 'shard_b'])
+        self.assertEqual(list(Organization.objects.using('shard_b').values_list('name', flat=True)), ['North Hospital'])
+        self.assertEqual(list(Organization.objects.using('default').values_list('name', flat=True)), ['South Bank'])
+        for alias in ('default', 'shard_b'):
+            self.assertEqual(Branch.objects.using(alias).count(), 1)
+            self.assertEqual(QueueTicket.objects.using(alias).filter(citizen=self.citizen).count(), 1)
+        self.assertEqual(User.objects.using('shard_b').count(), 0)
+
+    def test_staff_requests_use_their_shard(self):
+        for operator, org in (('op_north', self.north), ('op_south', self.south)):
+            self.client.force_login(User.objects.get(username=operator))
+            response = self.client.get(reverse('counters:operator_dashboard'))
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['waiting_count'], 1)
+            self.assertEqual(response.wsgi_request.tenant.organization, org)
+
+    def test_admin_views_merge_every_shard(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('dashboard:admin_dashboard'))
+        self.assertEqual(response.context['total_orgs'], 2)
+        self.assertEqual(response.context['total_branches'], 2)
+        self.assertEqual(response.context['waiting_now'], 2)
+
+        response = self.client.get(reverse('dashboard:global_monitor'))
+        self.assertEqual(
+            [branch.name for branch in response.context['branches']], ['North Hospital Main', 'South Bank Main'],
+        )
+
+    def test_appending_a_shard_keeps_organizations_in_place(self):
+        with override_settings(DATABASE_SHARDING={'SHARDS': ['default', 'shard_b', 'shard_c']}):
+            self.assertEqual(sharding.shard_for_organization(self.north.id), 'shard_b')
+            self.assertEqual(sharding.shard_for_organization(self.south.id), 'default')
+
+    def test_seed_demo_data_refuses_to_run(self):
+        with self.assertRaisesMessage(CommandError, 'DATABASE_SHARDS'):
+            call_command('seed_demo_data', stdout=StringIO())
+        self.assertEqual(Organization.objects.using('default').count(), 1)
+
+    def test_tenant_ids_name_their_shard(self):
+        for alias in ('default', 'shard_b'):
+            with sharding.use_shard(alias):
+                ticket = QueueTicket.objects.get()
+            self.assertEqual(sharding.shard_for_id(ticket.id), alias)
+        self.assertGreater(Branch.objects.using('shard_b').get().id, sharding.ID_SPAN)
+        self.assertIsNone(sharding.shard_for_id(2 * sharding.ID_SPAN + 1))
+
+    def test_citizen_pages_reach_every_shard(self):
+        with sharding.use_organization(self.north.id):
+            branch = Branch.objects.get()
+            pharmacy = Service.objects.create(name='Pharmacy', branch=branch)
+            Counter.objects.create(number='2', branch=branch, service=pharmacy, is_open=True)
+        self.client.force_login(self.citizen)
+
+        response = self.client.get(reverse('facilities:facility_search'))
+        self.assertEqual([b.name for b in response.context['branches']], ['North Hospital Main', 'South Bank Main'])
+        self.assertContains(self.client.get(reverse('facilities:branch_detail', args=[branch.id])), 'Pharmacy')
+        self.assertEqual(self.client.get(reverse('queues:overview', args=[pharmacy.id])).status_code, 200)
+
+        response = self.client.post(reverse('queues:join_queue'), {'service_id': pharmacy.id})
+        ticket = QueueTicket.objects.using('shard_b').get(service_id=pharmacy.id)
+        self.assertRedirects(response, reverse('queues:ticket', args=[ticket.id]))
+        self.assertEqual(self.client.get(response.url).context['ticket'].service.name, 'Pharmacy')
+        self.assertEqual(len(self.client.get(reverse('queues:my_tickets')).context['active_tickets']), 3)
+        self.assertEqual(len(self.client.get(reverse('dashboard:citizen_dashboard')).context['active_tickets']), 3)
+        self.assertEqual(self.client.get(reverse('queues:display_board', args=[branch.display_token])).status_code, 200)
+
+    def test_engine_metrics_count_queries_on_the_shard(self):
+        key = 'waitfree_engine_db_queries|op=serve_next'
+        before = metrics.registry.snapshot()['histograms'].get(key, {'sum': 0})['sum']
+        with sharding.use_organization(self.north.id):
+            engine.serve_next(Counter.objects.get())
+        self.assertGreater(metrics.registry.snapshot()['histograms'][key]['sum'], before)
+
+    def test_cache_versions_are_per_shard(self):
+        with sharding.use_shard('shard_b'):
+            north_key = versioned_cache.make_key('page', branch=1)
+        with sharding.use_shard('default'):
+            south_key = versioned_cache.make_key('page', branch=1)
+            versioned_cache.bump(branch=1)
+        with sharding.use_shard('shard_b'):
+            self.assertEqual(versioned_cache.make_key('page', branch=1), north_key)
+        self.assertNotEqual(north_key, south_key)
+
+
+@override_settings(DATABASE_REPLICAS={'REPLICAS': {'default': ['replica']}, 'PIN_SECONDS': 10})
+class TestReadReplicas(BaseTestCase):
+    """The replica test database is never written to: it behaves like a replica that lags behind."""
+
+    databases = {'default', 'replica'}
+
+    def test_read_views_use_the_replica(self):
+        ticket = engine.join_queue(self.citizen, self.service)
+        self.client.force_login(self.citizen)
+        response = self.client.get(reverse('queues:ticket', args=[ticket.id]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_own_join_pins_reads_to_the_primary(self):
+        self.client.force_login(self.citizen)
+        ticket_url = self.client.post(reverse('queues:join_queue'), {'service_id': self.service.id}).url
+        self.assertEqual(self.client.get(ticket_url).status_code, 200)
+
+        session = self.client.session
+        session[PIN_SESSION_KEY] = 0
+        session.save()
+        self.assertEqual(self.client.get(ticket_url).status_code, 404)
+
+    def test_operator_sees_the_ticket_they_called(self):
+        ticket = engine.join_queue(self.citizen, self.service)
+        self.client.force_login(self.operator)
+        response = self.client.get(reverse('counters:operator_dashboard'))
+        self.assertIsNone(response.context['current_ticket'])
+
+        self.client.post(reverse('queues:serve_next'))
+        response = self.client.get(reverse('counters:operator_dashboard'))
+        self.assertEqual(response.context['current_ticket'].id, ticket.id)
+
+    def test_operator_queue_json_matches_its_etag(self):
+        url = reverse('counters:operator_queue')
+        self.client.force_login(self.operator)
+        etag = self.client.get(url)['ETag']
+
+        ticket = engine.join_queue(self.citizen, self.service)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual([t['token_number'] for t in response.json()['waiting']], [ticket.token_number])
+
+    def test_writes_and_cached_values_use_the_primary(self):
+        with use_replica():
+            self.assertFalse(Organization.objects.exists())
+            Organization.objects.create(name='Second Hospital')
+            count = versioned_cache.get_or_set('org_count', Organization.objects.count, organization=self.org.id)
+        self.assertEqual(count, 2)
+        self.assertEqual(Organization.objects.using('replica').count(), 0)
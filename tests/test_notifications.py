@@ -0,0 +1,267 @@
+"""
+Notification outbox tests: enqueueing, dispatching and retry backoff,
+the HTTP gateway provider against the local stand-in gateway, the
+throttled OTP flow, and retention pruning.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core import ratelimit
+from notifications.dispatcher import dispatch_batch
+from notifications.gateway import StandInGateway
+from notifications.models import NotificationLog
+from notifications.providers import (
+    BaseProvider, HTTPGatewayProvider, LogProvider, ProviderError, TokenBucket,
+)
+from notifications.retention import prune_notifications
+from notifications.services import (
+    InvalidOTP, check_otp, enqueue_turn_alerts, generate_and_store_otp, request_otp,
+)
+from queues import engine
+from tests.test_validation import BaseTestCase
+
+
+class FailingProvider(BaseProvider):
+
+    def send(self, notification):
+        raise ProviderError('gateway unavailable')
+
+
+class TestNotificationOutbox(BaseTestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_otp_is_enqueued_not_sent(self):
+        generate_and_store_otp('9000000001')
+        log = NotificationLog.objects.get(recipient_mobile='9000000001')
+        self.assertEqual(log.status, 'pending')
+        self.assertIsNotNone(log.next_attempt_at)
+
+    def test_otp_code_is_rendered_at_delivery_only(self):
+        otp = generate_and_store_otp('9000000001')
+        delivered = []
+
+        class RecordingProvider(BaseProvider):
+            def send(self, notification):
+                delivered.append(notification.message)
+
+        self.assertNotIn(otp, NotificationLog.objects.get().message)
+        dispatch_batch(RecordingProvider())
+        self.assertEqual(delivered, [f'Your WaitFree OTP is: {otp}'])
+        self.assertNotIn(otp, NotificationLog.objects.get().message)
+
+    def test_expired_otp_is_not_delivered(self):
+        generate_and_store_otp('9000000001')
+        cache.delete('otp:9000000001')
+
+        self.assertEqual(dispatch_batch(LogProvider()), (0, 0, 1))
+        self.assertEqual(NotificationLog.objects.get().last_error, 'OTP expired before delivery')
+
+    def test_turn_alerts_are_deduplicated_per_ticket(self):
+        ticket = engine.join_queue(self.citizen, self.service)
+
+        enqueue_turn_alerts([ticket])
+        enqueue_turn_alerts([ticket])
+
+        self.assertEqual(
+            NotificationLog.objects.filter(ticket=ticket, notification_type='turn_alert').count(), 1,
+        )
+
+    def test_dispatch_marks_batch_sent(self):
+        for i in range(3):
+            generate_and_store_otp(f'900000000{i}')
+
+        self.assertEqual(dispatch_batch(LogProvider()), (3, 0, 0))
+        self.assertEqual(NotificationLog.objects.filter(status='sent', sent_at__isnull=False).count(), 3)
+        self.assertEqual(dispatch_batch(LogProvider()), (0, 0, 0))
+
+    @override_settings(NOTIFICATION_OUTBOX={'MAX_ATTEMPTS': 2, 'BACKOFF_BASE_SECONDS': 60})
+    def test_failures_back_off_then_fail(self):
+        generate_and_store_otp('9000000001')
+        log = NotificationLog.objects.get()
+
+        self.assertEqual(dispatch_batch(FailingProvider()), (0, 1, 0))
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'pending')
+        self.assertEqual(log.retries, 1)
+        self.assertEqual(log.last_error, 'gateway unavailable')
+        self.assertGreater(log.next_attempt_at, timezone.now() + timedelta(seconds=50))
+
+        # Not due yet: nothing is claimed.
+        self.assertEqual(dispatch_batch(FailingProvider()), (0, 0, 0))
+
+        NotificationLog.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(dispatch_batch(FailingProvider()), (0, 0, 1))
+        log.refresh_from_db()
+        self.assertEqual(log.status, 'failed')
+
+    def test_expired_lease_is_reclaimed(self):
+        generate_and_store_otp('9000000001')
+        NotificationLog.objects.update(status='sending', next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(dispatch_batch(LogProvider()), (1, 0, 0))
+
+
+class TestHTTPGatewayProvider(SimpleTestCase):
+
+    def start_gateway(self, **kwargs):
+        gateway = StandInGateway(**kwargs).start()
+        self.addCleanup(gateway.stop)
+        return gateway
+
+    def messages(self, count):
+        return [
+            NotificationLog(id=i, recipient_mobile=f'90000{i:05d}', notification_type='otp', message=f'otp {i}')
+            for i in range(1, count + 1)
+        ]
+
+    def test_fan_out_is_concurrent_over_pooled_connections(self):
+        gateway = self.start_gateway(latency=0.05, batch_enabled=False)
+        provider = HTTPGatewayProvider(URL=gateway.url, CONCURRENCY=10, POOL_SIZE=10)
+
+        started = time.monotonic()
+        results = provider.send_batch(self.messages(40))
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(results, [None] * 40)
+        self.assertEqual(len(gateway.messages), 40)
+        self.assertLess(elapsed, 40 * 0.05 / 2)
+        self.assertLessEqual(len(gateway.connections), 10)
+
+    def test_batch_endpoint_reports_per_message_errors(self):
+        gateway = self.start_gateway(fail_rate=1.0)
+        provider = HTTPGatewayProvider(URL=gateway.url, BATCH_ENDPOINT=True, BATCH_SIZE=2)
+
+        results = provider.send_batch(self.messages(3))
+
+        self.assertEqual(results, ['rejected by gateway'] * 3)
+
+    def test_unreachable_gateway_fails_every_message(self):
+        gateway = self.start_gateway()
+        url = gateway.url
+        gateway.stop()
+        provider = HTTPGatewayProvider(URL=url, TIMEOUT=1)
+
+        results = provider.send_batch(self.messages(2))
+
+        self.assertTrue(all(error.startswith('gateway request failed') for error in results))
+
+    def test_token_bucket_limits_rate(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+        started = time.monotonic()
+        for _ in range(15):
+            bucket.acquire()
+        # 5 tokens of burst, the remaining 10 arrive at 50/s.
+        self.assertGreaterEqual(time.monotonic() - started, 10 / 50 - 0.02)
+
+
+class TestOTPThrottling(BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_sliding_window_weighs_previous_window(self):
+        for _ in range(4):
+            self.assertTrue(ratelimit.hit('t', 'x', limit=4, window=60, now=119))
+        # Halfway into the next window, half of the previous 4 still count.
+        self.assertTrue(ratelimit.hit('t', 'x', limit=4, window=60, now=150))
+        self.assertTrue(ratelimit.hit('t', 'x', limit=4, window=60, now=150))
+        self.assertFalse(ratelimit.hit('t', 'x', limit=4, window=60, now=150))
+
+    @override_settings(OTP_REQUEST_LIMIT_PER_MOBILE=(2, 600))
+    def test_requests_per_mobile_are_throttled_before_any_write(self):
+        request_otp('9000000001')
+        request_otp('9000000001')
+        with self.assertRaises(ValueError):
+            request_otp('9000000001')
+        self.assertEqual(NotificationLog.objects.filter(recipient_mobile='9000000001').count(), 2)
+
+    @override_settings(OTP_REQUEST_LIMIT_PER_IP=(2, 600))
+    def test_requests_per_ip_span_numbers(self):
+        url = reverse('accounts:citizen_otp_request')
+        for i in range(3):
+            self.client.post(url, {'mobile_number': f'900000000{i}'}, REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(NotificationLog.objects.filter(notification_type='otp').count(), 2)
+
+        self.client.post(url, {'mobile_number': '9000000009'}, REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(NotificationLog.objects.filter(notification_type='otp').count(), 3)
+
+    @override_settings(OTP_MAX_ATTEMPTS=3)
+    def test_wrong_guesses_burn_the_otp(self):
+        otp = request_otp('9000000001')
+        wrong = '000000' if otp != '000000' else '111111'
+        for _ in range(2):
+            with self.assertRaises(InvalidOTP):
+                check_otp('9000000001', wrong)
+        with self.assertRaisesMessage(ValueError, 'Too many incorrect attempts'):
+            check_otp('9000000001', wrong)
+        with self.assertRaisesMessage(ValueError, 'OTP expired'):
+            check_otp('9000000001', otp)
+
+    def test_verify_view_logs_citizen_in(self):
+        self.client.post(reverse('accounts:citizen_otp_request'), {'mobile_number': '9000000001'})
+        otp = cache.get('otp:9000000001')
+
+        response = self.client.post(reverse('accounts:citizen_otp_verify'), {'otp': otp})
+
+        self.assertRedirects(response, reverse('dashboard:router'), fetch_redirect_response=False)
+        self.assertIsNone(cache.get('otp:9000000001'))
+
+
+@override_settings(NOTIFICATION_RETENTION_DAYS={'otp': 1, 'turn_alert': 30})
+class TestNotificationRetention(BaseTestCase):
+
+    def make_log(self, notification_type, age_days, status='sent'):
+        log = NotificationLog.objects.create(
+            recipient=self.citizen,
+            notification_type=notification_type,
+            message='m',
+            status=status,
+        )
+        NotificationLog.objects.filter(pk=log.pk).update(created_at=timezone.now() - timedelta(days=age_days))
+        return log
+
+    def test_prunes_per_type_in_chunks(self):
+        old_otps = [self.make_log('otp', 3) for _ in range(5)]
+        old_alert = self.make_log('turn_alert', 40)
+        kept = [
+            self.make_log('turn_alert', 3),
+            self.make_log('otp', 3, status='pending'),
+            self.make_log('otp', 0),
+        ]
+
+        deleted = prune_notifications(chunk_size=2)
+
+        self.assertEqual(deleted, len(old_otps) + 1)
+        self.assertFalse(NotificationLog.objects.filter(pk=old_alert.pk).exists())
+        self.assertEqual(
+            set(NotificationLog.objects.values_list('pk', flat=True)), {log.pk for log in kept},
+        )
+
+    def test_citizen_page_lists_own_notifications(self):
+        self.make_log('turn_alert', 0)
+        self.client.force_login(self.citizen)
+
+        response = self.client.get(reverse('notifications:citizen_notifications'))
+
+        self.assertContains(response, 'Turn Alert')
+
+
+class TestBenchNotifications(BaseTestCase):
+
+    def test_refuses_to_write_without_scratch(self):
+        with self.assertRaisesMessage(CommandError, '--scratch'):
+            call_command('bench_notifications', rows=10)
+        self.assertEqual(NotificationLog.objects.count(), 0)
@@ -0,0 +1,521 @@
+"""
+Queue engine tests beyond the core enforcement rules: ETA prediction,
+no-show sweeping, the event log, the public overview, the lobby display
+board, the mobile JWT API, the operator dashboard, bulk counter control.
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from core import metrics
+from core.authentication import tokens_for_user
+from core.roles import CITIZEN, OPERATOR
+from counters.models import Counter
+from facilities.models import Branch, Service
+from notifications.models import NotificationLog
+from notifications.services import request_otp
+from queues import engine, events
+from queues.eta import MonteCarloETAPredictor
+from queues.models import QueueTicket, QueueEvent, NoShowSweep
+from tests.test_validation import BaseTestCase
+
+
+class QueueMixin:
+
+    def join(self, count):
+        tickets = []
+        for i in range(count):
+            citizen = User.objects.create_user(
+                username=f'q_citizen_{User.objects.count()}',
+                role=CITIZEN,
+                mobile_number=f'81{User.objects.count():08d}',
+            )
+            tickets.append(engine.join_queue(citizen, self.service))
+        return tickets
+
+
+class TestMonteCarloETA(QueueMixin, BaseTestCase):
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_constant_service_time_matches_queue_arithmetic(self):
+        predictor = MonteCarloETAPredictor(runs=2000, min_samples=1, seed=1)
+        waits = predictor.simulate([600] * 10, waiting_count=4, active_counters=2)
+
+        # Two counters mid-service: positions 3 and 4 wait one full service longer.
+        self.assertTrue(((waits[:, 2] - waits[:, 0]) >= 600 - 1e-9).all())
+        self.assertTrue((waits[:, 3] <= 1200 + 1e-9).all())
+
+    def test_mixed_service_times_widen_the_band(self):
+        cache.set(f'eta_samples:{self.service.id}', [300] * 20 + [1800] * 20)
+        predictor = MonteCarloETAPredictor(seed=7)
+
+        p50, p90 = predictor.predict(self.service, waiting_count=10, active_counters=1)
+
+        self.assertEqual(len(p50), 10)
+        self.assertTrue(all(lo <= hi for lo, hi in zip(p50, p90)))
+        self.assertGreater(p90[-1], p50[-1])
+        self.assertEqual(p50, sorted(p50))
+
+    def test_falls_back_to_linear_without_history(self):
+        predictor = MonteCarloETAPredictor(seed=1)
+        p50, p90 = predictor.predict(self.service, waiting_count=3, active_counters=1)
+        self.assertEqual(p50, [10, 20, 30])
+        self.assertEqual(p90, p50)
+
+    @override_settings(ETA_MONTE_CARLO={'RUNS': 200, 'MIN_SAMPLES': 5})
+    def test_recalculation_stores_bands_per_ticket(self):
+        cache.set(f'eta_samples:{self.service.id}', [300] * 10 + [1800] * 10)
+        self.join(5)
+
+        engine.recalculate_eta(self.service)
+
+        tickets = QueueTicket.objects.filter(service=self.service, status='waiting').order_by('joined_at')
+        self.assertEqual([t.position for t in tickets], [1, 2, 3, 4, 5])
+        for ticket in tickets:
+            self.assertEqual(ticket.estimated_wait_time, ticket.eta_p50)
+            self.assertLessEqual(ticket.eta_p50, ticket.eta_p90)
+
+
+class TestNoShowSweeper(QueueMixin, BaseTestCase):
+
+    def test_sweeps_only_tickets_past_grace(self):
+        Counter.objects.create(number='2', branch=self.branch, service=self.service, is_open=True)
+        stale, fresh, waiting = self.join(3)
+        now = timezone.now()
+        QueueTicket.objects.filter(pk=stale.pk).update(status='serving', called_at=now - timedelta(minutes=20))
+        QueueTicket.objects.filter(pk=fresh.pk).update(status='serving', called_at=now - timedelta(minutes=2))
+        self.service.no_show_grace_minutes = 10
+        self.service.save()
+
+        sweep = engine.sweep_no_shows(now=now)
+
+        self.assertEqual(sweep.swept_count, 1)
+        self.assertEqual(sweep.ticket_ids, [stale.id])
+        self.assertEqual(sweep.service_ids, [self.service.id])
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        waiting.refresh_from_db()
+        self.assertEqual(stale.status, 'no_show')
+        self.assertEqual(stale.no_show_at, now)
+        self.assertEqual(fresh.status, 'serving')
+        self.assertEqual(waiting.position, 1)
+
+    def test_ticket_finished_after_the_scan_is_not_swept(self):
+        ticket, = self.join(1)
+        now = timezone.now()
+        QueueTicket.objects.filter(pk=ticket.pk).update(status='serving', called_at=now - timedelta(minutes=30))
+        values_list = QuerySet.values_list
+        scanned = []
+
+        def scan_then_finish(queryset, *fields, **kwargs):
+            rows = values_list(queryset, *fields, **kwargs)
+            if scanned:
+                return rows
+            scanned.extend(rows)  # the sweep's scan sees the ticket serving...
+            QueueTicket.objects.filter(pk=ticket.pk).update(status='served', served_at=now)  # ...then it is finished
+            return scanned
+
+        with mock.patch.object(QuerySet, 'values_list', scan_then_finish):
+            sweep = engine.sweep_no_shows(now=now)
+
+        self.assertEqual((sweep.swept_count, sweep.ticket_ids, sweep.service_ids), (0, [], []))
+        ticket.refresh_from_db()
+        self.assertEqual(ticket.status, 'served')
+        self.assertFalse(QueueEvent.objects.filter(kind=QueueEvent.NO_SHOW).exists())
+
+    def test_empty_sweep_is_still_audited(self):
+        sweep = engine.sweep_no_shows()
+        self.assertEqual(sweep.swept_count, 0)
+        self.assertEqual(NoShowSweep.objects.count(), 1)
+
+
+class TestQueueEventLog(QueueMixin, BaseTestCase):
+
+    def test_engine_actions_are_logged_in_order(self):
+        first, second = self.join(2)
+        engine.serve_next(self.counter, operator=self.operator)
+        first.refresh_from_db()
+        engine.mark_served(first, operator=self.operator)
+        engine.serve_next(self.counter, operator=self.operator)
+        second.refresh_from_db()
+        engine.mark_no_show(second, operator=self.operator)
+        engine.close_counter(self.counter, operator=self.operator)
+
+        log = list(QueueEvent.objects.values_list('kind', 'ticket_id', 'counter_id'))
+        self.assertEqual(log, [
+            ('join', first.id, None),
+            ('join', second.id, None),
+            ('call', first.id, self.counter.id),
+            ('serve', first.id, self.counter.id),
+            ('call', second.id, self.counter.id),
+            ('no_show', second.id, self.counter.id),
+            ('counter_close', None, self.counter.id),
+        ])
+        self.assertEqual(QueueEvent.objects.filter(actor=self.operator).count(), 5)
+
+    def test_events_are_append_only(self):
+        self.join(1)
+        event = QueueEvent.objects.get()
+        with self.assertRaises(ValueError):
+            event.save()
+        with self.assertRaises(ValueError):
+            event.delete()
+
+    def test_rebuild_from_snapshot_matches_full_replay(self):
+        tickets = self.join(3)
+        engine.serve_next(self.counter)
+        midpoint = QueueEvent.objects.last().occurred_at
+        events.take_snapshots()
+        self.join(1)
+        engine.serve_next(self.counter)
+
+        state, _ = events.rebuild_state(self.service.id, at=midpoint)
+        self.assertEqual(list(state.waiting), [tickets[1].id, tickets[2].id])
+        self.assertEqual(state.serving, {tickets[0].id: self.counter.id})
+
+        from_snapshot, last_id = events.rebuild_state(self.service.id)
+        self.assertEqual(last_id, QueueEvent.objects.last().id)
+        self.assertEqual(len(from_snapshot.waiting), 2)
+        self.assertEqual(len(from_snapshot.serving), 2)
+
+    def test_verify_fifo_flags_skipped_tickets(self):
+        first, second = self.join(2)
+        self.assertEqual(events.verify_fifo().violations, 0)
+
+        events.record(QueueEvent.CALL, self.service, ticket=second, counter_id=self.counter.id)
+
+        report = events.verify_fifo(chunk_size=1)
+        self.assertEqual(report.violations, 1)
+        self.assertEqual(report.examples[0]['skipped_ticket_id'], first.id)
+
+
+@override_settings(QUEUE_OVERVIEW_WINDOW=2)
+class TestQueueOverview(QueueMixin, BaseTestCase):
+
+    def overview(self):
+        return self.client.get(reverse('queues:overview', args=[self.service.id]))
+
+    def test_queue_length_tracks_joins_calls_and_recalculation(self):
+        tickets = self.join(3)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.queue_length, 3)
+        engine.serve_next(self.counter)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.queue_length, 2)
+
+        QueueTicket.objects.filter(id=tickets[1].id).update(status='no_show')  # behind the engine's back
+        engine.recalculate_eta(self.service)
+        self.service.refresh_from_db()
+        self.assertEqual(self.service.queue_length, 1)
+
+    def test_board_shows_a_bounded_window(self):
+        tickets = self.join(4)
+        engine.serve_next(self.counter)
+
+        response = self.overview()
+        board = response.context['board']
+        self.assertIn(f'#{tickets[0].token_number}', board)  # serving
+        self.assertIn(f'#{tickets[2].token_number}', board)
+        self.assertNotIn(f'#{tickets[3].token_number}', board)
+        self.assertIn('+ 1 more waiting', board)
+
+    def test_board_is_rendered_once_per_queue_change(self):
+        self.join(1)
+        self.overview()
+        with self.assertNumQueries(1):  # the service row only
+            self.overview()
+
+        ticket, = self.join(1)
+        self.assertIn(f'#{ticket.token_number}', self.overview().context['board'])
+
+
+class TestDisplayBoard(QueueMixin, BaseTestCase):
+
+    def board(self, token=None, headers=None, **params):
+        return self.client.get(
+            reverse('queues:display_board_data', args=[token or self.branch.display_token]), params,
+            headers=headers,
+        )
+
+    def test_board_shows_counters_and_next_tokens(self):
+        tickets = self.join(3)
+        with self.captureOnCommitCallbacks(execute=True):
+            engine.serve_next(self.counter)
+
+        board = self.board().json()
+        self.assertEqual(board['counters'], [{
+            'number': self.counter.number, 'service': self.service.name,
+            'is_open': True, 'token': tickets[0].token_number,
+        }])
+        self.assertEqual(board['services'][0]['waiting'], 2)
+        self.assertEqual(board['services'][0]['next'], [t.token_number for t in tickets[1:]])
+
+    def test_cached_board_costs_no_queries(self):
+        self.join(1)
+        self.board()
+        with self.assertNumQueries(0):
+            response = self.board()
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.board(headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_engine_republishes_on_change(self):
+        before = self.board().json()
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket, = self.join(1)
+        with self.assertNumQueries(0):
+            after = self.board().json()
+        self.assertNotEqual(after['version'], before['version'])
+        self.assertEqual(after['services'][0]['next'], [ticket.token_number])
+
+    def test_long_poll_returns_newer_board_at_once(self):
+        version = self.board().json()['version']
+        self.join(1)
+        with override_settings(DISPLAY_BOARD={'LONG_POLL_SECONDS': 0}):
+            board = self.board(since=version).json()
+        self.assertNotEqual(board['version'], version)
+        self.assertEqual(board['services'][0]['waiting'], 1)
+
+    def test_unknown_token_is_404(self):
+        self.assertEqual(self.board('not-a-token').status_code, 404)
+        response = self.client.get(reverse('queues:display_board', args=['not-a-token']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_renders_the_board(self):
+        ticket, = self.join(1)
+        response = self.client.get(reverse('queues:display_board', args=[self.branch.display_token]))
+        self.assertContains(response, f'#{ticket.token_number}')
+
+    def test_rotation_revokes_the_old_token(self):
+        old = self.branch.display_token
+        self.board(old)  # cache the old token's lookup
+        self.client.force_login(self.branch_user)
+        self.client.post(reverse('facilities:rotate_display_token'))
+        self.client.logout()
+
+        self.branch.refresh_from_db()
+        self.assertNotEqual(self.branch.display_token, old)
+        self.assertEqual(self.board(old).status_code, 404)
+        self.assertEqual(self.board().status_code, 200)
+
+
+class TestMobileAPI(BaseTestCase):
+    """Citizen mobile flow: OTP → JWT → queue endpoints that never touch the session."""
+
+    mobile = '9000000001'
+
+    def sign_in(self):
+        otp = request_otp(self.mobile)
+        response = self.client.post(
+            reverse('accounts:api_otp_verify'), {'mobile_number': self.mobile, 'otp': otp},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def api(self, method, url, token, data=None):
+        return getattr(self.client, method)(
+            url, data or {}, content_type='application/json', headers={'Authorization': f'Bearer {token}'},
+        )
+
+    def test_otp_verify_issues_tokens_with_tenant_claims(self):
+        body = self.sign_in()
+        access = AccessToken(body['access'])
+        self.assertEqual(access['role'], CITIZEN)
+        self.assertEqual(access['user_id'], str(body['user']['id']))
+        self.assertIn('branch_id', access.payload)
+        self.assertNotIn('sessionid', self.client.cookies)
+
+        refreshed = self.client.post(reverse('accounts:api_token_refresh'), {'refresh': body['refresh']})
+        self.assertEqual(AccessToken(refreshed.json()['access'])['role'], CITIZEN)
+
+    def test_otp_request_and_wrong_otp(self):
+        response = self.client.post(reverse('accounts:api_otp_request'), {'mobile_number': self.mobile})
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('otp', response.json())
+        response = self.client.post(reverse('accounts:api_otp_verify'), {'mobile_number': self.mobile, 'otp': 'x'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_join_and_poll_without_session_or_user_reads(self):
+        token = self.sign_in()['access']
+        response = self.api('post', reverse('queues:api_join'), token, {'service_id': self.service.id})
+        self.assertEqual(response.status_code, 201)
+        ticket = response.json()
+        self.assertEqual((ticket['status'], ticket['position']), ('waiting', 1))
+
+        url = reverse('queues:api_ticket', args=[ticket['id']])
+        with self.assertNumQueries(1):  # the ticket with its service, branch and counter
+            response = self.api('get', url, token)
+        self.assertEqual(response.json()['token_number'], ticket['token_number'])
+        self.assertEqual([t['id'] for t in self.api('get', reverse('queues:api_tickets'), token).json()], [ticket['id']])
+
+    def test_access_is_limited_to_own_citizen_tickets(self):
+        theirs = engine.join_queue(self.citizen, self.service)
+        token = self.sign_in()['access']
+        self.assertEqual(self.api('get', reverse('queues:api_ticket', args=[theirs.id]), token).status_code, 404)
+
+        operator_token = tokens_for_user(self.operator)['access']
+        self.assertEqual(self.api('get', reverse('queues:api_tickets'), operator_token).status_code, 403)
+        claimless = str(AccessToken.for_user(self.citizen))
+        self.assertEqual(self.api('get', reverse('queues:api_tickets'), claimless).status_code, 401)
+        self.assertEqual(self.client.get(reverse('queues:api_tickets')).status_code, 401)
+
+
+@override_settings(OPERATOR_DASHBOARD={'WINDOW': 3, 'REFRESH_SECONDS': 5})
+class TestOperatorDashboard(QueueMixin, BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.operator)
+
+    def dashboard(self):
+        return self.client.get(reverse('counters:operator_dashboard'))
+
+    def test_shows_a_window_and_the_total(self):
+        tickets = self.join(5)
+        engine.serve_next(self.counter)
+
+        response = self.dashboard()
+        self.assertEqual(response.context['current_ticket'].id, tickets[0].id)
+        self.assertEqual([t.id for t in response.context['waiting_tickets']], [t.id for t in tickets[1:4]])
+        self.assertEqual(response.context['waiting_count'], 4)
+        self.assertContains(response, 'Showing the next 3 of 4.')
+
+    def test_queries_do_not_grow_with_the_queue(self):
+        self.join(2)
+        self.dashboard()
+        with CaptureQueriesContext(connection) as short:
+            self.dashboard()
+        self.join(20)
+        self.dashboard()
+        with CaptureQueriesContext(connection) as long:
+            response = self.dashboard()
+        self.assertEqual(len(long), len(short))
+        self.assertEqual(response.context['waiting_count'], 22)
+
+    def test_current_ticket_is_this_counters_own(self):
+        other = Counter.objects.create(number='2', branch=self.branch, service=self.service, is_open=True)
+        tickets = self.join(2)
+        engine.serve_next(other)
+        self.assertIsNone(self.dashboard().context['current_ticket'])
+
+        self.client.post(reverse('queues:serve_next'))
+        tickets[0].refresh_from_db()
+        self.assertEqual(tickets[0].status, 'serving')  # still the other counter's
+        self.assertEqual(self.dashboard().context['current_ticket'].id, tickets[1].id)
+
+    def test_json_window_with_etag(self):
+        tickets = self.join(4)
+        url = reverse('counters:operator_queue')
+        response = self.client.get(url)
+        data = response.json()
+        self.assertEqual(data['waiting_count'], 4)
+        self.assertIsNone(data['current'])
+        self.assertEqual([t['token_number'] for t in data['waiting']], [t.token_number for t in tickets[:3]])
+
+        etag = response['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        engine.serve_next(self.counter)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['current']['token_number'], tickets[0].token_number)
+
+
+class TestBulkCounters(QueueMixin, BaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.second = Counter.objects.create(number='2', branch=self.branch, service=self.service)
+        self.pharmacy = Service.objects.create(name='Pharmacy', branch=self.branch, avg_service_time=5)
+        self.pharmacy_counter = Counter.objects.create(number='P1', branch=self.branch, service=self.pharmacy)
+        self.counter_ids = [self.counter.id, self.second.id, self.pharmacy_counter.id]
+
+    def recalculations(self):
+        histogram = metrics.registry.snapshot()['histograms'].get('waitfree_engine_duration_seconds|op=recalculate_eta')
+        return histogram['count'] if histogram else 0
+
+    def open_ids(self):
+        return set(Counter.objects.filter(branch=self.branch, is_open=True).values_list('id', flat=True))
+
+    def test_open_all_recalculates_each_service_once(self):
+        tickets = self.join(4)
+        before = self.recalculations()
+
+        with CaptureQueriesContext(connection) as queries:
+            changed = engine.set_counters_open(self.branch.id, True, actor=self.branch_user)
+
+        self.assertEqual(sorted(changed), sorted([self.second.id, self.pharmacy_counter.id]))  # counter 1 was open
+        self.assertEqual(self.open_ids(), set(self.counter_ids))
+        self.assertEqual(self.recalculations() - before, 2)
+        self.assertEqual(sum(q['sql'].startswith(f'UPDATE "{Counter._meta.db_table}"') for q in queries.captured_queries), 1)
+        events = QueueEvent.objects.filter(kind=QueueEvent.COUNTER_OPEN)
+        self.assertEqual(sorted(events.values_list('counter_id', flat=True)), sorted(changed))
+        self.assertEqual({e.actor_id for e in events}, {self.branch_user.id})
+        tickets[-1].refresh_from_db()
+        self.assertEqual(tickets[-1].estimated_wait_time, 20)  # two counters now share the line
+
+    def test_close_selection_queues_turn_alerts_once(self):
+        Service.objects.filter(id=self.service.id).update(avg_service_time=2)
+        self.service.refresh_from_db()
+        engine.set_counters_open(self.branch.id, True)
+        self.join(2)
+        NotificationLog.objects.all().delete()
+
+        engine.set_counters_open(self.branch.id, False, counter_ids=[self.second.id, self.pharmacy_counter.id])
+
+        self.assertEqual(self.open_ids(), {self.counter.id})
+        self.assertEqual(engine.set_counters_open(self.branch.id, False, counter_ids=[self.second.id]), [])
+        self.assertEqual(QueueEvent.objects.filter(kind=QueueEvent.COUNTER_CLOSE).count(), 2)
+        self.assertEqual(NotificationLog.objects.filter(notification_type='turn_alert').count(), 2)
+
+    def test_manage_counters_bulk_action(self):
+        other_branch = Branch.objects.create(name='Other', organization=self.org, address='1 Elsewhere')
+        foreign = Counter.objects.create(
+            number='X', branch=other_branch, service=Service.objects.create(name='X', branch=other_branch),
+        )
+        self.client.force_login(self.branch_user)
+        url = reverse('facilities:manage_counters')
+
+        response = self.client.post(url, {'action': 'bulk_open', 'counter_ids': [self.second.id, foreign.id, 'x']})
+        self.assertRedirects(response, url)
+        self.assertEqual(self.open_ids(), {self.counter.id, self.second.id})
+        foreign.refresh_from_db()
+        self.assertFalse(foreign.is_open)
+
+        response = self.client.post(url, {'action': 'bulk_close'}, follow=True)
+        self.assertContains(response, 'Select at least one counter.')
+
+    def test_api(self):
+        token = tokens_for_user(self.branch_user)['access']
+        url = reverse('facilities:api_bulk_counters')
+
+        def post(data, token=token):
+            return self.client.post(url, data, content_type='application/json', headers={'Authorization': f'Bearer {token}'})
+
+        response = post({'action': 'close'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'action': 'close', 'changed': [self.counter.id]})
+        self.assertEqual(self.open_ids(), set())
+
+        self.assertEqual(post({'action': 'open', 'counter_ids': [self.pharmacy_counter.id]}).json()['changed'],
+                         [self.pharmacy_counter.id])
+        self.assertEqual(post({'action': 'toggle'}).status_code, 400)
+        self.assertEqual(post({'action': 'open', 'counter_ids': 'all'}).status_code, 400)
+        self.assertEqual(post({'action': 'open'}, token=tokens_for_user(self.operator)['access']).status_code, 403)
+
+        self.branch_user.role = OPERATOR  # demoted after the token was issued
+        self.branch_user.save()
+        self.assertEqual(post({'action': 'open'}).status_code, 403)
+        self.assertEqual(self.open_ids(), {self.pharmacy_counter.id})
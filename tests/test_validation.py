@@ -32,6 +32,9 @@ class BaseTestCase(TestCase):
 
     def setUp(self):
         """Create full hierarchy: Org → Branch → Service → Counter → Operator + Citizen."""
+        # Object ids repeat between tests; cached values must not.
+        cache.clear()
+
         # Organization
         self.org = Organization.objects.create(
             name='Test Hospital',
@@ -233,6 +236,26 @@ class TestBranchCannotSeeOtherBranches(BaseTestCase):
         self.assertContains(response, 'Main Branch')
 
 
+class TestServiceFormValidation(BaseTestCase):
+    """Numeric service fields are validated instead of raising a server error."""
+
+    def test_invalid_minutes_are_rejected_with_a_message(self):
+        self.client.force_login(self.branch_user)
+        url = reverse('facilities:manage_services')
+        for avg_time, grace in (('', '15'), ('10', 'abc'), ('10', '-5'), ('0', '15')):
+            response = self.client.post(url, {
+                'action': 'create', 'name': 'Radiology', 'avg_service_time': avg_time, 'no_show_grace_minutes': grace,
+            }, follow=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'whole number of minutes')
+        self.assertFalse(Service.objects.filter(name='Radiology').exists())
+
+        self.client.post(url, {
+            'action': 'create', 'name': 'Radiology', 'avg_service_time': '12', 'no_show_grace_minutes': '0',
+        })
+        self.assertEqual(Service.objects.get(name='Radiology').no_show_grace_minutes, 0)
+
+
 class TestOrgCannotSeeOtherOrgs(BaseTestCase):
     """Test 4: Organization user can only see their own org's data."""
 
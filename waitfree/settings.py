@@ -30,14 +30,17 @@ INSTALLED_APPS = [
     'queues',
     'notifications',
     'dashboard',
+    'analytics',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.TenantContextMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -81,6 +84,32 @@ DATABASES = {
     }
 }
 
+# Tenant sharding (core.sharding): each organization and everything under it
+# lives on one of SHARDS; users, sessions and auth stay on 'default'. Shards
+# not configured above are local SQLite files, e.g.
+# DATABASE_SHARDS=default,shard_b. Migrate every alias
+# (`manage.py migrate --database shard_b`).
+DATABASE_SHARDING = {
+    'SHARDS': os.environ.get('DATABASE_SHARDS', 'default').split(','),
+    'ORGANIZATIONS': {},  # organization id → alias; unlisted ids are spread by id
+    'FANOUT_WORKERS': 8,  # threads used by admin views that query every shard
+}
+for _alias in DATABASE_SHARDING['SHARDS']:
+    DATABASES.setdefault(_alias, {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / f'db_{_alias}.sqlite3',
+    })
+
+# Read replicas (core.replicas): views marked @read_replica read from a
+# replica of their database, e.g. {'default': ['replica']}; each replica
+# alias must also be in DATABASES. A user's own queue changes pin their
+# reads to the primary for PIN_SECONDS.
+DATABASE_REPLICAS = {
+    'REPLICAS': {},
+    'PIN_SECONDS': 10,
+}
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
 # Cache — LocMem for local dev (switch to Redis in production)
 # To use Redis, uncomment the block below and comment out LocMem:
 # CACHES = {
@@ -100,6 +129,24 @@ CACHES = {
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# The per-request user lookup is served from the versioned cache (core.backends).
+# ModelBackend stays listed so sessions logged in through it keep resolving.
+AUTHENTICATION_BACKENDS = [
+    'core.backends.CachedUserBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Sessions: 'db' (default), 'cached_db', or 'cache' — core.sessions keeps
+# sessions in the cache and writes the row only on login/logout. The cache
+# modes need a cache shared by all workers. Compare them with
+# `manage.py bench_sessions`.
+SESSION_MODES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'core.sessions',
+}
+SESSION_ENGINE = SESSION_MODES[os.environ.get('SESSION_MODE', 'db')]
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -129,9 +176,94 @@ SIMPLE_JWT = {
 # OTP Settings
 OTP_LENGTH = 6
 OTP_EXPIRY_SECONDS = 300  # 5 minutes
+OTP_MAX_ATTEMPTS = 5  # wrong guesses before the OTP is discarded
+OTP_REQUEST_LIMIT_PER_MOBILE = (5, 900)  # requests per sliding window (seconds)
+OTP_REQUEST_LIMIT_PER_IP = (20, 900)
+
+# Public queue overview: serving tokens plus the next N waiting ones
+QUEUE_OVERVIEW_WINDOW = 20
+
+# Operator dashboard (counters.views): the next WINDOW waiting tickets, kept
+# current by polling a JSON endpoint every REFRESH_SECONDS.
+OPERATOR_DASHBOARD = {
+    'WINDOW': 10,
+    'REFRESH_SECONDS': 5,
+}
+
+# ETA prediction — see queues.eta
+ETA_PREDICTOR = 'queues.eta.MonteCarloETAPredictor'
+ETA_MONTE_CARLO = {
+    'RUNS': 400,               # simulated queues per recalculation
+    'SAMPLE_SIZE': 200,        # most recent served tickets used as service-time samples
+    'MIN_SAMPLES': 20,         # below this, fall back to the linear estimate
+    'SAMPLE_TTL_SECONDS': 300,
+}
+
+# Request profiling (core.middleware.RequestProfilingMiddleware): a
+# Server-Timing header on every response, plus a sample of slow requests
+# with their queries on the System Health page.
+REQUEST_PROFILING = {
+    'ENABLED': os.environ.get('REQUEST_PROFILING') == '1',
+    'SLOW_REQUEST_MS': 500,
+    'SLOW_SAMPLE_RATE': 0.1,
+    'RING_SIZE': 100,
+    'MAX_QUERIES': 100,
+}
+
+# Prometheus metrics (core.metrics), scraped from /metrics. Each worker
+# process writes its totals to DIR; clear it when deploying.
+METRICS = {
+    'DIR': os.environ.get('METRICS_DIR', str(BASE_DIR / 'run' / 'metrics')),
+    'FLUSH_INTERVAL_SECONDS': 5,
+    'TOKEN': os.environ.get('METRICS_TOKEN', ''),
+}
+
+# Versioned cache (core.cache): entries are keyed by organization/branch/
+# service versions that every mutation bumps, so TIMEOUT only bounds memory.
+VERSIONED_CACHE = {
+    'TIMEOUT': 300,
+}
+
+# Lobby display boards (queues.display): one cached JSON snapshot per branch.
+# Each screen's long-poll holds a worker thread for up to LONG_POLL_SECONDS.
+DISPLAY_BOARD = {
+    'NEXT_TOKENS': 5,
+    'LONG_POLL_SECONDS': 20,
+    'POLL_INTERVAL_SECONDS': 0.5,
+    'TOKEN_CACHE_SECONDS': 300,
+}
 
 # Notification Settings
 TURN_ALERT_THRESHOLD_MINUTES = 5
+NOTIFICATION_PROVIDER = 'notifications.providers.LogProvider'
+NOTIFICATION_OUTBOX = {
+    'BATCH_SIZE': 100,            # notifications claimed per dispatcher round
+    'MAX_ATTEMPTS': 5,            # then the row is marked failed
+    'BACKOFF_BASE_SECONDS': 30,   # retry n waits base * 2^(n-1)
+    'BACKOFF_MAX_SECONDS': 3600,
+    'LEASE_SECONDS': 120,         # a claimed row is reclaimable after this
+}
+# Days to keep delivered/failed notifications, by type (prune_notifications).
+# Types not listed are kept forever.
+NOTIFICATION_RETENTION_DAYS = {
+    'otp': 2,
+    'turn_alert': 90,
+}
+# Used when NOTIFICATION_PROVIDER = 'notifications.providers.HTTPGatewayProvider'.
+# `manage.py run_sms_gateway` serves a local stand-in on the default URL.
+NOTIFICATION_GATEWAY = {
+    'URL': os.environ.get('SMS_GATEWAY_URL', 'http://127.0.0.1:8025'),
+    'TOKEN': os.environ.get('SMS_GATEWAY_TOKEN', ''),
+    'TIMEOUT': 10,
+    'POOL_SIZE': 20,              # keep-alive connections held open
+    'CONCURRENCY': 20,            # requests in flight when fanning out
+    'RATE_PER_SECOND': 0,         # gateway quota; 0 disables throttling
+    'BATCH_ENDPOINT': False,      # gateway accepts POST /messages/batch
+    'BATCH_SIZE': 100,
+}
+
+# Analytics: columnar archive written by `export_ticket_archive`
+TICKET_ARCHIVE_DIR = BASE_DIR / 'archive'
 
 LANGUAGE_CODE = 'en-us'
 TIME_ZONE = 'Asia/Kolkata'
@@ -155,6 +287,13 @@ if 'test' in sys.argv or 'test_validation' in ' '.join(sys.argv):
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': ':memory:',
     }
+    # Second shard and an (unreplicated) replica for the sharding and replica
+    # tests; only used where they list them in DATABASE_SHARDING/DATABASE_REPLICAS.
+    for _alias in ('shard_b', 'replica'):
+        DATABASES[_alias] = {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': ':memory:',
+        }
     CACHES['default'] = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
@@ -6,6 +6,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import render
 
+from core.views import MetricsView
+
 
 def landing_page(request):
     return render(request, 'pages/landing.html')
@@ -22,6 +24,7 @@ urlpatterns = [
     # Global pages
     path('', landing_page, name='landing'),
     path('about/', about_page, name='about'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
 
     # App URLs
     path('accounts/', include('accounts.urls')),